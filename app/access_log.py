@@ -0,0 +1,153 @@
+"""Structured (JSON lines) logging written off the event loop.
+
+Opt-in with ``APP_ACCESS_LOG_ENABLED``. :func:`install` puts a
+:class:`QueueHandler` on the ``riot-crypto-api`` logger, so the access log
+(``riot-crypto-api.access``, fed by
+:class:`~app.middleware.access_log.AccessLogMiddleware`) and the app's
+other loggers (keyring, sidecar, diagnostics) only pay for a record and a
+non-blocking put on a bounded queue. A :class:`BatchWriter` thread wakes
+up every *flush_interval*, formats whatever has accumulated and writes it
+in batches of up to *batch_size* records, one ``write`` and one flush
+each, to stdout or ``APP_ACCESS_LOG_FILE``. The thread never waits on the
+queue itself: a put does not wake it, so requests do not pay a thread
+switch per record. When the queue is full, records are dropped and
+counted (``riot_access_log_dropped_total``) rather than slowing requests
+down. The lifespan starts the writer in each worker and stops it on
+shutdown, after writing what is still queued.
+"""
+from __future__ import annotations
+import logging
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import IO, Any, Dict, List, Optional
+import orjson
+from app.metrics import ACCESS_LOG_DROPPED
+
+ACCESS_LOGGER = 'riot-crypto-api.access'
+
+
+def json_line(record: logging.LogRecord) -> bytes:
+    """One JSON line: time, level, logger, message and the record's ``access`` fields."""
+    line: Dict[str, Any] = {
+        'ts': datetime.fromtimestamp(record.created, timezone.utc),
+        'level': record.levelname,
+        'logger': record.name,
+        'message': record.getMessage(),
+    }
+    access = getattr(record, 'access', None)
+    if access:
+        line.update(access)
+    if record.exc_info:
+        line['exc'] = logging.Formatter().formatException(record.exc_info)
+    return orjson.dumps(line, option=orjson.OPT_APPEND_NEWLINE)
+
+
+class QueueHandler(logging.Handler):
+    """Hands records to a bounded queue; never blocks, drops (and counts) when full."""
+
+    def __init__(self, queue_size: int):
+        super().__init__()
+        self.queue: queue.Queue = queue.Queue(max(1, queue_size))
+        self.dropped = 0
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # The queue is thread-safe: skip the handler lock that emit() runs under.
+        if not self.filter(record):
+            return False
+        self.emit(record)
+        return True
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            ACCESS_LOG_DROPPED.inc(())
+
+
+class BatchWriter:
+    """Thread writing the records of a :class:`QueueHandler` in batches.
+
+    Records are formatted on this thread, so a request never waits on
+    JSON encoding or on the output. Output goes to *stream* (a binary
+    stream the caller owns) or to the file *path*; neither means stdout.
+    """
+
+    def __init__(self, handler: QueueHandler, path: str = '', batch_size: int = 512,
+                 stream: Optional[IO[bytes]] = None, flush_interval: float = 0.05):
+        self.handler = handler
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.stream = stream
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._stream: Optional[IO[bytes]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Open the output and start the thread (per worker, after the fork)."""
+        if self._thread is not None:
+            return
+        if self.stream is not None:
+            self._stream = self.stream
+        else:
+            self._stream = open(self.path, 'ab') if self.path else sys.stdout.buffer
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Write everything queued so far, then stop the thread."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        if self.stream is None and self.path:
+            self._stream.close()
+        self._stream = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+        self._drain()  # what was queued before stop()
+
+    def _drain(self) -> None:
+        q = self.handler.queue
+        while True:
+            lines: List[bytes] = []
+            while len(lines) < self.batch_size:
+                try:
+                    record = q.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    lines.append(json_line(record))
+                except Exception:
+                    self.handler.handleError(record)
+            if not lines:
+                return
+            self._write(b''.join(lines))
+            self.written += len(lines)
+
+    def _write(self, data: bytes) -> None:
+        try:
+            self._stream.write(data)
+            self._stream.flush()
+        except (OSError, ValueError):
+            pass  # output gone (closed pipe): nothing sensible left to do with logs
+
+
+def install(logger_name: str, path: str = '', queue_size: int = 10000, batch_size: int = 512) -> BatchWriter:
+    """Route *logger_name* (and its children) through a queue; return the (unstarted) writer."""
+    handler = QueueHandler(queue_size)
+    logger = logging.getLogger(logger_name)
+    logger.addHandler(handler)
+    logger.propagate = False
+    # The access log (``<logger_name>.access``) is switched on by its own
+    # setting, whatever APP_LOG_LEVEL is.
+    logging.getLogger(f'{logger_name}.access').setLevel(logging.INFO)
+    return BatchWriter(handler, path, batch_size)
@@ -0,0 +1,197 @@
+"""Batch routes: many items per request, one NDJSON result line per item.
+
+Input is either a JSON array (``application/json``) or newline-delimited JSON
+(``application/x-ndjson``, one value per line, blank lines ignored). NDJSON
+bodies are parsed incrementally while results are written back, so a client
+can pipeline an unbounded stream of records over a single connection.
+
+Output is always NDJSON, one line per input item, **in input order**, each
+line carrying the zero-based ``index`` of its item:
+
+- success: ``{"index": 0, "result": ...}`` (encrypt/decrypt),
+  ``{"index": 0, "signature": "..."}`` (sign, plus ``"alg"`` unless HMAC-SHA256), ``{"index": 0, "valid": true}``
+  (verify);
+- failure: ``{"index": 0, "error": "...", "code": "..."}``, i.e. the usual
+  :class:`APIErrorResponse` body plus the index. A failing item never aborts
+  the rest of the batch.
+
+A JSON array body is limited to ``APP_MAX_BODY_BYTES`` as a whole; NDJSON
+bodies are unbounded and each line is limited to ``APP_MAX_BODY_BYTES``.
+"""
+from __future__ import annotations
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+import orjson
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.config import settings
+from app.deps import EncryptorDep, SignerDep
+from app.errors import APIError
+from app.signature.registry import ALG_DESCRIPTION
+from app import ops
+
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+BATCH_PATHS = ('/encrypt/batch', '/decrypt/batch', '/sign/batch', '/verify/batch')
+
+router = APIRouter()
+
+# Sentinel yielded by the NDJSON reader for a line longer than the item limit.
+_OVERSIZED = object()
+
+
+class NdjsonStreamingResponse(StreamingResponse):
+    """Streaming response that does not compete for ``receive``.
+
+    Starlette's ``StreamingResponse`` reads ``receive`` in the background to
+    detect disconnects, which would swallow request-body chunks that the
+    batch generator is still consuming. Here the body iterator owns
+    ``receive``; a disconnect surfaces as ``ClientDisconnect`` from
+    ``request.stream()`` instead.
+    """
+
+    def __init__(self, content: AsyncIterator[bytes]):
+        super().__init__(content, media_type=NDJSON_MEDIA_TYPE)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+
+
+async def _iter_ndjson_lines(request: Request, max_line: int) -> AsyncIterator[Any]:
+    """Yield raw non-blank NDJSON lines as they arrive (``_OVERSIZED`` if too long).
+
+    Pending bytes are kept in one ``bytearray`` and only newly received
+    bytes are searched for newlines, so a long line arriving in many small
+    chunks costs linear time.
+    """
+    buf = bytearray()
+    scanned = 0  # buf[:scanned] holds no newline
+    skipping = False
+    async for chunk in request.stream():
+        if skipping:
+            # Drop the rest of an oversized line, up to its newline.
+            nl = chunk.find(b'\n')
+            if nl < 0:
+                continue
+            chunk = chunk[nl + 1:]
+            skipping = False
+        buf += chunk
+        start = 0
+        nl = buf.find(b'\n', scanned)
+        while nl >= 0:
+            if nl - start > max_line:
+                yield _OVERSIZED
+            else:
+                line = bytes(buf[start:nl])
+                if line.strip():
+                    yield line
+            start = nl + 1
+            nl = buf.find(b'\n', start)
+        del buf[:start]  # O(1) for a bytearray prefix
+        scanned = len(buf)
+        if scanned > max_line:
+            yield _OVERSIZED
+            buf.clear()
+            scanned = 0
+            skipping = True
+    if buf.strip():
+        yield bytes(buf)
+
+
+async def _iter_items(request: Request) -> AsyncIterator[Any]:
+    """Yield raw items (bytes to parse, or already-parsed values)."""
+    content_type = request.headers.get('content-type', '').split(';', 1)[0].strip().lower()
+    if content_type == NDJSON_MEDIA_TYPE:
+        async for line in _iter_ndjson_lines(request, settings.max_body_bytes):
+            yield line
+        return
+    # Batch paths bypass the global body-size guard, so bound the buffered
+    # array here while it is read.
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > settings.max_body_bytes:
+            raise APIError(status_code=413, code='payload_too_large', message='Payload too large')
+    try:
+        items = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        raise APIError(status_code=400, code='invalid_json', message='Body must be a JSON array or NDJSON.')
+    if not isinstance(items, list):
+        raise APIError(status_code=400, code='root_not_array', message='Batch body must be a JSON array.')
+    for item in items:
+        yield _Parsed(item)
+
+
+class _Parsed:
+    """Wrapper marking an item that is already a Python value."""
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+async def _run_batch(
+    request: Request, handle: Callable[[Any], Dict[str, Any]]) -> StreamingResponse:
+    """Apply *handle* to every item and stream the NDJSON results."""
+    items = _iter_items(request)
+    # Fail fast (plain error response) if a JSON array body is malformed.
+    try:
+        first = await items.__anext__()
+    except StopAsyncIteration:
+        first = None
+
+    async def _results() -> AsyncIterator[bytes]:
+        if first is None:
+            return
+        yield _render(0, first)
+        index = 1
+        async for raw in items:
+            yield _render(index, raw)
+            index += 1
+
+    def _render(index: int, raw: Any) -> bytes:
+        if raw is _OVERSIZED:
+            return ops.item_error_line(index, 'payload_too_large', 'Item too large')
+        if isinstance(raw, _Parsed):
+            value = raw.value
+        else:
+            try:
+                value = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                return ops.item_error_line(index, 'invalid_json', 'Item is not valid JSON')
+        try:
+            out = handle(value)
+        except APIError as exc:
+            return ops.item_error_line(index, exc.code, exc.message)
+        except Exception:
+            return ops.item_error_line(index, 'internal_error', 'Internal Server Error')
+        return orjson.dumps({'index': index, **out}) + b'\n'
+
+    return NdjsonStreamingResponse(_results())
+
+
+@router.post('/encrypt/batch', summary='Encrypt many objects; NDJSON results in input order')
+async def encrypt_batch(request: Request, encryptor: EncryptorDep):
+    """Batch form of ``/encrypt``; each item must be a JSON object."""
+    return await _run_batch(request, lambda v: ops.encrypt_item(encryptor, v))
+
+
+@router.post('/decrypt/batch', summary='Decrypt many objects; NDJSON results in input order')
+async def decrypt_batch(request: Request, encryptor: EncryptorDep):
+    """Batch form of ``/decrypt``; each item must be a JSON object."""
+    return await _run_batch(request, lambda v: ops.decrypt_item(encryptor, v))
+
+
+@router.post('/sign/batch', summary='Sign many JSON values; NDJSON results in input order')
+async def sign_batch(request: Request, signer: SignerDep,
+                     alg: Optional[str] = Query(None, description=ALG_DESCRIPTION)):
+    """Batch form of ``/sign``; items may be any JSON value."""
+    if alg is not None:
+        signer = signer.for_algorithm(alg)
+    return await _run_batch(request, lambda v: ops.sign_item(signer, v))
+
+
+@router.post('/verify/batch', summary='Verify many signatures; NDJSON results in input order')
+async def verify_batch(request: Request, signer: SignerDep):
+    """Batch form of ``/verify``; each item is ``{"signature": ..., "data": {...}}``."""
+    return await _run_batch(request, lambda v: ops.verify_item(signer, v))
@@ -0,0 +1,208 @@
+"""Offline bulk processing of NDJSON files: ``python -m app.cli sign|verify|encrypt|decrypt``.
+
+For backfills that would otherwise replay millions of records through the
+HTTP API::
+
+    python -m app.cli sign records.ndjson -o signatures.ndjson
+    python -m app.cli verify signed.ndjson --workers 8 --unordered -o /dev/null
+
+Each input line is one item, handled as in the ``/<op>/batch`` routes
+(app/batch.py), and each output line has that route's result shape
+(``{"index": 0, "signature": ...}``, ``{"index": 0, "error": ..., "code": ...}``,
+...). Unlike those routes, which number items sequentially, ``index`` is
+the zero-based line number in the input, so a result points straight at
+its record: blank lines are skipped but still counted.
+Strategies and keys come from the usual settings (``RIOT_HMAC_SECRET`` or
+``APP_KEYRING_FILE``, ``APP_ENCRYPTOR``...), through :mod:`app.deps`.
+
+The input is cut into chunks of about ``--chunk-bytes`` at line boundaries
+and the chunks are processed on a pool of ``--workers`` processes (default:
+the usable CPUs). A regular file is memory-mapped and each worker maps its
+own chunk, so only offsets cross the process boundary; stdin is read in
+large blocks. At most two chunks per worker are in flight, so memory stays
+bounded whatever the file size. Output is written one chunk at a time in
+input order, or as chunks complete with ``--unordered``. Throughput goes to
+stderr; the exit status is 1 if any item failed.
+"""
+from __future__ import annotations
+import argparse
+import mmap
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from typing import IO, Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+import orjson
+from app import ops
+from app.deps import get_encryptor, get_signer
+from app.errors import APIError
+from app.utils.cpus import available_cpus
+
+OPS: Dict[str, Tuple[Callable[[Any, Any], Dict[str, Any]], Callable[[], Any]]] = {
+    'encrypt': (ops.encrypt_item, get_encryptor),
+    'decrypt': (ops.decrypt_item, get_encryptor),
+    'sign': (ops.sign_item, get_signer),
+    'verify': (ops.verify_item, get_signer),
+}
+CHUNK_BYTES = 8 * 1024 * 1024
+WRITE_BUFFER_BYTES = 1024 * 1024
+_DONTNEED = getattr(mmap, 'MADV_DONTNEED', None)
+
+# A chunk is raw bytes (stdin) or ``(path, start, end)`` in a regular file.
+Chunk = Union[bytes, Tuple[str, int, int]]
+
+
+def process_chunk(op: str, chunk: Chunk, first_index: int) -> Tuple[bytes, int, int]:
+    """Run *op* on every line of *chunk*; return ``(output, items, failed)``."""
+    if isinstance(chunk, bytes):
+        data = chunk
+    else:
+        path, start, end = chunk
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data = mm[start:end]
+    handle, strategy = OPS[op][0], OPS[op][1]()
+    out: List[bytes] = []
+    items = failed = 0
+    for index, line in enumerate(data.split(b'\n'), first_index):
+        if not line.strip():
+            continue
+        items += 1
+        try:
+            result = handle(strategy, orjson.loads(line))
+        except orjson.JSONDecodeError:
+            out.append(ops.item_error_line(index, 'invalid_json', 'Item is not valid JSON'))
+        except APIError as exc:
+            out.append(ops.item_error_line(index, exc.code, exc.message))
+        except Exception:
+            out.append(ops.item_error_line(index, 'internal_error', 'Internal Server Error'))
+        else:
+            out.append(orjson.dumps({'index': index, **result}) + b'\n')
+            continue
+        failed += 1
+    return b''.join(out), items, failed
+
+
+def file_chunks(path: str, chunk_bytes: int) -> Iterator[Tuple[Chunk, int]]:
+    """``((path, start, end), first_index)`` for chunks of a regular file, cut after a newline."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start, index = 0, 0
+            while start < size:
+                nl = mm.find(b'\n', min(start + chunk_bytes, size) - 1)
+                end = size if nl < 0 else nl + 1
+                yield (path, start, end), index
+                # Line numbers: only this one scan of the chunk happens in the parent.
+                index += mm[start:end].count(b'\n')
+                if _DONTNEED is not None:
+                    # Drop the scanned pages from this process (they stay in the page cache),
+                    # or RSS would grow to the size of the file.
+                    aligned = start - start % mmap.PAGESIZE
+                    mm.madvise(_DONTNEED, aligned, end - aligned)
+                start = end
+
+
+def stream_chunks(stream: IO[bytes], chunk_bytes: int) -> Iterator[Tuple[Chunk, int]]:
+    """``(bytes, first_index)`` for blocks of *stream*, each completed to the end of a line."""
+    index = 0
+    while True:
+        block = stream.read(chunk_bytes)
+        if not block:
+            return
+        if not block.endswith(b'\n'):
+            block += stream.readline()
+        yield block, index
+        index += block.count(b'\n')
+
+
+def run(op: str, chunks: Iterator[Tuple[Chunk, int]], out: IO[bytes], workers: int,
+        ordered: bool = True) -> Tuple[int, int]:
+    """Process *chunks*, writing results to *out*; return ``(items, failed)``."""
+    items = failed = 0
+
+    def write(result: Tuple[bytes, int, int]) -> None:
+        nonlocal items, failed
+        out.write(result[0])
+        items += result[1]
+        failed += result[2]
+
+    if workers <= 1:
+        for chunk, first in chunks:
+            write(process_chunk(op, chunk, first))
+        return items, failed
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        _drain(pool, op, chunks, write, 2 * workers, ordered)
+    return items, failed
+
+
+def _drain(pool: Executor, op: str, chunks: Iterator[Tuple[Chunk, int]],
+           write: Callable[[Tuple[bytes, int, int]], None], window: int, ordered: bool) -> None:
+    pending: Deque[Future] = deque()
+    for chunk, first in chunks:
+        if len(pending) >= window:
+            _complete(pending, write, ordered)
+        pending.append(pool.submit(process_chunk, op, chunk, first))
+    while pending:
+        _complete(pending, write, ordered)
+
+
+def _complete(pending: Deque[Future], write: Callable[[Tuple[bytes, int, int]], None], ordered: bool) -> None:
+    """Write at least one finished chunk: the oldest one, or with *ordered* off, any."""
+    if ordered:
+        write(pending.popleft().result())
+        return
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+        write(future.result())
+
+
+def _positive_int(text: str) -> int:
+    try:
+        value = int(text)
+    except ValueError:
+        value = 0
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'expected a positive integer, got {text!r}')
+    return value
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m app.cli', description=__doc__.splitlines()[0])
+    parser.add_argument('op', choices=sorted(OPS))
+    parser.add_argument('input', help='NDJSON file, or - for stdin')
+    parser.add_argument('-o', '--output', default='-', help='output file (default: stdout)')
+    parser.add_argument('--workers', type=_positive_int, help='processes (default: usable CPUs; 1 = no pool)')
+    parser.add_argument('--chunk-bytes', type=_positive_int, default=CHUNK_BYTES)
+    parser.add_argument('--unordered', action='store_true', help='write chunks as they complete')
+    args = parser.parse_args(argv)
+    workers = args.workers or available_cpus()
+
+    try:
+        OPS[args.op][1]()  # fail before reading anything if the key is missing
+    except APIError as exc:
+        print(f'error: {exc.message}', file=sys.stderr)
+        return 2
+    if args.input == '-':
+        chunks = stream_chunks(sys.stdin.buffer, args.chunk_bytes)
+    else:
+        chunks = file_chunks(args.input, args.chunk_bytes)
+
+    start = time.perf_counter()
+    if args.output == '-':
+        items, failed = run(args.op, chunks, sys.stdout.buffer, workers, not args.unordered)
+        sys.stdout.buffer.flush()
+    else:
+        with open(args.output, 'wb', buffering=WRITE_BUFFER_BYTES) as out:
+            items, failed = run(args.op, chunks, out, workers, not args.unordered)
+    elapsed = time.perf_counter() - start
+    print(f'{args.op}: {items} records ({failed} failed) in {elapsed:.2f} s, '
+          f'{items / elapsed if elapsed else 0:,.0f} records/s, {workers} worker(s)', file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,8 +7,66 @@ class Settings(BaseSettings):
     """Application configuration loaded from environment (.env supported)."""
 
     hmac_secret: str = Field('', alias='RIOT_HMAC_SECRET')
+    # Optional keyring (key ids, per-tenant rings); replaces RIOT_HMAC_SECRET when set.
+    keyring_file: str = Field('', alias='APP_KEYRING_FILE')
+    keyring_reload_seconds: float = Field(2.0, alias='APP_KEYRING_RELOAD_SECONDS')
+    keyring_cache_entries: int = Field(1024, alias='APP_KEYRING_CACHE_ENTRIES')
+    # Default signature algorithm: hmac-sha256 | hmac-sha512-256 | blake2b (see app/signature/registry.py).
+    signature_alg: str = Field('hmac-sha256', alias='APP_SIGNATURE_ALG')
     log_level_str: str = Field('INFO', alias='APP_LOG_LEVEL')
+    # Encryptor strategy: base64 (encoding only) | aes-gcm (needs a 16/24/32-byte Base64 key).
+    encryptor: str = Field('base64', alias='APP_ENCRYPTOR')
+    encryption_key: str = Field('', alias='APP_ENCRYPTION_KEY')
     max_body_bytes: int = Field(2 * 1024 * 1024, alias='APP_MAX_BODY_BYTES')
+    # Separate limit for the streaming routes (bodies are spooled to disk).
+    max_stream_body_bytes: int = Field(1024 * 1024 * 1024, alias='APP_MAX_STREAM_BODY_BYTES')
+    # Optional LRU caches (0 entries = disabled), bounded by entries and bytes.
+    decrypt_cache_entries: int = Field(0, alias='APP_DECRYPT_CACHE_ENTRIES')
+    decrypt_cache_bytes: int = Field(32 * 1024 * 1024, alias='APP_DECRYPT_CACHE_BYTES')
+    sign_cache_entries: int = Field(0, alias='APP_SIGN_CACHE_ENTRIES')
+    sign_cache_bytes: int = Field(32 * 1024 * 1024, alias='APP_SIGN_CACHE_BYTES')
+    # Compress /encrypt, /decrypt, /sign responses of at least this size per Accept-Encoding (0 = never).
+    compress_min_bytes: int = Field(1024, alias='APP_COMPRESS_MIN_BYTES')
+    # Bodies of at least APP_OFFLOAD_THRESHOLD_BYTES run on a pool (off|thread|process).
+    offload_mode: str = Field('thread', alias='APP_OFFLOAD_MODE')
+    offload_threshold_bytes: int = Field(256 * 1024, alias='APP_OFFLOAD_THRESHOLD_BYTES')
+    offload_max_workers: int = Field(0, alias='APP_OFFLOAD_MAX_WORKERS')  # 0 = min(4, CPUs)
+    offload_max_queue: int = Field(16, alias='APP_OFFLOAD_MAX_QUEUE')
+    # Admission control per worker: concurrency (adaptive between min and max), in-flight body bytes and a
+    # short wait queue; beyond that requests get 503 + Retry-After.
+    admission_enabled: bool = Field(True, alias='APP_ADMISSION_ENABLED')
+    admission_adaptive: bool = Field(True, alias='APP_ADMISSION_ADAPTIVE')
+    admission_max_concurrency: int = Field(128, alias='APP_ADMISSION_MAX_CONCURRENCY')
+    admission_min_concurrency: int = Field(4, alias='APP_ADMISSION_MIN_CONCURRENCY')
+    admission_max_inflight_bytes: int = Field(64 * 1024 * 1024, alias='APP_ADMISSION_MAX_INFLIGHT_BYTES')
+    admission_queue_size: int = Field(64, alias='APP_ADMISSION_QUEUE_SIZE')
+    admission_queue_timeout_ms: float = Field(200.0, alias='APP_ADMISSION_QUEUE_TIMEOUT_MS')
+    admission_retry_after_seconds: int = Field(1, alias='APP_ADMISSION_RETRY_AFTER_SECONDS')
+    # Unix-domain-socket sidecar transport (framed binary protocol) next to HTTP; empty path = off.
+    sidecar_socket: str = Field('', alias='APP_SIDECAR_SOCKET')
+    sidecar_max_in_flight: int = Field(64, alias='APP_SIDECAR_MAX_IN_FLIGHT')  # offloaded requests per connection
+    # Opt-in JSON-lines access log (and app logs), queued and written by a background thread.
+    access_log_enabled: bool = Field(False, alias='APP_ACCESS_LOG_ENABLED')
+    access_log_file: str = Field('', alias='APP_ACCESS_LOG_FILE')  # '' = stdout
+    access_log_sample_rate: float = Field(1.0, alias='APP_ACCESS_LOG_SAMPLE_RATE')  # 2xx/3xx only; errors always
+    access_log_queue_size: int = Field(10000, alias='APP_ACCESS_LOG_QUEUE_SIZE')
+    access_log_batch_size: int = Field(512, alias='APP_ACCESS_LOG_BATCH_SIZE')
+    # /metrics; with APP_METRICS_DIR set, workers share snapshots through that directory.
+    metrics_enabled: bool = Field(True, alias='APP_METRICS_ENABLED')
+    metrics_dir: str = Field('', alias='APP_METRICS_DIR')
+    metrics_flush_seconds: float = Field(5.0, alias='APP_METRICS_FLUSH_SECONDS')
+    # Opt-in /health/diag: event-loop stall detector and sampling profiler.
+    diag_enabled: bool = Field(False, alias='APP_DIAG_ENABLED')
+    diag_lag_threshold_ms: float = Field(100.0, alias='APP_DIAG_LAG_THRESHOLD_MS')
+    diag_profile_dir: str = Field('', alias='APP_DIAG_PROFILE_DIR')  # '' = system temp dir
+    diag_profile_max_seconds: float = Field(60.0, alias='APP_DIAG_PROFILE_MAX_SECONDS')
+
+    # Production server (python -m app.serve / app/gunicorn_conf.py).
+    bind: str = Field('0.0.0.0:8000', alias='APP_BIND')
+    workers: int = Field(0, alias='APP_WORKERS')  # 0 = usable CPUs
+    keepalive_seconds: int = Field(5, alias='APP_KEEPALIVE_SECONDS')
+    backlog: int = Field(2048, alias='APP_BACKLOG')
+    graceful_timeout_seconds: int = Field(30, alias='APP_GRACEFUL_TIMEOUT_SECONDS')
 
     model_config = SettingsConfigDict(
         env_file='.env',
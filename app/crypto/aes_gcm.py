@@ -0,0 +1,138 @@
+from __future__ import annotations
+import base64
+import binascii
+import os
+import re
+import threading
+import weakref
+import orjson
+from typing import Any, Iterator
+from .base import NOT_A_TOKEN, Encryptor
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # optional dependency, only needed for APP_ENCRYPTOR=aes-gcm
+    AESGCM = None
+    InvalidTag = Exception
+
+VERSION = 1
+_VERSION_BYTE = bytes((VERSION,))
+_URLSAFE = bytes.maketrans(b'+/', b'-_')
+_NONCE_PREFIX_BYTES = 8
+# A prefix is retired after 2**32 nonces, so the 4-byte counter never wraps.
+_COUNTER_LIMIT = 1 << 32
+# Nonces are built this many at a time and handed out from a list iterator.
+_NONCE_BATCH = 1024
+_TAG_BYTES = 16
+# Token: base64url, unpadded, of version(1) || nonce(12) || ciphertext || tag(16).
+# Version 1 encodes to a leading 'A'; the shortest token holds 1 byte of JSON.
+_MIN_TOKEN_CHARS = -(-(1 + 12 + 1 + _TAG_BYTES) * 4 // 3)
+_TOKEN_RE = re.compile(r'A[A-Za-z0-9_-]+')
+
+# Live encryptors, re-seeded in fork children so parent and child never share a nonce prefix.
+_instances: 'weakref.WeakSet[AesGcmEncryptor]' = weakref.WeakSet()
+
+
+def _reseed_after_fork() -> None:
+    for instance in list(_instances):
+        instance._reseed()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reseed_after_fork)
+
+
+def decode_key(text: str) -> bytes:
+    """Decode a Base64 (standard or URL-safe) AES key of 16, 24 or 32 bytes."""
+    text = text.strip()
+    try:
+        key = base64.b64decode(text.replace('-', '+').replace('_', '/') + '=' * (-len(text) % 4), validate=True)
+    except binascii.Error:
+        raise ValueError('encryption key must be Base64') from None
+    if len(key) not in (16, 24, 32):
+        raise ValueError(f'encryption key must be 16, 24 or 32 bytes, got {len(key)}')
+    return key
+
+
+class AesGcmEncryptor(Encryptor):
+    """Depth-1 encryptor using AES-GCM over JSON(value).
+
+
+    The AESGCM object (key schedule) is built once per key and reused for
+    every field. Nonces are 96-bit: a random 64-bit prefix drawn once per
+    instance (and again after ``fork`` or 2**32 uses) followed by a 32-bit
+    counter, pre-built in batches of ``_NONCE_BATCH``; there is no
+    ``os.urandom`` call per field and nonces never repeat within an
+    instance. Tokens are compact and versioned: unpadded base64url of
+    ``version || nonce || ciphertext || tag``.
+    """
+
+    def __init__(self, key: bytes):
+        if AESGCM is None:
+            raise RuntimeError('AES-GCM encryption requires the "cryptography" package')
+        self._key = key
+        self._aead = AESGCM(key)
+        self._lock = threading.Lock()
+        self._reseed()
+        _instances.add(self)
+
+    def __reduce__(self):
+        # Rebuilt from the key (for process pools); the copy draws its own prefix.
+        return (type(self), (self._key,))
+
+    def _reseed(self) -> None:
+        self._prefix = os.urandom(_NONCE_PREFIX_BYTES)
+        self._counter = 0
+        # Drops any batch built from the old prefix (e.g. inherited across fork).
+        self._batch: Iterator[bytes] = iter(())
+
+    def _nonce(self) -> bytes:
+        try:
+            return next(self._batch)  # atomic under the GIL
+        except StopIteration:
+            return self._refill()
+
+    def _refill(self) -> bytes:
+        with self._lock:
+            try:
+                return next(self._batch)  # another thread refilled first
+            except StopIteration:
+                pass
+            if self._counter >= _COUNTER_LIMIT:
+                self._reseed()
+            start, prefix = self._counter, self._prefix
+            self._counter += _NONCE_BATCH
+            self._batch = iter([prefix + n.to_bytes(4, 'big') for n in range(start, start + _NONCE_BATCH)])
+            return next(self._batch)
+
+    def encrypt_value(self, value: Any) -> str:
+        """Serialize *value* to JSON and seal it into a versioned token."""
+        nonce = self._nonce()
+        blob = _VERSION_BYTE + nonce + self._aead.encrypt(nonce, orjson.dumps(value), None)
+        return binascii.b2a_base64(blob, newline=False).translate(_URLSAFE).rstrip(b'=').decode('ascii')
+
+    def decrypt_value(self, token: str) -> Any:
+        """Open a token produced by :meth:`encrypt_value`.
+
+
+        Raises:
+        ValueError: If the token is malformed, has an unknown version or
+        fails authentication (wrong key or tampered).
+        """
+        value = self.try_decrypt_value(token)
+        if value is NOT_A_TOKEN:
+            raise ValueError('invalid AES-GCM token')
+        return value
+
+    def try_decrypt_value(self, token: str) -> Any:
+        if len(token) < _MIN_TOKEN_CHARS or len(token) % 4 == 1 or _TOKEN_RE.fullmatch(token) is None:
+            return NOT_A_TOKEN
+        blob = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        if blob[0] != VERSION:
+            return NOT_A_TOKEN
+        try:
+            plain = self._aead.decrypt(blob[1:13], blob[13:], None)
+        except InvalidTag:
+            return NOT_A_TOKEN
+        return orjson.loads(plain)
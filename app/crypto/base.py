@@ -1,6 +1,21 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Dict
+import orjson
+
+class _NotAToken:
+    """Type of :data:`NOT_A_TOKEN`."""
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return 'NOT_A_TOKEN'
+
+    def __reduce__(self):
+        return 'NOT_A_TOKEN'
+
+# Returned by :meth:`Encryptor.try_decrypt_value` for strings that are not
+# tokens (``None`` cannot be used: it is a valid decrypted JSON value).
+NOT_A_TOKEN: Any = _NotAToken()
 
 class Encryptor(ABC):
     """Abstract interface for a depth-1 property encryptor.
@@ -36,3 +51,25 @@ class Encryptor(ABC):
         Exception: If token is invalid (callers may choose to keep original).
         """
         raise NotImplementedError
+
+    def encrypt_object_to_bytes(self, obj: Dict[str, Any]) -> bytes:
+        """Encrypt every depth-1 value of *obj* and return the result as JSON bytes.
+
+        Equal to ``orjson.dumps({k: self.encrypt_value(v) for k, v in obj.items()})``,
+        which is what this default does. Used by ``/encrypt`` for JSON output;
+        implementations whose tokens never need JSON escaping can override it
+        to write keys and tokens straight into the response body.
+        """
+        return orjson.dumps({k: self.encrypt_value(v) for k, v in obj.items()})
+
+    def try_decrypt_value(self, token: str) -> Any:
+        """Like :meth:`decrypt_value`, but return :data:`NOT_A_TOKEN` instead of raising.
+
+        Used where non-tokens are expected and simply kept (``/decrypt``).
+        Implementations should override this with a cheap pre-screen so that
+        ordinary strings are rejected without raising and catching.
+        """
+        try:
+            return self.decrypt_value(token)
+        except Exception:
+            return NOT_A_TOKEN
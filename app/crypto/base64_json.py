@@ -1,8 +1,19 @@
 from __future__ import annotations
 import base64
+import binascii
+import io
+import re
 import orjson
-from typing import Any
-from .base import Encryptor
+from typing import Any, Dict
+from .base import NOT_A_TOKEN, Encryptor
+
+_B64_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+# Bytes a JSON text can start with (orjson allows leading whitespace).
+_JSON_FIRST_BYTES = b' \t\n\r{["-0123456789tfn'
+# The first Base64 character carries the top 6 bits of the first byte.
+_TOKEN_FIRST_CHARS = frozenset(_B64_ALPHABET[b >> 2] for b in _JSON_FIRST_BYTES)
+# Strict Base64 only allows '=' as trailing padding.
+_TOKEN_RE = re.compile(r'[A-Za-z0-9+/]+=*')
 
 class Base64JsonEncryptor(Encryptor):
     """Depth-1 encryptor using Base64(JSON(value)).
@@ -26,6 +37,28 @@ class Base64JsonEncryptor(Encryptor):
         payload = orjson.dumps(value)
         return base64.b64encode(payload).decode('utf-8')
 
+    def encrypt_object_to_bytes(self, obj: Dict[str, Any]) -> bytes:
+        """Fused :meth:`encrypt_value` over *obj* and JSON rendering of the result.
+
+        Base64 output is ASCII without quotes or backslashes, so tokens are
+        written into the response buffer as-is, with no ``str`` round trip, no
+        intermediate dict and no second escaping pass. Keys still go through
+        ``orjson`` for escaping. Output is byte-identical to the default.
+        """
+        dumps, b2a = orjson.dumps, binascii.b2a_base64
+        out = io.BytesIO()
+        write = out.write
+        write(b'{')
+        for key, value in obj.items():
+            write(dumps(key))
+            write(b':"')
+            write(b2a(dumps(value), newline=False))
+            write(b'",')
+        if out.tell() > 1:
+            out.seek(-1, io.SEEK_CUR)  # overwrite the trailing comma
+        write(b'}')
+        return out.getvalue()
+
     def decrypt_value(self, token: str) -> Any:
         """Decode Base64 token and parse the JSON payload back to Python.
 
@@ -41,3 +74,22 @@ class Base64JsonEncryptor(Encryptor):
         """
         raw = base64.b64decode(token.encode('utf-8'), validate=True)
         return orjson.loads(raw)
+
+    def try_decrypt_value(self, token: str) -> Any:
+        """:meth:`decrypt_value` returning ``NOT_A_TOKEN`` instead of raising.
+
+        Cheap necessary conditions are checked first, so most plain strings
+        (dates, names, ...) are rejected without an exception: the first
+        character must decode to a byte a JSON text can start with, an
+        unpadded token must be a multiple of 4 long, and only Base64
+        characters with trailing padding are allowed. Anything passing the
+        screen gets the full decode, so results are identical to
+        :meth:`decrypt_value`.
+        """
+        if (not token or token[0] not in _TOKEN_FIRST_CHARS
+                or (len(token) % 4 and token[-1] != '=') or _TOKEN_RE.fullmatch(token) is None):
+            return NOT_A_TOKEN
+        try:
+            return orjson.loads(base64.b64decode(token.encode('utf-8'), validate=True))
+        except (binascii.Error, orjson.JSONDecodeError):
+            return NOT_A_TOKEN
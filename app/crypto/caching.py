@@ -0,0 +1,68 @@
+from __future__ import annotations
+from typing import Any, Dict
+import orjson
+from app.utils.lru import BoundedLRUCache
+from .base import NOT_A_TOKEN, Encryptor
+
+# Decrypted values that are safe to hand out as-is (immutable).
+_SCALARS = (str, int, float, bool, type(None))
+
+class _Json:
+    """Cached container value, stored as immutable JSON bytes."""
+    __slots__ = ('raw',)
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+
+_MISS = object()
+
+class CachingEncryptor(Encryptor):
+    """Encryptor decorator caching :meth:`decrypt_value` results by token.
+
+    Hot tokens (e.g. the same encrypted user fields in every session call)
+    skip the inner decode. Scalars are cached as values; containers are cached
+    as their JSON bytes and re-parsed on every hit, so callers never share a
+    mutable object. Invalid tokens are not cached (the inner error is raised
+    each time). Encryption is passed through unchanged.
+    """
+
+    def __init__(self, inner: Encryptor, cache: BoundedLRUCache):
+        self._inner = inner
+        self.cache = cache
+
+    def __reduce__(self):
+        # The cache is per process: pickling (e.g. for a process pool) ships
+        # only the wrapped strategy.
+        return self._inner.__reduce__()
+
+    def encrypt_value(self, value: Any) -> str:
+        return self._inner.encrypt_value(value)
+
+    def encrypt_object_to_bytes(self, obj: Dict[str, Any]) -> bytes:
+        return self._inner.encrypt_object_to_bytes(obj)
+
+    def decrypt_value(self, token: str) -> Any:
+        hit = self.cache.get(token, _MISS)
+        if hit is not _MISS:
+            return orjson.loads(hit.raw) if isinstance(hit, _Json) else hit
+        value = self._inner.decrypt_value(token)
+        self._store(token, value)
+        return value
+
+    def try_decrypt_value(self, token: str) -> Any:
+        hit = self.cache.get(token, _MISS)
+        if hit is not _MISS:
+            return orjson.loads(hit.raw) if isinstance(hit, _Json) else hit
+        value = self._inner.try_decrypt_value(token)
+        if value is not NOT_A_TOKEN:
+            self._store(token, value)
+        return value
+
+    def _store(self, token: str, value: Any) -> None:
+        if isinstance(value, _SCALARS):
+            size = len(token) + (len(value) if isinstance(value, str) else 8)
+            self.cache.put(token, value, size)
+        else:
+            raw = orjson.dumps(value)
+            self.cache.put(token, _Json(raw), len(token) + len(raw))
+
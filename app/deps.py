@@ -1,33 +1,140 @@
 from __future__ import annotations
-from typing import Annotated
-from fastapi import Depends
+from typing import Annotated, Dict, Optional, Tuple
+from fastapi import Depends, Header
 from app.crypto.base import Encryptor
 from app.crypto.base64_json import Base64JsonEncryptor
+from app.crypto.caching import CachingEncryptor
 from app.signature.base import Signer
+from app.signature.caching import CachingSigner
 from app.config import settings
-from app.signature.hmac_sha256 import HmacSha256Signer
+from app.signature.registry import ALGORITHMS, build_signer
+from app.signature.keyring import TENANT_HEADER, KeyringFile
 from app.errors import APIError
+from app.offload import Offloader
+from app.utils.lru import optional_cache
+
+_encryptor: Optional[Encryptor] = None
+
+def _build_encryptor() -> Encryptor:
+    """Strategy named by APP_ENCRYPTOR (503 if its key is missing or invalid)."""
+    if settings.encryptor == 'base64':
+        return Base64JsonEncryptor()
+    if settings.encryptor == 'aes-gcm':
+        # Imported here: loading the cryptography bindings is the costliest
+        # import of the app and only this strategy needs them.
+        from app.crypto.aes_gcm import AesGcmEncryptor, decode_key
+        if not settings.encryption_key:
+            raise APIError(status_code=503, code='encryption_key_missing', message='Encryption key missing')
+        try:
+            key = decode_key(settings.encryption_key)
+        except ValueError as exc:
+            raise APIError(status_code=503, code='encryption_key_invalid', message=str(exc))
+        try:
+            return AesGcmEncryptor(key)
+        except RuntimeError as exc:  # optional dependency not installed
+            raise APIError(status_code=503, code='encryptor_unavailable', message=str(exc))
+    raise APIError(status_code=503, code='encryptor_unknown', message=f'Unknown encryptor {settings.encryptor!r}')
 
 def get_encryptor() -> Encryptor:
     """Factory for the Encryptor used by the routes.
 
 
     Swap this implementation to change the encryption algorithm globally
-    without touching route logic.
+    without touching route logic. The strategy comes from APP_ENCRYPTOR;
+    built once per process; wrapped in a decrypt cache when
+    APP_DECRYPT_CACHE_ENTRIES > 0.
     """
-    return Base64JsonEncryptor()
+    global _encryptor
+    if _encryptor is None:
+        encryptor = _build_encryptor()
+        cache = optional_cache(settings.decrypt_cache_entries, settings.decrypt_cache_bytes)
+        if cache is not None:
+            encryptor = CachingEncryptor(encryptor, cache)
+        _encryptor = encryptor
+    return _encryptor
+
+# Process-wide signer, paired with the secret and algorithm it was built from.
+_signer: Optional[Tuple[Tuple[str, str], Signer]] = None
+# Process-wide keyring, paired with the file it was loaded from.
+_keyring: Optional[Tuple[str, KeyringFile]] = None
+
+def _signature_algorithm() -> str:
+    """APP_SIGNATURE_ALG, checked against the registry (503 if unknown)."""
+    algorithm = settings.signature_alg
+    if algorithm not in ALGORITHMS:
+        raise APIError(status_code=503, code='signature_alg_unknown',
+                       message=f'Unknown signature algorithm {algorithm!r}')
+    return algorithm
+
+def get_keyring() -> Optional[KeyringFile]:
+    """The keyring from APP_KEYRING_FILE (None when unset), loaded once per process."""
+    global _keyring
+    path = settings.keyring_file
+    if not path:
+        return None
+    cached = _keyring
+    if cached is None or cached[0] != path:
+        keyring = KeyringFile(path, settings.keyring_reload_seconds, settings.keyring_cache_entries,
+                              algorithm=_signature_algorithm())
+        cached = _keyring = (path, keyring)
+    return cached[1]
 
-def get_signer() -> Signer:
+def get_signer(tenant: Annotated[Optional[str], Header(alias=TENANT_HEADER)] = None) -> Signer:
     """Factory for the Signer used by the routes.
 
 
-    Reads RIOT_HMAC_SECRET from environment and returns an HMAC-based signer.
+    With APP_KEYRING_FILE set, returns the keyring signer of the tenant named
+    by the ``X-Tenant-ID`` header (default ring without it): signatures are
+    prefixed with a key id and verified against that one key.
+
+    Otherwise reads RIOT_HMAC_SECRET from environment and returns a signer
+    for APP_SIGNATURE_ALG (HMAC-SHA256 by default; see
+    app/signature/registry.py). The signer (and its pre-keyed state) is built
+    once per process and rebuilt only when the secret or algorithm changes;
+    ``signer.for_algorithm()`` gives the same key under another algorithm.
     """
-    if not settings.hmac_secret:
+    keyring = get_keyring()
+    if keyring is not None:
+        return keyring.signer(tenant)
+    global _signer
+    secret = settings.hmac_secret
+    if not secret:
         # Réponse API propre plutôt qu'un ValueError 500
         raise APIError(status_code=503, code="secret_missing", message="HMAC secret missing")
-    return HmacSha256Signer(secret=settings.hmac_secret.encode("utf-8"))
+    source = (secret, _signature_algorithm())
+    cached = _signer
+    if cached is None or cached[0] != source:
+        signer: Signer = build_signer(source[1], secret.encode("utf-8"))
+        cache = optional_cache(settings.sign_cache_entries, settings.sign_cache_bytes)
+        if cache is not None:
+            signer = CachingSigner(signer, cache)
+        cached = _signer = (source, signer)
+    return cached[1]
+
+def cache_stats() -> Dict[str, Optional[Dict[str, int]]]:
+    """Hit/miss/eviction counters of the decrypt and sign caches (None if disabled)."""
+    encryptor = _encryptor
+    signer = _signer[1] if _signer is not None else None
+    return {
+        'decrypt': encryptor.cache.stats() if isinstance(encryptor, CachingEncryptor) else None,
+        'sign': signer.cache.stats() if isinstance(signer, CachingSigner) else None,
+    }
+
+_offloader: Optional[Offloader] = None
+
+def get_offloader() -> Offloader:
+    """Process-wide size-aware executor policy for CPU-heavy route work."""
+    global _offloader
+    if _offloader is None:
+        _offloader = Offloader(
+            mode=settings.offload_mode,
+            threshold_bytes=settings.offload_threshold_bytes,
+            max_workers=settings.offload_max_workers,
+            max_queue=settings.offload_max_queue,
+        )
+    return _offloader
 
 # Typed FastAPI dependencies for better readability in route signatures
 EncryptorDep = Annotated[Encryptor, Depends(get_encryptor)]
 SignerDep = Annotated[Signer, Depends(get_signer)]
+OffloaderDep = Annotated[Offloader, Depends(get_offloader)]
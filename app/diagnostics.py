@@ -0,0 +1,191 @@
+"""Opt-in diagnostics: event-loop stall detector and sampling profiler.
+
+Enabled with ``APP_DIAG_ENABLED``; when off, nothing here is imported by the
+app, no task or thread runs and no route is mounted, so requests pay nothing.
+
+- :class:`LagMonitor`: a heartbeat task on the event loop and a watchdog
+  thread. When the heartbeat is late by more than the threshold, the
+  watchdog captures the loop thread's stack *while it is still blocked*,
+  plus the ``X-Request-ID`` of the request being served (the loop's current
+  task's ``request_id_var``, set by
+  :class:`~app.middleware.request_id.RequestIdMiddleware`). The stall's
+  duration is filled in once the loop resumes.
+- :class:`SamplingProfiler`: a thread sampling every thread's stack at a
+  fixed interval for a bounded time, written as collapsed stacks
+  (``frame;frame;frame count`` lines, ready for ``flamegraph.pl`` or
+  speedscope). Triggered per worker through ``POST /health/diag/profile``.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional
+from fastapi import APIRouter, Query
+from app.config import settings
+from app.errors import APIError
+from app.middleware.request_id import task_request_id
+
+logger = logging.getLogger('riot-crypto-api.diagnostics')
+
+
+class LagMonitor:
+    """Records event-loop stalls longer than *threshold_s*, with the blocking stack."""
+
+    def __init__(self, threshold_s: float, max_stalls: int = 100):
+        self.threshold_s = threshold_s
+        self.interval_s = max(threshold_s / 4, 0.001)
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=max_stalls)
+        self._beat = time.monotonic()
+        self._loop_thread: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start monitoring the running event loop (call from a coroutine)."""
+        self._loop_thread = threading.get_ident()
+        self._loop = asyncio.get_running_loop()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name='loop-lag-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval_s)
+
+    def _watch(self) -> None:
+        open_stall: Optional[Dict[str, Any]] = None
+        stalled_beat = 0.0
+        while not self._stop.wait(self.interval_s / 2):
+            beat = self._beat
+            if open_stall is not None:
+                if beat != stalled_beat:  # the loop ran again
+                    open_stall['duration_ms'] = round((beat - stalled_beat - self.interval_s) * 1e3, 1)
+                    logger.warning('event loop blocked for %.0f ms (request %s)',
+                                   open_stall['duration_ms'], open_stall['request_id'])
+                    open_stall = None
+                continue
+            late = time.monotonic() - beat - self.interval_s
+            if late > self.threshold_s:
+                open_stall = self._capture(late)
+                stalled_beat = beat
+                self.stalls.append(open_stall)
+
+    def _capture(self, late: float) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self._loop_thread)
+        return {
+            'detected_at': time.time(),
+            'detected_after_ms': round(late * 1e3, 1),
+            'duration_ms': None,  # set when the loop resumes
+            'request_id': task_request_id(asyncio.current_task(self._loop)),
+            'stack': traceback.format_stack(frame) if frame is not None else [],
+        }
+
+
+def _collapse(frame: Optional[FrameType]) -> str:
+    names: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Samples all threads' stacks for a bounded time; one run at a time."""
+
+    def __init__(self, output_dir: str, max_seconds: float):
+        self.output_dir = output_dir
+        self.max_seconds = max_seconds
+        self.running = False
+        self.last_path: Optional[str] = None
+        self.last_samples = 0
+        self._lock = threading.Lock()
+
+    def start(self, seconds: float, interval_s: float) -> str:
+        """Start a run in a background thread; return the output path."""
+        if seconds > self.max_seconds:
+            raise APIError(status_code=400, code='profile_too_long',
+                           message=f'Profiles are limited to {self.max_seconds:g} seconds')
+        with self._lock:
+            if self.running:
+                raise APIError(status_code=409, code='profile_running', message='A profile is already running')
+            self.running = True
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            path = os.path.join(self.output_dir, f'profile-{os.getpid()}-{time.strftime("%Y%m%d-%H%M%S")}.collapsed')
+            threading.Thread(target=self._run, args=(path, seconds, interval_s), name='sampling-profiler',
+                             daemon=True).start()
+        except BaseException:
+            self.running = False  # the run never started: free the slot
+            raise
+        return path
+
+    def sample(self, seconds: float, interval_s: float) -> Counter:
+        """Collapsed stack -> sample count, over *seconds* (this thread excluded)."""
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident != me:
+                    stacks[f'{names.get(ident, ident)};{_collapse(frame)}'] += 1
+            time.sleep(interval_s)
+        return stacks
+
+    def _run(self, path: str, seconds: float, interval_s: float) -> None:
+        try:
+            stacks = self.sample(seconds, interval_s)
+            with open(path, 'w', encoding='utf-8') as out:
+                for stack, count in stacks.most_common():
+                    out.write(f'{stack} {count}\n')
+            self.last_path, self.last_samples = path, sum(stacks.values())
+            logger.info('profile written to %s (%d samples)', path, self.last_samples)
+        finally:
+            self.running = False
+
+
+lag_monitor = LagMonitor(settings.diag_lag_threshold_ms / 1000)
+profiler = SamplingProfiler(settings.diag_profile_dir or tempfile.gettempdir(), settings.diag_profile_max_seconds)
+
+router = APIRouter(prefix='/health/diag', tags=['diagnostics'])
+
+
+@router.get('/stalls')
+async def stalls() -> dict:
+    """Recent event-loop stalls (oldest first) with the blocking stack and request id."""
+    return {'threshold_ms': lag_monitor.threshold_s * 1e3, 'stalls': list(lag_monitor.stalls)}
+
+
+@router.post('/profile', status_code=202)
+async def start_profile(seconds: float = Query(10, gt=0), interval_ms: float = Query(5, ge=1, le=1000)) -> dict:
+    """Profile this worker for *seconds*; collapsed stacks are written to a local file."""
+    path = profiler.start(seconds, interval_ms / 1000)
+    return {'path': path, 'seconds': seconds, 'interval_ms': interval_ms}
+
+
+@router.get('/profile')
+async def profile_status() -> dict:
+    """Whether a profile is running, and where the last one was written."""
+    return {'running': profiler.running, 'last_path': profiler.last_path, 'last_samples': profiler.last_samples}
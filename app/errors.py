@@ -1,7 +1,10 @@
 from __future__ import annotations
+from typing import Iterable, Tuple
+import orjson
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from starlette.types import Send
 
 class APIError(Exception):
     """Domain-specific API error carrying HTTP status & normalized code."""
@@ -12,10 +15,29 @@ class APIError(Exception):
         self.message = message
         super().__init__(message)
 
+    def __reduce__(self):
+        # Keep errors picklable across process-pool boundaries (app/offload.py).
+        return (type(self), (self.status_code, self.code, self.message))
+
 class APIErrorResponse(BaseModel):
     error: str
     code: str
 
+async def send_api_error(send: Send, exc: APIError, headers: Iterable[Tuple[bytes, bytes]] = ()) -> None:
+    """Write *exc* as a complete JSON response straight to an ASGI ``send``.
+
+    For pure ASGI middleware that rejects a request before the app (and its
+    exception handlers) runs. *headers* are added to the response.
+    """
+    body = orjson.dumps(APIErrorResponse(error=exc.message, code=exc.code).model_dump())
+    await send({
+        'type': 'http.response.start',
+        'status': exc.status_code,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode('latin-1')),
+                    *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
 def add_exception_handlers(app: FastAPI) -> None:
     """Register global exception handlers (domain & fallback)."""
 
@@ -0,0 +1,58 @@
+"""Gunicorn settings for production (what ``python -m app.serve`` runs).
+
+Also usable directly: ``gunicorn -c python:app.gunicorn_conf app.main:app``.
+Values come from :mod:`app.config` (``APP_BIND``, ``APP_WORKERS``, ...);
+gunicorn command-line flags override them.
+
+- Uvicorn workers (:class:`app.serve.UvicornWorker`), on uvloop and
+  httptools when they are installed.
+- One worker per usable CPU by default: workers are async, so more of them
+  than cores only adds context switches to the CPU-bound crypto work.
+- ``preload_app``: the master imports the app once and workers are forked
+  from it, sharing the imported pages and starting without importing
+  anything. Per-process state (signer, encryptor, offload pool, keyring,
+  metrics files) is built lazily, after the fork.
+"""
+from __future__ import annotations
+import glob
+import os
+from app.config import settings
+from app.utils.cpus import available_cpus
+
+
+bind = settings.bind
+workers = settings.workers or available_cpus()
+worker_class = 'app.serve.UvicornWorker'
+preload_app = True
+keepalive = settings.keepalive_seconds
+backlog = settings.backlog
+# SIGTERM: stop accepting, finish in-flight requests, run the lifespan
+# shutdown (offload pool); workers still running after this are killed.
+graceful_timeout = settings.graceful_timeout_seconds
+loglevel = settings.log_level_str.lower()
+
+
+def on_starting(server) -> None:
+    """Master start-up, before any worker is forked."""
+    if settings.metrics_dir:
+        # Totals of the previous run's workers (see app/metrics.py).
+        for path in glob.glob(os.path.join(settings.metrics_dir, '*.json*')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    if settings.sidecar_socket:
+        # Workers inherit the listening socket and all accept on it.
+        from app.sidecar.server import listen_socket
+        listen_socket(settings.sidecar_socket)
+    if server.cfg.preload_app:
+        # Loaded lazily by the first request that calls a sync dependency
+        # (~15 ms); importing it here spares every forked worker that cost.
+        import anyio._backends._asyncio  # noqa: F401
+
+
+def on_exit(server) -> None:
+    """Master shutdown, after the workers have stopped."""
+    if settings.sidecar_socket:
+        from app.sidecar.server import remove_socket
+        remove_socket()
@@ -1,53 +1,129 @@
 from __future__ import annotations
 import logging
-from typing import Any, Dict
-from fastapi import FastAPI, HTTPException, Request, Body, Response
-from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse
+from starlette.concurrency import run_in_threadpool
 
-from app.deps import EncryptorDep, SignerDep
+from app.deps import EncryptorDep, OffloaderDep, SignerDep, cache_stats, get_offloader
 from app.models import VerifyInput, SignOutput
 from app.config import settings
 from app.middleware.request_id import RequestIdMiddleware
-from app.errors import add_exception_handlers, APIError
+from app.middleware.admission import AdaptiveLimit, AdmissionController, AdmissionMiddleware, FixedLimit
+from app.middleware.body_limit import BodySizeLimitMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.access_log import AccessLogMiddleware
+from app.negotiation import negotiate
+from app.errors import APIError, add_exception_handlers
+from app.utils.codecs import CODEC_MEDIA_TYPES
+from app.utils.field_paths import compile_fields
+from app.signature.registry import ALG_DESCRIPTION
+from app.utils.json_body import body_schema
+from app.batch import BATCH_PATHS, router as batch_router
+from app.streaming import STREAM_PATHS, router as streaming_router
+from app import metrics, ops
 
 
 # Logging
 logger = logging.getLogger('riot-crypto-api')
 logger.setLevel(settings.log_level)
+log_writer = None
+if settings.access_log_enabled:
+    from app.access_log import install
+    log_writer = install(logger.name, settings.access_log_file, settings.access_log_queue_size,
+                         settings.access_log_batch_size)
 
 
 # App initialization
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Runs in each worker process: every worker publishes its own metrics
+    # file and watches its own event loop.
+    metrics.worker_files()
+    if log_writer is not None:
+        log_writer.start()
+    lag_monitor = None
+    if settings.diag_enabled:
+        from app.diagnostics import lag_monitor
+        lag_monitor.start()
+    sidecar = None
+    if settings.sidecar_socket:
+        from app.sidecar import server as sidecar_server
+        sidecar = await sidecar_server.start_server(settings.sidecar_socket)
+    yield
+    if sidecar is not None:
+        sidecar.close()
+        await sidecar.wait_closed()
+        sidecar_server.remove_socket()
+    if lag_monitor is not None:
+        lag_monitor.stop()
+    # Let in-flight offloaded work finish, then release the pool.
+    get_offloader().shutdown()
+    if log_writer is not None:
+        log_writer.stop()  # flushes what is still queued
+
 app = FastAPI(
+    lifespan=lifespan,
     title='Riot Take-Home Crypto API',
     version='1.0.0',
     description=(
         'HTTP API with 4 endpoints:\n'
         '- POST /encrypt: Base64(JSON(value)) on all depth-1 properties\n'
         '- POST /decrypt: Attempt Base64+JSON decode on depth-1 string values\n'
-        '- POST /sign: HMAC-SHA256 over canonical JSON value\n'
+        '- POST /sign: HMAC-SHA256 (or ?alg=) over canonical JSON value\n'
         '- POST /verify: 204 if signature matches, 400 otherwise\n\n'
+        'They accept and return JSON, MessagePack or CBOR (Content-Type/Accept) '
+        'and compress large responses per Accept-Encoding.\n\n'
+        'Each endpoint has a /batch variant taking a JSON array or NDJSON body '
+        'and streaming one NDJSON result line per item, in input order.\n\n'
         'Algorithms are abstracted for easy swapping.'
     ),
 )
 
 
-# Body size limiting middleware
-MAX_BYTES = settings.max_body_bytes
-
-class BodySizeLimiter(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        cl = request.headers.get('content-length')
-        try:
-            if cl is not None and int(cl) > MAX_BYTES:
-                raise APIError(status_code=413, code='payload_too_large', message='Payload too large')
-        except ValueError:
-            raise APIError(status_code=400, code='invalid_content_length', message='Invalid Content-Length')
-        return await call_next(request)
-
+# Middleware (pure ASGI). The last one added is the outermost, so request ids
+# are also attached to responses produced by the body-size guard and by
+# admission control, and metrics and the access log see every response (queue
+# wait included).
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_bytes=settings.max_body_bytes,
+    # NDJSON batches are unbounded streams; app/batch.py limits each item.
+    # Streaming routes spool to disk and get their own, larger limit.
+    path_limits={
+        **{path: None for path in BATCH_PATHS},
+        **{path: settings.max_stream_body_bytes for path in STREAM_PATHS},
+    },
+)
+admission = AdmissionController(
+    AdaptiveLimit(settings.admission_min_concurrency, settings.admission_max_concurrency)
+    if settings.admission_adaptive else FixedLimit(settings.admission_max_concurrency),
+    max_bytes=settings.admission_max_inflight_bytes,
+    queue_size=settings.admission_queue_size,
+    queue_timeout=settings.admission_queue_timeout_ms / 1000,
+)
+if settings.admission_enabled:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=admission,
+        max_body_bytes=settings.max_body_bytes,
+        retry_after_seconds=settings.admission_retry_after_seconds,
+        # Long-lived streams hold a slot but would distort the latency signal.
+        unsampled_paths=(*BATCH_PATHS, *STREAM_PATHS),
+    )
 app.add_middleware(RequestIdMiddleware)
-app.add_middleware(BodySizeLimiter)
+app.add_middleware(MetricsMiddleware)
+if settings.access_log_enabled:
+    from app.access_log import ACCESS_LOGGER
+    app.add_middleware(AccessLogMiddleware, logger=logging.getLogger(ACCESS_LOGGER),
+                       sample_rate=settings.access_log_sample_rate)
 add_exception_handlers(app)
+app.include_router(batch_router)
+app.include_router(streaming_router)
+if settings.diag_enabled:
+    from app.diagnostics import router as diagnostics_router
+    app.include_router(diagnostics_router)
 
 
 # Health endpoints
@@ -59,75 +135,149 @@ async def live() -> dict:
 @app.get('/health/ready')
 async def ready() -> dict:
     """Readiness probe: ensure required config (e.g., secret) is present."""
-    if not settings.hmac_secret:
+    if not settings.hmac_secret and not settings.keyring_file:
         raise HTTPException(status_code=503, detail='HMAC secret missing')
     return {'status': 'ready'}
 
+@app.get('/health/cache')
+async def cache() -> dict:
+    """Decrypt/sign cache counters (hits, misses, evictions, occupancy)."""
+    return cache_stats()
 
-# Helpers
-def _ensure_object(payload: Any) -> Dict[str, Any]:
-    """Ensure the root payload is a JSON object."""
-    if not isinstance(payload, dict):
-        raise APIError(status_code=400, code='root_not_object', message='Payload must be a JSON object at the root.')
-    return payload
+@app.get('/health/admission')
+async def admission_stats() -> dict:
+    """Admission control of this worker: current limit, in-flight load, queue and shed counters."""
+    if not settings.admission_enabled:
+        raise HTTPException(status_code=404, detail='Not Found')
+    return admission.stats()
+
+@app.get('/metrics', include_in_schema=False)
+async def metrics_endpoint() -> PlainTextResponse:
+    """Prometheus text format: request counts, latency, body size and per-stage timings."""
+    if not metrics.REGISTRY.enabled:
+        raise HTTPException(status_code=404, detail='Not Found')
+    data = await run_in_threadpool(metrics.collect)
+    return PlainTextResponse(metrics.render(data), media_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 # API routes
-@app.post('/encrypt', summary='Encrypt depth-1 properties using Base64(JSON(value))')
+#
+# Routes take the raw ``Request``; the ``ops.*_body`` functions parse it once
+# with orjson (see app/utils/json_body.py) rather than through a
+# ``Body(...)``/pydantic parameter, validate by hand with FastAPI-identical 422
+# errors, and render with orjson. ``openapi_extra`` keeps the docs accurate.
+# Large bodies are run off the event loop by the Offloader (app/offload.py).
+# Formats and compression are negotiated per request (app/negotiation.py).
+_OBJECT_BODY = body_schema({'type': 'object', 'additionalProperties': True}, CODEC_MEDIA_TYPES)
+_ANY_BODY = body_schema({}, CODEC_MEDIA_TYPES)
+_VERIFY_BODY = body_schema(VerifyInput.model_json_schema(), CODEC_MEDIA_TYPES)
+_FIELDS_DESCRIPTION = ('Only these comma-separated paths, e.g. `ssn,card.number,contacts[*].email` '
+                       '(any depth; `*` = every member); other values are passed through')
+
+
+@app.post('/encrypt', summary='Encrypt depth-1 properties using Base64(JSON(value))', openapi_extra=_OBJECT_BODY)
 async def encrypt(
-    encryptor: EncryptorDep, payload: Dict[str, Any] = Body(..., embed=False)):
+    request: Request, encryptor: EncryptorDep, offloader: OffloaderDep,
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+):
     """Encrypt all top-level properties.
 
     For each key at depth 1, the *value* is serialized to JSON and encoded in
     Base64, producing a string token. The response is an object where every
     top-level value is now a Base64 string.
+
+    With ``fields``, only the selected values are encrypted (nested ones
+    included) and everything else is returned as sent; the cost then grows
+    with the number of selected fields rather than the object's width.
     """
-    obj = _ensure_object(payload)
-    result: Dict[str, Any] = {k: encryptor.encrypt_value(v) for k, v in obj.items()}
-    return JSONResponse(content=result)
+    fmt = negotiate(request.headers)
+    body = await request.body()
+    if fields is None:
+        args = (ops.encrypt_body, encryptor, body)
+    else:
+        args = (ops.encrypt_fields_body, encryptor, compile_fields(fields), body)
+    content, encoding = await offloader.run(fmt.work_bytes(len(body)), ops.respond, fmt, *args)
+    return fmt.response(content, encoding)
 
 
-@app.post('/decrypt', summary='Decrypt depth-1 Base64(JSON(value)) tokens; leave others unchanged')
-async def decrypt(encryptor: EncryptorDep, payload: Dict[str, Any] = Body(..., embed=False)):
+@app.post('/decrypt', summary='Decrypt depth-1 Base64(JSON(value)) tokens; leave others unchanged', openapi_extra=_OBJECT_BODY)
+async def decrypt(
+    request: Request, encryptor: EncryptorDep, offloader: OffloaderDep,
+    fields: Optional[str] = Query(None, description=_FIELDS_DESCRIPTION),
+):
     """Attempts to decrypt all top-level *string* values.
 
     If a string value is a valid Base64(JSON(value)) token, replace it with the
     decoded original value (type preserved). If not valid (or not a string),
     leave the property unchanged, matching the challenge requirement.
+
+    With ``fields``, only the selected values are tried (e.g. those an
+    ``/encrypt?fields=`` call with the same selector produced).
     """
-    obj = _ensure_object(payload)
-    result: Dict[str, Any] = {}
-    for k, v in obj.items():
-        if isinstance(v, str):
-            try:
-                result[k] = encryptor.decrypt_value(v)
-            except Exception:
-                result[k] = v
-        else:
-            result[k] = v
-    return JSONResponse(content=result)
-
-
-@app.post('/sign', response_model=SignOutput, summary='Sign payload with HMAC-SHA256 over canonical JSON')
-async def sign(signer: SignerDep, payload: Any = Body(..., embed=False)):
+    fmt = negotiate(request.headers)
+    body = await request.body()
+    if fields is None:
+        args = (ops.decrypt_body, encryptor, body)
+    else:
+        args = (ops.decrypt_fields_body, encryptor, compile_fields(fields), body)
+    content, encoding = await offloader.run(fmt.work_bytes(len(body)), ops.respond, fmt, *args)
+    return fmt.response(content, encoding)
+
+
+SignMode = Literal['plain', 'merkle']
+
+
+@app.post('/sign', response_model=SignOutput, summary='Sign payload with HMAC-SHA256 over canonical JSON', openapi_extra=_ANY_BODY)
+async def sign(
+    request: Request, signer: SignerDep, offloader: OffloaderDep,
+    mode: SignMode = Query('plain', description='merkle: sign a root over per-field digests (object bodies)'),
+    leaves: bool = Query(False, description='merkle: also return the leaf digest of every member'),
+    partial: bool = Query(False, description='merkle: body is {"data": changed members, "leaves": digests of the others}'),
+    alg: Optional[str] = Query(None, description=ALG_DESCRIPTION),
+):
     """Compute an order-independent signature for *payload*.
 
     The signature is computed over canonical JSON bytes so that different key
     orders produce the same signature. This endpoint accepts *any* JSON value
     (object, array, string, number, ...), per challenge statement.
+
+    With ``mode=merkle`` the payload must be an object: each top-level member
+    is hashed on its own and the sorted Merkle root of those leaves is signed
+    (see app/signature/merkle.py). ``leaves=true`` returns the leaf digests;
+    ``partial=true`` re-signs from ``{"data": changed members, "leaves":
+    digests of the others}`` without the unchanged values.
+
+    ``alg`` picks the signature algorithm (app/signature/registry.py); the
+    response names it in ``alg`` unless it is HMAC-SHA256.
     """
-    signature = signer.sign(payload)
-    return SignOutput(signature=signature)
+    if alg is not None:
+        signer = signer.for_algorithm(alg)
+    fmt = negotiate(request.headers)
+    body = await request.body()
+    if mode == 'merkle':
+        content, encoding = await offloader.run(
+            len(body), ops.respond, fmt, ops.sign_merkle_body, signer, leaves, partial, body)
+    elif leaves or partial:
+        raise APIError(status_code=400, code='merkle_mode_required', message='leaves and partial require mode=merkle')
+    else:
+        content, encoding = await offloader.run(len(body), ops.respond, fmt, ops.sign_body, signer, body)
+    return fmt.response(content, encoding)
 
 
-@app.post('/verify', summary='Verify signature against payload', status_code=204)
-async def verify(body: VerifyInput, signer: SignerDep):
+@app.post('/verify', summary='Verify signature against payload', status_code=204, openapi_extra=_VERIFY_BODY)
+async def verify(
+    request: Request, signer: SignerDep, offloader: OffloaderDep,
+    mode: SignMode = Query('plain', description='merkle: verify a Merkle signature (implied by a `leaves` member)'),
+):
     """Return 204 No Content if signature matches the provided *data*.
 
     Returns 400 Bad Request if verification fails. Input validation guarantees
     that `data` is a JSON object and `signature` is non-empty.
+
+    Merkle signatures can be verified from the changed members only: put them
+    in `data` and the leaf digests of the unchanged ones in `leaves`.
     """
-    ok = signer.verify(body.signature, body.data)
-    if not ok:
-        raise APIError(status_code=400, code='invalid_signature', message='Invalid signature')
+    fmt = negotiate(request.headers)
+    body = await request.body()
+    await offloader.run(len(body), ops.verify_body, signer, body, fmt.codec, mode == 'merkle')
     return Response(status_code=204)
@@ -0,0 +1,345 @@
+"""Low-overhead request and stage metrics, exposed in Prometheus text format.
+
+Recording is lock-free: every thread writes into its own cells (a plain
+dict of lists per metric family, reached through ``threading.local``), so
+the event loop and the offload threads never contend. A scrape merges the
+shards; values read while another thread is mid-update may be off by one
+observation, which is acceptable for monitoring. When a thread exits, its
+cells are folded into its family's retired totals, so short-lived threads
+do not leave a shard each behind.
+
+Work run on the offload *process* pool records into the child's registry;
+:func:`call_collecting` ships that delta back with the result so the parent
+merges it (jobs that raise lose their stage timings).
+
+Across gunicorn workers: with ``APP_METRICS_DIR`` set, each worker writes its
+merged snapshot to ``<dir>/<pid>-<start>.json`` every
+``APP_METRICS_FLUSH_SECONDS`` (and right before serving a scrape), and
+``/metrics`` sums every file in the directory. Files of exited workers are
+kept so counters stay monotonic; the directory is cleared when the server
+starts (see app/gunicorn_conf.py).
+"""
+from __future__ import annotations
+import glob
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+import orjson
+from app.config import settings
+
+T = TypeVar('T')
+
+Labels = Tuple[str, ...]
+# (family name, label values) -> counter: [n]; histogram: [bucket counts..., overflow, sum]
+Shard = Dict[Tuple[str, Labels], List[float]]
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+class Registry:
+    """Metric families; each family keeps one dict of cells per thread."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.families: Dict[str, _Family] = {}
+        self._lock = threading.Lock()  # shard registration, retirement and scrapes
+
+    def counter(self, name: str, help: str, labelnames: Labels) -> Counter:
+        return self._add(Counter(self, name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Labels, buckets: Tuple[float, ...]) -> Histogram:
+        return self._add(Histogram(self, name, help, labelnames, buckets))
+
+    def _add(self, family):
+        self.families[family.name] = family
+        return family
+
+    def snapshot(self) -> Shard:
+        """Sum of all threads' cells (a fresh dict the caller may keep)."""
+        total: Shard = {}
+        for family in list(self.families.values()):
+            # Held while merging so a shard retired meanwhile is not counted twice.
+            with self._lock:
+                for shard in family.shards:
+                    # dict.copy() is atomic under the GIL; iterating the live dict is not.
+                    _merge_into(total, (((family.name, labels), cell) for labels, cell in shard.copy().items()))
+        return total
+
+    def drain(self) -> Shard:
+        """Snapshot and reset. Only safe while no other thread records
+        (process-pool children, which run one job at a time)."""
+        total = self.snapshot()
+        self.reset()
+        return total
+
+    def merge(self, data: Shard) -> None:
+        """Add a snapshot from elsewhere (an offload child) to this thread's cells."""
+        for (name, labels), values in data.items():
+            family = self.families.get(name)
+            if family is not None:
+                _merge_into(family.cells(), ((labels, values),))
+
+    def reset(self) -> None:
+        with self._lock:
+            for family in self.families.values():
+                for shard in family.shards:
+                    shard.clear()
+
+
+def _merge_into(total: Dict[Any, List[float]], items: Iterable[Tuple[Any, List[float]]]) -> None:
+    for key, values in items:
+        cell = total.get(key)
+        if cell is None:
+            total[key] = list(values)
+        elif len(cell) == len(values):
+            for i, v in enumerate(values):
+                cell[i] += v
+
+
+class _ThreadToken:
+    """Lives in a thread's ``threading.local`` slot; freed when the thread exits."""
+
+    __slots__ = ('__weakref__',)
+
+
+class _Family:
+    kind = ''
+
+    def __init__(self, registry: Registry, name: str, help: str, labelnames: Labels):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        # Totals of exited threads, then one dict of cells per live thread.
+        self.retired: Dict[Labels, List[float]] = {}
+        self.shards: List[Dict[Labels, List[float]]] = [self.retired]
+        self._local = threading.local()
+
+    def cells(self) -> Dict[Labels, List[float]]:
+        """This thread's cells of this family (created on first use)."""
+        try:
+            return self._local.cells
+        except AttributeError:
+            cells: Dict[Labels, List[float]] = {}
+            with self.registry._lock:
+                self.shards.append(cells)
+            self._local.cells = cells
+            self._local.token = token = _ThreadToken()
+            weakref.finalize(token, self._retire, cells).atexit = False
+            return cells
+
+    def _retire(self, cells: Dict[Labels, List[float]]) -> None:
+        """Fold an exited thread's cells into :attr:`retired`."""
+        with self.registry._lock:
+            # By identity: list.remove() would match any shard with equal contents.
+            self.shards = [shard for shard in self.shards if shard is not cells]
+            _merge_into(self.retired, cells.items())
+
+
+class Counter(_Family):
+    kind = 'counter'
+
+    def inc(self, labels: Labels, n: float = 1) -> None:
+        try:
+            self._local.cells[labels][0] += n
+        except (AttributeError, KeyError):
+            _merge_into(self.cells(), ((labels, [n]),))
+
+
+class Histogram(_Family):
+    kind = 'histogram'
+
+    def __init__(self, registry: Registry, name: str, help: str, labelnames: Labels, buckets: Tuple[float, ...]):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, labels: Labels, value: float) -> None:
+        try:
+            cell = self._local.cells[labels]
+        except (AttributeError, KeyError):
+            cell = self.cells().setdefault(labels, [0] * (len(self.buckets) + 2))
+        cell[bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+
+REGISTRY = Registry(enabled=settings.metrics_enabled)
+
+REQUESTS = REGISTRY.counter('riot_http_requests_total', 'HTTP requests by route and status.', ('path', 'status'))
+REQUEST_SECONDS = REGISTRY.histogram(
+    'riot_http_request_duration_seconds', 'Time from request start to the end of the response.',
+    ('path',), LATENCY_BUCKETS)
+REQUEST_BYTES = REGISTRY.histogram('riot_http_request_body_bytes', 'Request body size.', ('path',), SIZE_BUCKETS)
+STAGE_SECONDS = REGISTRY.histogram(
+    'riot_stage_duration_seconds',
+    'Time per processing stage (parse, canonicalize, crypto, render; op="compress": per encoding).',
+    ('op', 'stage'), LATENCY_BUCKETS)
+
+SIDECAR_REQUESTS = REGISTRY.counter(
+    'riot_sidecar_requests_total', 'Requests served over the Unix-socket sidecar transport.', ('op', 'outcome'))
+ADMISSION_REJECTED = REGISTRY.counter(
+    'riot_admission_rejected_total', 'Requests shed by admission control (503), by reason.', ('reason',))
+ADMISSION_QUEUE_SECONDS = REGISTRY.histogram(
+    'riot_admission_queue_wait_seconds', 'Time admitted requests waited in the admission queue.', (),
+    LATENCY_BUCKETS)
+ACCESS_LOG_DROPPED = REGISTRY.counter(
+    'riot_access_log_dropped_total', 'Log records dropped because the log queue was full.', ())
+
+
+class StageTimer:
+    """Records the time between successive :meth:`mark` calls as stages of *op*."""
+
+    __slots__ = ('op', '_t')
+
+    def __init__(self, op: str):
+        self.op = op
+        self._t = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        STAGE_SECONDS.observe((self.op, stage), now - self._t)
+        self._t = now
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def mark(self, stage: str) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def stage_timer(op: str):
+    """A :class:`StageTimer` for *op*, or a no-op one when metrics are disabled."""
+    return StageTimer(op) if REGISTRY.enabled else _NULL_TIMER
+
+
+def call_collecting(fn: Callable[..., T], *args: Any) -> Tuple[T, Shard]:
+    """Run ``fn(*args)`` in an offload child; return its result and the metrics it recorded."""
+    result = fn(*args)
+    return result, REGISTRY.drain()
+
+
+# Rendering
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = '') -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _fmt(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(data: Shard, registry: Registry = REGISTRY) -> str:
+    """Prometheus text exposition (format 0.0.4) of *data*."""
+    by_family: Dict[str, List[Tuple[Labels, List[float]]]] = {}
+    for (name, labels), values in data.items():
+        by_family.setdefault(name, []).append((labels, values))
+    lines: List[str] = []
+    for name, family in registry.families.items():
+        lines.append(f'# HELP {name} {family.help}')
+        lines.append(f'# TYPE {name} {family.kind}')
+        for labels, values in sorted(by_family.get(name, ())):
+            if isinstance(family, Histogram):
+                if len(values) != len(family.buckets) + 2:
+                    continue
+                cumulative = 0.0
+                for bound, count in zip(family.buckets, values):
+                    cumulative += count
+                    le = _labels(family.labelnames, labels, f'le="{_fmt(bound)}"')
+                    lines.append(f'{name}_bucket{le} {_fmt(cumulative)}')
+                cumulative += values[-2]
+                inf = _labels(family.labelnames, labels, 'le="+Inf"')
+                lines.append(f'{name}_bucket{inf} {_fmt(cumulative)}')
+                lines.append(f'{name}_sum{_labels(family.labelnames, labels)} {_fmt(values[-1])}')
+                lines.append(f'{name}_count{_labels(family.labelnames, labels)} {_fmt(cumulative)}')
+            else:
+                lines.append(f'{name}{_labels(family.labelnames, labels)} {_fmt(values[0])}')
+    return '\n'.join(lines) + '\n'
+
+
+# Multi-worker aggregation through a shared directory
+
+def _encode(data: Shard) -> bytes:
+    return orjson.dumps([[name, list(labels), values] for (name, labels), values in data.items()])
+
+
+def _decode(raw: bytes) -> Shard:
+    return {(name, tuple(labels)): values for name, labels, values in orjson.loads(raw)}
+
+
+class WorkerFiles:
+    """Publishes this worker's snapshot to *directory* and sums all workers' files."""
+
+    def __init__(self, registry: Registry, directory: str, flush_seconds: float):
+        self.registry = registry
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self.pid = os.getpid()
+        # The start time keeps a reused pid from overwriting an exited worker's totals.
+        self.path = os.path.join(directory, f'{self.pid}-{time.time_ns()}.json')
+        self._thread: Optional[threading.Thread] = None
+
+    def flush(self) -> None:
+        tmp = self.path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(_encode(self.registry.snapshot()))
+        os.replace(tmp, self.path)
+
+    def collect(self) -> Shard:
+        self.flush()
+        total: Shard = {}
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path, 'rb') as f:
+                    _merge_into(total, _decode(f.read()).items())
+            except (OSError, ValueError):
+                continue  # being replaced or truncated; next scrape picks it up
+        return total
+
+    def start(self) -> None:
+        """Start the periodic flush thread (idempotent)."""
+        if self._thread is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._loop, name='metrics-flush', daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+
+_worker_files: Optional[WorkerFiles] = None
+
+
+def worker_files() -> Optional[WorkerFiles]:
+    """This process's :class:`WorkerFiles` (started on first use), or None without ``APP_METRICS_DIR``."""
+    global _worker_files
+    if not settings.metrics_dir:
+        return None
+    if _worker_files is None or _worker_files.pid != os.getpid():  # first call, or a forked worker
+        _worker_files = WorkerFiles(REGISTRY, settings.metrics_dir, settings.metrics_flush_seconds)
+        _worker_files.start()
+    return _worker_files
+
+
+def collect() -> Shard:
+    """Metrics of this process, or of every worker when ``APP_METRICS_DIR`` is set."""
+    files = worker_files()
+    return REGISTRY.snapshot() if files is None else files.collect()
@@ -0,0 +1,75 @@
+from __future__ import annotations
+import logging
+import random
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.middleware.request_id import REQUEST_ID_HEADER
+
+_REQUEST_ID_KEY = REQUEST_ID_HEADER.lower().encode('latin-1')
+
+
+class AccessLogMiddleware:
+    """Log one structured record per HTTP request.
+
+    Pure ASGI middleware. When the response is complete it logs, on
+    *logger*, a record whose ``access`` attribute holds ``request_id``
+    (the ``X-Request-ID`` sent back, so this should wrap
+    :class:`~app.middleware.request_id.RequestIdMiddleware`), ``method``,
+    ``path`` (the route template when routed), ``status``, ``request_bytes``,
+    ``response_bytes`` and ``duration_ms``. Successful responses are sampled
+    at *sample_rate*; 4xx/5xx are always logged. Formatting and output are
+    left to the logger's handlers (see app/access_log.py).
+    """
+
+    def __init__(self, app: ASGIApp, logger: logging.Logger, sample_rate: float = 1.0):
+        self.app = app
+        self.logger = logger
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        size = -1
+        rid = None
+        for key, value in scope['headers']:
+            if key == b'content-length':
+                size = int(value) if value.isdigit() else 0
+            elif key == _REQUEST_ID_KEY:
+                rid = value
+        status = 500
+        received = sent = 0
+
+        async def send_logged(message: Message) -> None:
+            nonlocal status, rid, sent
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                for key, value in message.get('headers', ()):
+                    if key == _REQUEST_ID_KEY:
+                        rid = value
+            elif message['type'] == 'http.response.body':
+                sent += len(message.get('body', b''))
+            await send(message)
+
+        async def receive_counted() -> Message:
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+            return message
+
+        try:
+            await self.app(scope, receive if size >= 0 else receive_counted, send_logged)
+        finally:
+            if status >= 400 or self.sample_rate >= 1 or random.random() < self.sample_rate:
+                path = getattr(scope.get('route'), 'path', None) or scope['path']
+                self.logger.info('%s %s %d', scope['method'], path, status, extra={'access': {
+                    'request_id': rid.decode('latin-1') if rid else None,
+                    'method': scope['method'],
+                    'path': path,
+                    'status': status,
+                    'request_bytes': size if size >= 0 else received,
+                    'response_bytes': sent,
+                    'duration_ms': round((time.perf_counter() - start) * 1e3, 3),
+                }})
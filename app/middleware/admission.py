@@ -0,0 +1,211 @@
+from __future__ import annotations
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.errors import APIError, send_api_error
+from app.metrics import ADMISSION_QUEUE_SECONDS, ADMISSION_REJECTED
+
+# Charged nothing unless they declare a body (docs, OpenAPI schema, CORS preflight).
+_BODYLESS_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+
+
+class AdaptiveLimit:
+    """Concurrency limit steered by request latency (gradient algorithm).
+
+    Two moving averages of service time are kept: a short one (the last few
+    dozen requests) and a long one (the baseline). While the short average
+    stays within *tolerance* x the baseline the limit grows by about
+    ``sqrt(limit)`` per update, up to *max_limit*; when requests slow down
+    (queueing inside the worker: event loop, GIL, offload pool) the limit
+    is scaled by ``tolerance * long / short`` (at least 0.5), down to
+    *min_limit*. After an overload the baseline is pulled back down, so it
+    does not drift up and hide the next one.
+    """
+
+    def __init__(self, min_limit: int, max_limit: int, tolerance: float = 1.5, smoothing: float = 0.2):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.limit = float(self.max_limit)
+        self.short: Optional[float] = None
+        self.long: Optional[float] = None
+
+    @property
+    def value(self) -> int:
+        return int(self.limit)
+
+    def update(self, seconds: float) -> None:
+        if self.short is None or self.long is None:
+            self.short = self.long = seconds
+            return
+        self.short += 0.1 * (seconds - self.short)
+        self.long += 0.005 * (seconds - self.long)
+        if self.long > 2 * self.short:  # recovered: let the baseline come down quickly
+            self.long *= 0.95
+        gradient = max(0.5, min(1.0, self.tolerance * self.long / self.short))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(float(self.min_limit), min(float(self.max_limit), limit))
+
+
+class FixedLimit:
+    """Non-adaptive limit with the :class:`AdaptiveLimit` interface."""
+
+    def __init__(self, limit: int):
+        self.limit = float(max(1, limit))
+        self.value = int(self.limit)
+
+    def update(self, seconds: float) -> None:
+        pass
+
+
+class AdmissionController:
+    """Per-worker budget of concurrent requests and in-flight body bytes.
+
+    A request that fits runs at once. Otherwise it waits in a FIFO queue of
+    at most *queue_size* entries for up to *queue_timeout* seconds; when the
+    queue is full or the deadline passes it is shed. A request costing more
+    than *max_bytes* on its own is admitted only when nothing else is in
+    flight. Runs on the worker's event loop only, so it needs no locks.
+    """
+
+    def __init__(self, limit, max_bytes: int, queue_size: int, queue_timeout: float):
+        self.limit = limit
+        self.max_bytes = max_bytes
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.in_flight_bytes = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected: Dict[str, int] = {'queue_full': 0, 'queue_timeout': 0}
+        self._queue: Deque[List[Any]] = deque()  # [cost, future]
+
+    def _fits(self, cost: int) -> bool:
+        return self.in_flight < self.limit.value and (
+            self.in_flight_bytes == 0 or self.in_flight_bytes + cost <= self.max_bytes)
+
+    def _take(self, cost: int) -> None:
+        self.in_flight += 1
+        self.in_flight_bytes += cost
+        self.admitted += 1
+
+    async def acquire(self, cost: int) -> Optional[str]:
+        """Wait for room for a request of *cost* bytes; None once admitted, else the shed reason."""
+        if not self._queue and self._fits(cost):
+            self._take(cost)
+            return None
+        if len(self._queue) >= self.queue_size:
+            return self._reject('queue_full')
+        entry = [cost, asyncio.get_running_loop().create_future()]
+        self._queue.append(entry)
+        self.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(entry[1], self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._remove(entry)
+            return self._reject('queue_timeout')
+        except asyncio.CancelledError:  # client went away while queued
+            if entry[1].done() and not entry[1].cancelled():
+                self.release(cost)  # admitted just before the cancellation
+            else:
+                self._remove(entry)
+            raise
+        ADMISSION_QUEUE_SECONDS.observe((), time.perf_counter() - start)
+        return None
+
+    def release(self, cost: int, seconds: Optional[float] = None) -> None:
+        """Return a request's slot and bytes; *seconds* (service time) feeds the limit."""
+        self.in_flight -= 1
+        self.in_flight_bytes -= cost
+        if seconds is not None:
+            self.limit.update(seconds)
+        self._wake()
+
+    def _wake(self) -> None:
+        queue = self._queue
+        while queue:
+            cost, future = queue[0]
+            if future.done():  # timed out or cancelled
+                queue.popleft()
+                continue
+            if not self._fits(cost):
+                break  # strict FIFO: a large request at the head is not starved by small ones
+            queue.popleft()
+            self._take(cost)
+            future.set_result(None)
+
+    def _remove(self, entry: List[Any]) -> None:
+        try:
+            self._queue.remove(entry)
+        except ValueError:
+            pass
+        self._wake()  # the head may have been the one blocking the others
+
+    def _reject(self, reason: str) -> str:
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED.inc((reason,))
+        return reason
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'limit': self.limit.value,
+            'in_flight': self.in_flight,
+            'in_flight_bytes': self.in_flight_bytes,
+            'max_bytes': self.max_bytes,
+            'queue_length': len(self._queue),
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'rejected': dict(self.rejected),
+        }
+
+
+class AdmissionMiddleware:
+    """Shed load early (503 ``server_overloaded`` + ``Retry-After``) via an :class:`AdmissionController`.
+
+    Pure ASGI middleware. A request's cost is its declared ``Content-Length``
+    capped at *max_body_bytes* (what it may buffer in memory). Chunked
+    uploads, and any other method without a length that may carry a body,
+    are charged the cap; GET/HEAD/OPTIONS without a body cost nothing. Paths starting with *exempt_prefixes*
+    bypass admission. Requests to *unsampled_paths* (long-lived streams) are
+    admitted but their duration does not steer the adaptive limit.
+    """
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController, max_body_bytes: int,
+                 retry_after_seconds: int = 1, exempt_prefixes: Iterable[str] = ('/health/', '/metrics'),
+                 unsampled_paths: Iterable[str] = ()):
+        self.app = app
+        self.controller = controller
+        self.max_body_bytes = max_body_bytes
+        self.retry_after = str(retry_after_seconds).encode('latin-1')
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.unsampled_paths = frozenset(unsampled_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or scope['path'].startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+        cost = 0 if scope['method'] in _BODYLESS_METHODS else self.max_body_bytes
+        for key, value in scope['headers']:
+            if key == b'content-length':
+                cost = min(int(value), self.max_body_bytes) if value.isdigit() else self.max_body_bytes
+                break
+            if key == b'transfer-encoding':
+                cost = self.max_body_bytes
+        controller = self.controller
+        if await controller.acquire(cost) is not None:
+            await send_api_error(
+                send, APIError(status_code=503, code='server_overloaded', message='Server overloaded, retry later'),
+                headers=[(b'retry-after', self.retry_after)])
+            return
+        start = time.perf_counter()
+        sampled = scope['path'] not in self.unsampled_paths
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(cost, time.perf_counter() - start if sampled else None)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+from typing import Mapping, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.errors import APIError, send_api_error
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies larger than *max_bytes* (413 ``payload_too_large``).
+
+    Pure ASGI middleware. A declared ``Content-Length`` over the limit is
+    rejected before the app runs; otherwise bytes are counted as
+    ``http.request`` messages arrive, and the read that crosses the limit
+    raises :class:`APIError` so the body is never buffered past it (this
+    covers chunked uploads without a length header).
+
+    *path_limits* overrides the limit for exact paths; ``None`` disables it
+    for routes that enforce their own per-item limits (e.g. NDJSON batches).
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, path_limits: Optional[Mapping[str, Optional[int]]] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_limits = dict(path_limits or {})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        limit = self.path_limits.get(scope['path'], self.max_bytes)
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for key, value in scope['headers']:
+            if key == b'content-length':
+                try:
+                    declared = int(value)
+                except ValueError:
+                    await send_api_error(send, APIError(status_code=400, code='invalid_content_length', message='Invalid Content-Length'))
+                    return
+                if declared > limit:
+                    await send_api_error(send, _too_large())
+                    return
+                break
+
+        received = 0
+
+        async def receive_limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > limit:
+                    raise _too_large()
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+
+def _too_large() -> APIError:
+    return APIError(status_code=413, code='payload_too_large', message='Payload too large')
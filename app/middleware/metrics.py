@@ -0,0 +1,63 @@
+from __future__ import annotations
+import time
+from typing import Set
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.metrics import REGISTRY, REQUEST_BYTES, REQUEST_SECONDS, REQUESTS
+
+UNMATCHED = '<unmatched>'
+
+class MetricsMiddleware:
+    """Count requests by route and status; record latency and body size.
+
+    Pure ASGI middleware. The ``path`` label is the matched route template
+    (FastAPI stores the route in the scope), so path parameters and 404 scans
+    cannot blow up label cardinality; requests rejected before routing (e.g.
+    by the body-size guard) reuse the path if a route with that exact path
+    has been seen, else ``<unmatched>``. The body size comes from
+    ``Content-Length`` or, for chunked uploads, from counting what the app
+    reads.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._known: Set[str] = set()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http' or not REGISTRY.enabled:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        size = -1
+        for key, value in scope['headers']:
+            if key == b'content-length':
+                size = int(value) if value.isdigit() else 0
+                break
+        status = 500
+        received = 0
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        async def receive_counted() -> Message:
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+            return message
+
+        try:
+            await self.app(scope, receive if size >= 0 else receive_counted, send_with_status)
+        finally:
+            route = scope.get('route')
+            path = getattr(route, 'path', None)
+            if path is not None:
+                self._known.add(path)
+            else:
+                path = scope['path'] if scope['path'] in self._known else UNMATCHED
+            labels = (path,)
+            REQUESTS.inc((path, str(status)))
+            REQUEST_SECONDS.observe(labels, time.perf_counter() - start)
+            REQUEST_BYTES.observe(labels, size if size >= 0 else received)
@@ -1,15 +1,68 @@
 from __future__ import annotations
+import asyncio
+import contextvars
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from typing import Dict, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 REQUEST_ID_HEADER = 'X-Request-ID'
+_HEADER_KEY = REQUEST_ID_HEADER.lower().encode('latin-1')
 
-class RequestIdMiddleware(BaseHTTPMiddleware):
-    """Attach a request id to each response (also useful for logs)."""
+# Id of the request being served, for code running on its behalf (thread
+# pool calls copy the context, so they see it too).
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar('request_id', default=None)
+# Context of each task serving a request (removed when it is done). Another
+# thread cannot read a task's context variables directly
+# (``Task.get_context`` is Python 3.12+), so diagnostics threads look the
+# task's context up here.
+_task_contexts: Dict[asyncio.Task, contextvars.Context] = {}
 
-    async def dispatch(self, request: Request, call_next):
-        rid = request.headers.get(REQUEST_ID_HEADER) or str(uuid.uuid4())
-        response = await call_next(request)
-        response.headers[REQUEST_ID_HEADER] = rid
-        return response
+
+def task_request_id(task: Optional[asyncio.Task]) -> Optional[str]:
+    """``request_id_var`` as seen by *task* (callable from any thread)."""
+    ctx = _task_contexts.get(task) if task is not None else None
+    return ctx.get(request_id_var) if ctx is not None else None
+
+
+class RequestIdMiddleware:
+    """Attach a request id to each response (also useful for logs).
+
+    Pure ASGI middleware: the incoming ``X-Request-ID`` (or a fresh UUID4) is
+    appended to the ``http.response.start`` headers as they pass through, with
+    no request/response object wrapping. While the request is served the id
+    is also in :data:`request_id_var` (see :func:`task_request_id` for
+    reading it from other threads).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        rid = None
+        for key, value in scope['headers']:
+            if key == _HEADER_KEY:
+                rid = value
+                break
+        if not rid:
+            rid = str(uuid.uuid4()).encode('latin-1')
+
+        async def send_with_id(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                headers = [h for h in message.get('headers', ()) if h[0].lower() != _HEADER_KEY]
+                headers.append((_HEADER_KEY, rid))
+                message['headers'] = headers
+            await send(message)
+
+        token = request_id_var.set(rid.decode('latin-1'))
+        task = asyncio.current_task()
+        if task is not None:
+            _task_contexts[task] = contextvars.copy_context()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+            if task is not None:
+                _task_contexts.pop(task, None)
@@ -1,7 +1,11 @@
 from __future__ import annotations
-from typing import Any, Dict
+from typing import Annotated, Any, Dict, Optional
 from pydantic import BaseModel, Field, field_validator
 
+# Hex SHA-256 leaf of one depth-1 member (app/signature/merkle.py).
+LeafDigest = Annotated[str, Field(pattern=r'^[0-9a-f]{64}$')]
+
+
 class VerifyInput(BaseModel):
     """Schema for /verify endpoint: includes the signature and the data.
 
@@ -12,6 +16,9 @@ class VerifyInput(BaseModel):
     """
     signature: str = Field(..., min_length=1, description='Hex-encoded signature')
     data: Dict[str, Any] = Field(..., description='JSON object to verify')
+    leaves: Optional[Dict[str, LeafDigest]] = Field(
+        None, description='Merkle mode: leaf digests of the members left out of `data` (unchanged since signing)')
+    alg: Optional[str] = Field(None, description='Signature algorithm, the `alg` returned by /sign (absent: hmac-sha256)')
 
     @field_validator('signature')
     @classmethod
@@ -21,6 +28,14 @@ class VerifyInput(BaseModel):
         return v
     
 class SignOutput(BaseModel):
-    """Schema for /sign response: returns the computed signature only."""
+    """Schema for /sign response: the signature, its algorithm unless HMAC-SHA256, and Merkle leaves if asked for."""
     signature: str
+    alg: Optional[str] = None
+    leaves: Optional[Dict[str, str]] = None
+
+
+class MerkleSignInput(BaseModel):
+    """Schema for incremental Merkle /sign: changed members plus the leaf digests of the others."""
+    data: Dict[str, Any] = Field(..., description='Members added or changed since the previous signature')
+    leaves: Dict[str, LeafDigest] = Field(default_factory=dict, description='Leaf digests of the unchanged members')
 
@@ -0,0 +1,115 @@
+"""Content negotiation for ``/encrypt``, ``/decrypt``, ``/sign`` and ``/verify``.
+
+- ``Content-Type`` picks the request codec: JSON, MessagePack or CBOR (see
+  app/utils/codecs.py). Any other type is read as JSON, as before; a binary
+  type whose package is not installed is a 415.
+- ``Accept`` picks the response codec by q-value; ties and wildcards keep
+  the request's format, and when nothing listed is supported the response
+  is JSON (``Accept`` is advisory).
+- ``Accept-Encoding`` picks the compression (zstd, gzip, deflate) applied
+  to responses of at least ``APP_COMPRESS_MIN_BYTES``.
+
+Clients send the same few header combinations over and over, so results are
+cached per ``(Content-Type, Accept, Accept-Encoding)``.
+"""
+from __future__ import annotations
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional, Tuple
+from fastapi import Response
+from starlette.datastructures import Headers
+from app.config import settings
+from app.errors import APIError
+from app.utils.codecs import CBOR, JSON, MEDIA_TYPES, MSGPACK, Codec, available
+from app.utils.compression import ENCODINGS
+
+# Compressing costs several times the encryption work per byte (see
+# benchmarks/bench_negotiation.py), so when a compressed response is
+# negotiated, /encrypt and /decrypt bodies count this many times their size
+# against APP_OFFLOAD_THRESHOLD_BYTES.
+COMPRESSION_COST = 4
+VARY = 'Accept, Accept-Encoding'
+
+
+class Negotiated(NamedTuple):
+    codec: Codec  # request body
+    out_codec: Codec  # response body
+    encoding: Optional[str]  # None: never compress
+    compress_min_bytes: int
+
+    def work_bytes(self, body_bytes: int) -> int:
+        """Offload size of a body whose response grows with it (encrypt/decrypt)."""
+        return body_bytes * COMPRESSION_COST if self.encoding else body_bytes
+
+    def response(self, content: bytes, encoding: Optional[str]) -> Response:
+        headers = {'Vary': VARY}
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return Response(content=content, media_type=self.out_codec.media_type, headers=headers)
+
+
+def negotiate(headers: Headers) -> Negotiated:
+    """Codecs and compression for a request with *headers* (415 for an unavailable codec)."""
+    return _negotiate(headers.get('content-type', ''), headers.get('accept', ''),
+                      headers.get('accept-encoding', ''))
+
+
+@lru_cache(maxsize=256)
+def _negotiate(content_type: str, accept: str, accept_encoding: str) -> Negotiated:
+    request = MEDIA_TYPES.get(content_type.partition(';')[0].strip().lower(), JSON)
+    if not available(request):
+        raise APIError(status_code=415, code='unsupported_media_type',
+                       message=f'{request.label} bodies are not supported by this server')
+    encoding = _encoding(accept_encoding) if settings.compress_min_bytes > 0 else None
+    return Negotiated(request, _response_codec(accept, request), encoding, settings.compress_min_bytes)
+
+
+def _weighted(header: str) -> Iterator[Tuple[str, float]]:
+    """``(token, q)`` pairs of an ``Accept``-style header."""
+    for part in header.split(','):
+        token, *params = part.split(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        yield token, q
+
+
+def _media_q(ranges: dict, codec: Codec) -> float:
+    """q of *codec* under *ranges*: the most specific matching range decides."""
+    exact = [ranges[mt] for mt, c in MEDIA_TYPES.items() if c is codec and mt in ranges]
+    if exact:
+        return max(exact)
+    return ranges.get('application/*', ranges.get('*/*', 0.0))
+
+
+def _response_codec(accept: str, request: Codec) -> Codec:
+    if not accept:
+        return request
+    ranges = dict(_weighted(accept))
+    best, best_q = JSON, 0.0
+    for codec in dict.fromkeys((request, JSON, MSGPACK, CBOR)):  # ties keep the request's format
+        if available(codec):
+            q = _media_q(ranges, codec)
+            if q > best_q:
+                best, best_q = codec, q
+    return best
+
+
+def _encoding(accept_encoding: str) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    weights = dict(_weighted(accept_encoding))
+    default = weights.get('*', 0.0)
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, default)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
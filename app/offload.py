@@ -0,0 +1,107 @@
+"""Size-aware offloading of CPU-bound endpoint work off the event loop.
+
+Handlers are ``async def`` and would otherwise run ``orjson``, canonicalization,
+HMAC and base64 inline, so one multi-MiB request stalls every other connection
+on the worker. :class:`Offloader` keeps small requests inline (no hop cost)
+and sends requests whose body is at least ``threshold_bytes`` to a bounded
+pool:
+
+- ``thread`` (default): a ``ThreadPoolExecutor``. hashlib releases the GIL
+  on large inputs, and pure-Python loops yield it every switch interval, so
+  the loop keeps serving small requests.
+- ``process``: a ``ProcessPoolExecutor`` (spawn). Full isolation from the
+  loop at the cost of pickling the raw body and the result; strategies are
+  rebuilt in the child from their picklable state.
+- ``off``: everything inline (previous behavior).
+
+Backpressure: at most ``max_workers + max_queue`` offloaded jobs may be in
+flight per worker; beyond that requests fail fast with 503 ``server_busy``
+rather than queueing without bound. A slot is released when the pool job
+finishes, not when the awaiting request does: a client that disconnects
+cancels its job if it has not started yet, but a running job keeps its slot
+until it completes, so the bound holds under disconnect storms.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from app import metrics
+from app.errors import APIError
+
+T = TypeVar('T')
+
+MODES = ('off', 'thread', 'process')
+
+
+class Offloader:
+    """Run callables inline or on a bounded pool depending on payload size."""
+
+    def __init__(self, mode: str, threshold_bytes: int, max_workers: int = 0, max_queue: int = 16):
+        if mode not in MODES:
+            raise ValueError(f'offload mode must be one of {MODES}, got {mode!r}')
+        self.mode = mode
+        self.threshold_bytes = threshold_bytes
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_in_flight = self.max_workers + max(0, max_queue)
+        self.in_flight = 0
+        self.offloaded = 0
+        self.rejected = 0
+        # in_flight is released from pool callback threads.
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.mode == 'process':
+                # multiprocessing is only imported by workers that use it.
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='offload')
+        return self._executor
+
+    def runs_inline(self, size: int) -> bool:
+        """Whether :meth:`run` calls a job of *size* bytes on the loop."""
+        return self.mode == 'off' or size < self.threshold_bytes
+
+    async def run(self, size: int, fn: Callable[..., T], *args: Any) -> T:
+        """Call ``fn(*args)``; off the loop if *size* reaches the threshold."""
+        if self.runs_inline(size):
+            return fn(*args)
+        with self._lock:
+            if self.in_flight >= self.max_in_flight:
+                self.rejected += 1
+                raise APIError(status_code=503, code='server_busy', message='Server busy, retry later')
+            self.in_flight += 1
+            self.offloaded += 1
+        collect = self.mode == 'process' and metrics.REGISTRY.enabled
+        try:
+            if collect:
+                # Bring the child's stage timings back with the result.
+                future = self._pool().submit(metrics.call_collecting, fn, *args)
+            else:
+                future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        # Cancelling the request cancels the job only if it has not started.
+        result = await asyncio.wrap_future(future)
+        if collect:
+            result, recorded = result
+            metrics.REGISTRY.merge(recorded)
+        return result
+
+    def _release(self, future: Optional[Future] = None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def shutdown(self) -> None:
+        """Stop the pool (waits for running jobs); a later call recreates it."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
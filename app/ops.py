@@ -0,0 +1,323 @@
+"""Endpoint operations shared by the single-item and batch routes.
+
+The ``*_object``/``verify_signature`` functions implement the semantics of
+one endpoint on an already-parsed JSON value and raise :class:`APIError` on
+failure. The ``*_body`` functions wrap them for the single-item routes: raw
+request bytes in (JSON, MessagePack or CBOR), rendered response bytes out;
+:func:`respond` adds the negotiated compression. They are plain module-level
+functions of picklable arguments, so :mod:`app.offload` can run them inline,
+on a thread or in another process.
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Mapping, Optional, Tuple
+import orjson
+from pydantic import ValidationError
+from app.crypto.base import NOT_A_TOKEN, Encryptor
+from app.models import MerkleSignInput, VerifyInput
+from app.signature.base import DEFAULT_ALGORITHM, Signer
+from app.signature.merkle import LEAF_HEX, leaf_digests, sign_leaves, verify_leaves
+from app.errors import APIError
+from app.utils.json_body import (
+    json_invalid_error, require_object, require_object_error, validate_model,
+)
+from app.metrics import stage_timer
+from app.utils.codecs import JSON, Codec, parse_body
+from app.utils.compression import compress
+from app.utils.field_paths import FieldTree, apply_fields
+from app.utils.json_canonical import canonicalize, iter_canonical
+from app.utils.json_stream import JsonScanError, coalesce, index_object, load_span, mapped
+
+if TYPE_CHECKING:
+    from app.negotiation import Negotiated
+
+
+def ensure_object(payload: Any) -> Dict[str, Any]:
+    """Ensure the root payload is a JSON object."""
+    if not isinstance(payload, dict):
+        raise APIError(status_code=400, code='root_not_object', message='Payload must be a JSON object at the root.')
+    return payload
+
+
+def encrypt_object(encryptor: Encryptor, obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace every depth-1 value of *obj* with its encrypted token."""
+    return {k: encryptor.encrypt_value(v) for k, v in obj.items()}
+
+
+def decrypt_field(encryptor: Encryptor, value: Any) -> Any:
+    """Decrypt *value* if it is a valid token string; otherwise return it as-is."""
+    if isinstance(value, str):
+        decrypted = encryptor.try_decrypt_value(value)
+        if decrypted is not NOT_A_TOKEN:
+            return decrypted
+    return value
+
+
+def decrypt_object(encryptor: Encryptor, obj: Dict[str, Any]) -> Dict[str, Any]:
+    """Decrypt depth-1 string values that are valid tokens; keep the others."""
+    return {k: decrypt_field(encryptor, v) for k, v in obj.items()}
+
+
+def signature_fields(signer: Signer, signature: str) -> Dict[str, Any]:
+    """``{"signature": ...}``, plus ``"alg"`` unless the algorithm is the untagged default."""
+    if signer.algorithm == DEFAULT_ALGORITHM:
+        return {'signature': signature}
+    return {'signature': signature, 'alg': signer.algorithm}
+
+
+def verify_signature(signer: Signer, signature: str, data: Dict[str, Any]) -> None:
+    """Raise ``invalid_signature`` unless *signature* matches *data*."""
+    if not signer.verify(signature, data):
+        raise APIError(status_code=400, code='invalid_signature', message='Invalid signature')
+
+
+def merkle_leaves(data: Dict[str, Any], given: Optional[Mapping[str, str]] = None) -> Dict[str, bytes]:
+    """Leaves of *data*'s members plus the hex leaf digests *given* for the members left out."""
+    if not given:
+        return leaf_digests(data)
+    both = given.keys() & data.keys()
+    if both:
+        raise APIError(status_code=400, code='leaf_conflict',
+                       message=f'Members both in data and leaves: {", ".join(sorted(both)[:5])}')
+    leaves = {key: bytes.fromhex(digest) for key, digest in given.items()}
+    leaves.update(leaf_digests(data))
+    return leaves
+
+
+def _valid_leaves(leaves: Any) -> bool:
+    return isinstance(leaves, dict) and all(
+        isinstance(digest, str) and LEAF_HEX.fullmatch(digest) for digest in leaves.values())
+
+
+# Per-item operations of the batch routes and the bulk CLI (app/cli.py): one
+# parsed JSON value in, the fields of its NDJSON result line out.
+
+def encrypt_item(encryptor: Encryptor, value: Any) -> Dict[str, Any]:
+    return {'result': encrypt_object(encryptor, ensure_object(value))}
+
+
+def decrypt_item(encryptor: Encryptor, value: Any) -> Dict[str, Any]:
+    return {'result': decrypt_object(encryptor, ensure_object(value))}
+
+
+def sign_item(signer: Signer, value: Any) -> Dict[str, Any]:
+    return signature_fields(signer, signer.sign(value))
+
+
+def verify_item(signer: Signer, value: Any) -> Dict[str, Any]:
+    """``{"signature", "data"}`` -> ``{"valid": true}`` (``validation_error``/``invalid_signature`` otherwise)."""
+    try:
+        body = VerifyInput.model_validate(value)
+    except ValidationError as exc:
+        err = exc.errors()[0]
+        loc = '.'.join(str(p) for p in err['loc'])
+        message = f"{loc}: {err['msg']}" if loc else err['msg']
+        raise APIError(status_code=422, code='validation_error', message=message)
+    verify_signature(signer.for_algorithm(body.alg or DEFAULT_ALGORITHM), body.signature, body.data)
+    return {'valid': True}
+
+
+def item_error_line(index: int, code: str, message: str) -> bytes:
+    """NDJSON error line of item *index*: the ``APIErrorResponse`` body plus the index."""
+    return orjson.dumps({'index': index, 'error': message, 'code': code}) + b'\n'
+
+
+# The ``*_body`` functions time their stages for /metrics (app/metrics.py):
+# parse (incl. validation), canonicalize, crypto and render. Whatever the
+# codecs, values are plain JSON values in between, so tokens and signatures
+# do not depend on the wire format.
+
+def encrypt_body(encryptor: Encryptor, body: bytes, codec: Codec = JSON, out_codec: Codec = JSON) -> bytes:
+    """``/encrypt``: object bytes -> object of tokens."""
+    timer = stage_timer('encrypt')
+    obj = require_object(parse_body(body, codec))
+    timer.mark('parse')
+    if out_codec is JSON:
+        # Tokens are rendered as they are made: one 'crypto' stage, no 'render'.
+        out = encryptor.encrypt_object_to_bytes(obj)
+        timer.mark('crypto')
+        return out
+    encrypted = encrypt_object(encryptor, obj)
+    timer.mark('crypto')
+    out = out_codec.dumps(encrypted)
+    timer.mark('render')
+    return out
+
+
+def decrypt_body(encryptor: Encryptor, body: bytes, codec: Codec = JSON, out_codec: Codec = JSON) -> bytes:
+    """``/decrypt``: object bytes -> object with tokens decoded."""
+    timer = stage_timer('decrypt')
+    obj = require_object(parse_body(body, codec))
+    timer.mark('parse')
+    decrypted = decrypt_object(encryptor, obj)
+    timer.mark('crypto')
+    out = out_codec.dumps(decrypted)
+    timer.mark('render')
+    return out
+
+
+def encrypt_fields_body(encryptor: Encryptor, fields: FieldTree, body: bytes,
+                        codec: Codec = JSON, out_codec: Codec = JSON) -> bytes:
+    """``/encrypt?fields=...``: encrypt only the values *fields* selects (any depth); keep the rest."""
+    timer = stage_timer('encrypt_fields')
+    obj = require_object(parse_body(body, codec))
+    timer.mark('parse')
+    apply_fields(obj, fields, encryptor.encrypt_value)
+    timer.mark('crypto')
+    out = out_codec.dumps(obj)
+    timer.mark('render')
+    return out
+
+
+def decrypt_fields_body(encryptor: Encryptor, fields: FieldTree, body: bytes,
+                        codec: Codec = JSON, out_codec: Codec = JSON) -> bytes:
+    """``/decrypt?fields=...``: decode only the selected values that are tokens; keep the rest."""
+    timer = stage_timer('decrypt_fields')
+    obj = require_object(parse_body(body, codec))
+    timer.mark('parse')
+    apply_fields(obj, fields, lambda value: decrypt_field(encryptor, value))
+    timer.mark('crypto')
+    out = out_codec.dumps(obj)
+    timer.mark('render')
+    return out
+
+
+def sign_body(signer: Signer, body: bytes, codec: Codec = JSON, out_codec: Codec = JSON) -> bytes:
+    """``/sign``: any value's bytes -> ``{"signature": ...}``."""
+    timer = stage_timer('sign')
+    payload = parse_body(body, codec)
+    timer.mark('parse')
+    msg = canonicalize(payload)
+    timer.mark('canonicalize')
+    signature = signer.sign_canonical(msg)
+    timer.mark('crypto')
+    out = out_codec.dumps(signature_fields(signer, signature))
+    timer.mark('render')
+    return out
+
+
+def sign_merkle_body(signer: Signer, with_leaves: bool, partial: bool, body: bytes,
+                     codec: Codec = JSON, out_codec: Codec = JSON) -> bytes:
+    """``/sign?mode=merkle``: object bytes -> ``{"signature"[, "leaves"]}``.
+
+    With *partial*, the body is ``{"data": {changed members}, "leaves":
+    {member: digest}}`` and only the changed members are hashed.
+    """
+    timer = stage_timer('sign_merkle')
+    payload = parse_body(body, codec)
+    if not partial:
+        data, given = require_object(payload), None
+    elif (isinstance(payload, dict) and isinstance(payload.get('data'), dict)
+          and _valid_leaves(payload.get('leaves', {}))):
+        data, given = payload['data'], payload.get('leaves')
+    else:
+        checked = validate_model(MerkleSignInput, payload)
+        data, given = checked.data, checked.leaves
+    timer.mark('parse')
+    leaves = merkle_leaves(data, given)
+    timer.mark('canonicalize')
+    signature = sign_leaves(signer, leaves)
+    timer.mark('crypto')
+    out: Dict[str, Any] = signature_fields(signer, signature)
+    if with_leaves:
+        out['leaves'] = {key: digest.hex() for key, digest in leaves.items()}
+    out = out_codec.dumps(out)
+    timer.mark('render')
+    return out
+
+
+def verify_body(signer: Signer, body: bytes, codec: Codec = JSON, merkle: bool = False) -> None:
+    """``/verify``: validate ``{"signature", "data"[, "leaves"][, "alg"]}`` by hand, then verify.
+
+    A body with ``leaves`` (or *merkle*, i.e. ``?mode=merkle``) is checked
+    as a Merkle signature over ``data`` plus those leaf digests. ``alg``
+    selects the algorithm; without it the signature is HMAC-SHA256.
+    """
+    timer = stage_timer('verify')
+    payload = parse_body(body, codec)
+    if isinstance(payload, dict):
+        signature, data, leaves = payload.get('signature'), payload.get('data'), payload.get('leaves')
+        alg = payload.get('alg')
+    else:
+        signature = data = leaves = alg = None
+    if not (isinstance(signature, str) and signature.strip() and isinstance(data, dict)
+            and (leaves is None or _valid_leaves(leaves)) and (alg is None or isinstance(alg, str))):
+        # Slow path: let the pydantic model produce the exact 422 body.
+        checked = validate_model(VerifyInput, payload)
+        signature, data, leaves, alg = checked.signature, checked.data, checked.leaves, checked.alg
+    signer = signer.for_algorithm(alg or DEFAULT_ALGORITHM)
+    timer.mark('parse')
+    try:
+        if merkle or leaves is not None:
+            if not verify_leaves(signer, signature, merkle_leaves(data, leaves)):
+                raise APIError(status_code=400, code='invalid_signature', message='Invalid signature')
+        else:
+            # Canonicalization happens inside Signer.verify, so it counts as crypto.
+            verify_signature(signer, signature, data)
+    finally:
+        timer.mark('crypto')
+
+
+def respond(fmt: Negotiated, op: Callable[..., bytes], *args: Any) -> Tuple[bytes, Optional[str]]:
+    """Run ``op(*args)`` with *fmt*'s codecs; compress its output if large enough.
+
+    Returns ``(content, content_encoding)``. Compression runs in the same
+    call as the operation, so it leaves the event loop whenever the
+    operation does, and a process pool ships back the compressed bytes.
+    """
+    out = op(*args, fmt.codec, fmt.out_codec)
+    if fmt.encoding is None or len(out) < fmt.compress_min_bytes:
+        return out, None
+    timer = stage_timer('compress')
+    out = compress(out, fmt.encoding)
+    timer.mark(fmt.encoding)
+    return out, fmt.encoding
+
+
+def sign_file(signer: Signer, path: str) -> bytes:
+    """``/sign/stream``: sign the JSON document spooled at *path*.
+
+    The file is memory-mapped and canonicalized in chunks straight into the
+    signer, so the document is never parsed or re-serialized as a whole; the
+    signature equals ``/sign`` on the same document.
+    """
+    with mapped(path) as buf:
+        try:
+            signature = signer.sign_chunks(iter_canonical(buf))
+        except JsonScanError as exc:
+            raise json_invalid_error(exc.pos, exc.msg)
+    return orjson.dumps(signature_fields(signer, signature))
+
+
+# Streaming /encrypt and /decrypt (app/streaming.py). Output bytes are the same
+# as ``orjson.dumps`` of the buffered result, written one member at a time.
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def index_body(buf) -> Dict[str, Tuple[int, int]]:
+    """Validate the top-level object in *buf* and index its members (422 on error)."""
+    try:
+        return index_object(buf)
+    except JsonScanError as exc:
+        if exc.msg == 'expected object':
+            raise require_object_error()
+        raise json_invalid_error(exc.pos, exc.msg)
+
+
+def iter_encrypted_object(encryptor: Encryptor, buf, index: Dict[str, Tuple[int, int]]) -> Iterator[bytes]:
+    """Yield ``{"key":"token",...}`` in chunks, one member encrypted at a time."""
+    return _iter_object(buf, index, encryptor.encrypt_value)
+
+
+def iter_decrypted_object(encryptor: Encryptor, buf, index: Dict[str, Tuple[int, int]]) -> Iterator[bytes]:
+    """Yield the decrypted object in chunks, one member decrypted at a time."""
+    return _iter_object(buf, index, lambda v: decrypt_field(encryptor, v))
+
+
+def _iter_object(buf, index: Dict[str, Tuple[int, int]], transform: Callable[[Any], Any]) -> Iterator[bytes]:
+    def pieces() -> Iterator[bytes]:
+        sep = b'{'
+        for key, (vstart, vend) in index.items():
+            yield sep + orjson.dumps(key) + b':' + orjson.dumps(transform(load_span(buf, vstart, vend)))
+            sep = b','
+        yield b'}' if index else b'{}'
+    return coalesce(pieces(), STREAM_CHUNK_BYTES)
@@ -0,0 +1,43 @@
+"""Production entry point: ``python -m app.serve [gunicorn options]``.
+
+Runs gunicorn with :mod:`app.gunicorn_conf` on ``app.main:app``; extra
+arguments are passed to gunicorn (e.g. ``--bind 127.0.0.1:9000 --workers 2``).
+For development, ``uvicorn app.main:app --reload`` is still the way.
+"""
+from __future__ import annotations
+import sys
+from typing import List, Optional
+from uvicorn.workers import UvicornWorker as _UvicornWorker
+
+APP = 'app.main:app'
+CONFIG = 'python:app.gunicorn_conf'
+
+
+class UvicornWorker(_UvicornWorker):
+    """Uvicorn worker bounded by gunicorn's graceful timeout.
+
+    ``loop``/``http`` ``auto`` pick uvloop and httptools when installed
+    (``pip install uvloop httptools``) and fall back to asyncio and h11.
+    ``lifespan='on'`` makes a failing start-up stop the worker instead of
+    serving without it. In-flight requests get slightly less than
+    ``graceful_timeout`` to finish, so the lifespan shutdown still runs
+    before gunicorn kills the worker.
+    """
+
+    CONFIG_KWARGS = {'loop': 'auto', 'http': 'auto', 'lifespan': 'on'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(1, int(self.cfg.graceful_timeout) - 1)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from gunicorn.app.wsgiapp import WSGIApplication
+
+    args = sys.argv[1:] if argv is None else argv
+    sys.argv = ['app.serve', '--config', CONFIG, *args, APP]
+    WSGIApplication('%(prog)s [OPTIONS]').run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""asyncio client for the Unix-socket sidecar transport.
+
+One connection carries any number of concurrent requests: each call sends
+its frame right away and waits for the response with its id, so callers
+simply ``asyncio.gather`` to pipeline::
+
+    async with await SidecarClient.connect('/run/riot/crypto.sock') as client:
+        tokens = await client.encrypt({'name': 'John'})
+        signatures = await asyncio.gather(*(client.sign(doc) for doc in docs))
+        assert await client.verify(signatures[0], docs[0])
+
+Depends on orjson and :mod:`app.sidecar.protocol` only (not on the server).
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+import struct
+from typing import Any, Dict, Optional
+import orjson
+from .protocol import (
+    HEADER, HEADER_BYTES, MAX_REQUEST_ID, OP_DECRYPT, OP_ENCRYPT, OP_SIGN, OP_VERIFY, PREFIX_BYTES,
+    STATUS_OK, frame,
+)
+
+_LENGTH = struct.Struct('!I')
+
+
+class SidecarError(Exception):
+    """Error response from the server (``code`` as in the HTTP API's error bodies)."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f'{code}: {message}')
+        self.code = code
+        self.message = message
+
+
+class _ClientProtocol(asyncio.Protocol):
+    def __init__(self):
+        self.transport: Optional[asyncio.Transport] = None
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.writable = asyncio.Event()
+        self.writable.set()
+        self.closed: Optional[Exception] = None
+        self._buf = bytearray()
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def connection_lost(self, exc) -> None:
+        self.closed = exc or ConnectionResetError('sidecar connection closed')
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(self.closed)
+        self.pending.clear()
+        self.writable.set()  # wake writers so they see the error
+
+    def data_received(self, data: bytes) -> None:
+        buf = self._buf
+        buf += data
+        pos, size = 0, len(buf)
+        while size - pos >= HEADER_BYTES:
+            (length,) = _LENGTH.unpack_from(buf, pos)
+            end = pos + PREFIX_BYTES + length
+            if end > size:
+                break
+            _, status, request_id = HEADER.unpack_from(buf, pos)
+            future = self.pending.pop(request_id, None)
+            if future is not None and not future.done():
+                future.set_result((status, bytes(buf[pos + HEADER_BYTES:end])))
+            pos = end
+        del buf[:pos]
+
+    def pause_writing(self) -> None:
+        self.writable.clear()
+
+    def resume_writing(self) -> None:
+        self.writable.set()
+
+
+class SidecarClient:
+    """A connection to the sidecar socket; safe to share between tasks of one event loop."""
+
+    def __init__(self, transport: asyncio.Transport, protocol: _ClientProtocol):
+        self._transport = transport
+        self._protocol = protocol
+        self._ids = itertools.count(1)
+
+    @classmethod
+    async def connect(cls, path: str) -> 'SidecarClient':
+        transport, protocol = await asyncio.get_running_loop().create_unix_connection(_ClientProtocol, path)
+        return cls(transport, protocol)
+
+    async def request(self, op: int, payload: bytes) -> bytes:
+        """Send one ``OP_*`` request; return the response payload or raise :class:`SidecarError`."""
+        protocol = self._protocol
+        if not protocol.writable.is_set():
+            await protocol.writable.wait()
+        if protocol.closed is not None:
+            raise protocol.closed
+        request_id = next(self._ids) & MAX_REQUEST_ID
+        while request_id in protocol.pending or request_id == 0:
+            request_id = next(self._ids) & MAX_REQUEST_ID
+        future = asyncio.get_running_loop().create_future()
+        protocol.pending[request_id] = future
+        self._transport.write(frame(op, request_id, payload))
+        try:
+            status, body = await future
+        finally:
+            protocol.pending.pop(request_id, None)
+        if status != STATUS_OK:
+            error = orjson.loads(body)
+            raise SidecarError(error.get('code', 'error'), error.get('error', ''))
+        return body
+
+    async def encrypt(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        return orjson.loads(await self.request(OP_ENCRYPT, orjson.dumps(obj)))
+
+    async def decrypt(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        return orjson.loads(await self.request(OP_DECRYPT, orjson.dumps(obj)))
+
+    async def sign(self, value: Any) -> str:
+        return orjson.loads(await self.request(OP_SIGN, orjson.dumps(value)))['signature']
+
+    async def verify(self, signature: str, data: Dict[str, Any]) -> bool:
+        """True if *signature* matches *data*; False on ``invalid_signature``; other errors raise."""
+        try:
+            await self.request(OP_VERIFY, orjson.dumps({'signature': signature, 'data': data}))
+        except SidecarError as exc:
+            if exc.code == 'invalid_signature':
+                return False
+            raise
+        return True
+
+    async def close(self) -> None:
+        self._transport.close()
+        if self._protocol.closed is None:
+            await asyncio.sleep(0)  # let connection_lost run
+
+    async def __aenter__(self) -> 'SidecarClient':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
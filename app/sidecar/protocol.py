@@ -0,0 +1,40 @@
+"""Frame format of the Unix-domain-socket sidecar transport.
+
+Every message, in both directions, is one frame::
+
+    length   u32  big-endian, bytes that follow (header rest + payload)
+    kind     u8   request: op code (OP_*); response: STATUS_OK / STATUS_ERROR
+    id       u32  request id chosen by the client, echoed in the response
+    payload  length - 5 bytes
+
+Payloads are the HTTP bodies of the same operations, in JSON: ``/encrypt``
+and ``/decrypt`` take and return an object, ``/sign`` takes any value and
+returns ``{"signature": ...}``, ``/verify`` takes ``{"signature", "data"}``
+and returns nothing. An error response carries the ``APIErrorResponse``
+body, ``{"error": ..., "code": ...}``.
+
+A connection may carry any number of outstanding requests; responses come
+back as each completes, so not necessarily in request order. This module
+only depends on the standard library, so the client can be vendored.
+"""
+from __future__ import annotations
+import struct
+
+HEADER = struct.Struct('!IBI')
+HEADER_BYTES = HEADER.size
+PREFIX_BYTES = 4  # the length field
+MAX_REQUEST_ID = 2 ** 32 - 1
+
+OP_ENCRYPT = 1
+OP_DECRYPT = 2
+OP_SIGN = 3
+OP_VERIFY = 4
+OP_NAMES = {OP_ENCRYPT: 'encrypt', OP_DECRYPT: 'decrypt', OP_SIGN: 'sign', OP_VERIFY: 'verify'}
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+
+def frame(kind: int, request_id: int, payload: bytes) -> bytes:
+    """One complete frame."""
+    return HEADER.pack(len(payload) + HEADER_BYTES - PREFIX_BYTES, kind, request_id) + payload
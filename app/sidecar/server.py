@@ -0,0 +1,240 @@
+"""Unix-domain-socket sidecar transport (frame format: app/sidecar/protocol.py).
+
+For co-located callers with sub-KB payloads, where HTTP parsing, routing
+and middleware cost far more than the crypto. Requests run the same
+``ops.*_body`` functions as the HTTP routes, with the strategies from
+:mod:`app.deps` (default keyring ring: there is no tenant header) and the
+worker's :class:`~app.offload.Offloader`: small payloads are answered
+straight from ``data_received``, large ones on the pool, so responses on one
+connection may overtake each other. Admission control and the HTTP
+middleware do not apply; the offloader's ``server_busy`` still does.
+
+The listening socket is created once (:func:`listen_socket`); under
+gunicorn the master creates it before forking so all workers accept on it.
+"""
+from __future__ import annotations
+import asyncio
+import logging
+import os
+import socket
+import stat
+import struct
+import sys
+from typing import Any, Callable, Optional, Set, Tuple
+import orjson
+from fastapi.exceptions import RequestValidationError
+from app import ops
+from app.config import settings
+from app.deps import get_encryptor, get_offloader, get_signer
+from app.errors import APIError
+from app.metrics import SIDECAR_REQUESTS
+from .protocol import (
+    HEADER, HEADER_BYTES, OP_DECRYPT, OP_ENCRYPT, OP_NAMES, OP_SIGN, OP_VERIFY, PREFIX_BYTES, STATUS_ERROR,
+    STATUS_OK, frame,
+)
+
+logger = logging.getLogger('riot-crypto-api.sidecar')
+
+_LENGTH = struct.Struct('!I')
+SOCKET_MODE = 0o660
+# Python 3.13+ unlinks a Unix server's path on close; the path belongs to
+# the process that created the socket (see remove_socket), not to a worker.
+_SERVER_KWARGS = {'cleanup_socket': False} if sys.version_info >= (3, 13) else {}
+
+# (path, pid of the creating process, socket)
+_listener: Optional[Tuple[str, int, socket.socket]] = None
+
+
+def _operation(op: int) -> Tuple[Callable[..., Optional[bytes]], Any]:
+    if op == OP_ENCRYPT:
+        return ops.encrypt_body, get_encryptor()
+    if op == OP_DECRYPT:
+        return ops.decrypt_body, get_encryptor()
+    if op == OP_SIGN:
+        return ops.sign_body, get_signer()
+    if op == OP_VERIFY:
+        return ops.verify_body, get_signer()
+    raise APIError(status_code=400, code='unknown_op', message=f'Unknown op code {op}')
+
+
+def _error_body(exc: Exception) -> bytes:
+    if isinstance(exc, APIError):
+        code, message = exc.code, exc.message
+    elif isinstance(exc, RequestValidationError):
+        first = exc.errors()[0]
+        code = 'validation_error'
+        message = f"{'.'.join(str(part) for part in first['loc'])}: {first['msg']}"
+    else:
+        logger.exception('sidecar request failed')
+        code, message = 'internal_error', 'Internal server error'
+    return orjson.dumps({'error': message, 'code': code})
+
+
+class SidecarProtocol(asyncio.Protocol):
+    """One client connection: parses frames and answers them as they complete."""
+
+    def __init__(self, max_frame_bytes: int, max_in_flight: int):
+        self.max_frame_bytes = max_frame_bytes
+        self.max_in_flight = max_in_flight
+        self.transport: Optional[asyncio.Transport] = None
+        self._buf = bytearray()
+        self._tasks: Set[asyncio.Task] = set()
+        self._write_paused = False
+        self._read_paused = False
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def connection_lost(self, exc) -> None:
+        self.transport = None
+
+    def data_received(self, data: bytes) -> None:
+        buf = self._buf
+        buf += data
+        pos, size = 0, len(buf)
+        while size - pos >= PREFIX_BYTES:
+            (length,) = _LENGTH.unpack_from(buf, pos)
+            end = pos + PREFIX_BYTES + length
+            if length < HEADER_BYTES - PREFIX_BYTES or length - HEADER_BYTES + PREFIX_BYTES > self.max_frame_bytes:
+                self._abort(buf, pos, length)
+                return
+            if end > size:
+                break
+            _, op, request_id = HEADER.unpack_from(buf, pos)
+            self._dispatch(op, request_id, bytes(buf[pos + HEADER_BYTES:end]))
+            pos = end
+        del buf[:pos]
+
+    def _abort(self, buf: bytearray, pos: int, length: int) -> None:
+        """Answer a frame that cannot be read (if its id arrived) and drop the connection."""
+        if len(buf) - pos >= HEADER_BYTES:
+            _, _, request_id = HEADER.unpack_from(buf, pos)
+            if length >= HEADER_BYTES - PREFIX_BYTES:
+                error = APIError(status_code=413, code='payload_too_large', message='Frame too large')
+            else:
+                error = APIError(status_code=400, code='invalid_frame', message='Invalid frame')
+            self._send(request_id, STATUS_ERROR, _error_body(error))
+        buf.clear()
+        if self.transport is not None:
+            self.transport.close()
+
+    def _dispatch(self, op: int, request_id: int, payload: bytes) -> None:
+        offloader = get_offloader()
+        if offloader.runs_inline(len(payload)):
+            try:
+                fn, strategy = _operation(op)
+                result = fn(strategy, payload)
+            except Exception as exc:  # every failure becomes an error frame
+                self._error(op, request_id, exc)
+            else:
+                self._ok(op, request_id, result)
+            return
+        task = asyncio.get_running_loop().create_task(self._offload(offloader, op, request_id, payload))
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        self._update_reading()
+
+    async def _offload(self, offloader, op: int, request_id: int, payload: bytes) -> None:
+        try:
+            fn, strategy = _operation(op)
+            result = await offloader.run(len(payload), fn, strategy, payload)
+        except Exception as exc:
+            self._error(op, request_id, exc)
+        else:
+            self._ok(op, request_id, result)
+
+    def _ok(self, op: int, request_id: int, result: Optional[bytes]) -> None:
+        SIDECAR_REQUESTS.inc((OP_NAMES[op], 'ok'))
+        self._send(request_id, STATUS_OK, result or b'')
+
+    def _error(self, op: int, request_id: int, exc: Exception) -> None:
+        SIDECAR_REQUESTS.inc((OP_NAMES.get(op, 'unknown'), 'error'))
+        self._send(request_id, STATUS_ERROR, _error_body(exc))
+
+    def _send(self, request_id: int, status: int, payload: bytes) -> None:
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.write(frame(status, request_id, payload))
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        self._update_reading()
+
+    # Back-pressure: stop reading while the client does not read its
+    # responses or while too many of its requests are on the pool.
+    def pause_writing(self) -> None:
+        self._write_paused = True
+        self._update_reading()
+
+    def resume_writing(self) -> None:
+        self._write_paused = False
+        self._update_reading()
+
+    def _update_reading(self) -> None:
+        if self.transport is None or self.transport.is_closing():
+            return
+        pause = self._write_paused or len(self._tasks) >= self.max_in_flight
+        if pause != self._read_paused:
+            self._read_paused = pause
+            if pause:
+                self.transport.pause_reading()
+            else:
+                self.transport.resume_reading()
+
+
+def listen_socket(path: str) -> socket.socket:
+    """The listening socket at *path*, created on first call (mode 0660).
+
+    A leftover socket file nobody listens on is replaced; a live one is an
+    error, so two servers never silently share a path.
+    """
+    global _listener
+    if _listener is not None and _listener[0] == path:
+        return _listener[2]
+    if os.path.exists(path):
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            raise RuntimeError(f'{path} exists and is not a socket')
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+        else:
+            raise RuntimeError(f'{path} is in use by another server')
+        finally:
+            probe.close()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # Create the file with SOCKET_MODE already applied: binding under the
+    # process umask and chmod-ing afterwards leaves a window with looser
+    # permissions. (The umask is process-wide; this runs at startup.)
+    umask = os.umask(0o777 & ~SOCKET_MODE)
+    try:
+        sock.bind(path)
+    finally:
+        os.umask(umask)
+    sock.listen(settings.backlog)
+    sock.setblocking(False)
+    _listener = (path, os.getpid(), sock)
+    return sock
+
+
+def remove_socket() -> None:
+    """Close the listening socket; its creator also removes the file."""
+    global _listener
+    if _listener is None:
+        return
+    path, pid, sock = _listener
+    sock.close()
+    if pid == os.getpid():
+        _listener = None
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+async def start_server(path: str) -> asyncio.AbstractServer:
+    """Serve the sidecar protocol on *path* from the running loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.create_unix_server(
+        lambda: SidecarProtocol(settings.max_body_bytes, settings.sidecar_max_in_flight),
+        sock=listen_socket(path), **_SERVER_KWARGS)
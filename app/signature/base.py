@@ -1,6 +1,12 @@
 from __future__ import annotations
+import hmac
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Dict, Iterable
+from app.errors import APIError
+
+# Algorithm of untagged signatures: everything signed before the registry
+# (app/signature/registry.py) existed, and still the default.
+DEFAULT_ALGORITHM = 'hmac-sha256'
 
 class Signer(ABC):
     """Abstract interface for signing and verifying JSON values.
@@ -8,7 +14,11 @@ class Signer(ABC):
 
     Implementations must be order-independent: the same JSON semantics should
     yield the same signature even if property orders differ.
+
+    ``algorithm`` names the signature algorithm (a key of
+    :data:`app.signature.registry.ALGORITHMS`).
     """
+    algorithm: str = DEFAULT_ALGORITHM
     @abstractmethod
     def sign(self, data: Any) -> str:
         """Compute a signature for *data*.
@@ -21,6 +31,32 @@ class Signer(ABC):
         """
         raise NotImplementedError
     @abstractmethod
+    def sign_canonical(self, msg: bytes) -> str:
+        """Compute a signature over already-canonical JSON bytes.
+
+
+        Lets decorators (e.g. caching) canonicalize once and reuse the bytes.
+        Also called with non-JSON bytes (Merkle roots, see
+        :mod:`app.signature.merkle`), so it cannot defer to :meth:`sign`.
+        """
+        raise NotImplementedError
+    def sign_chunks(self, chunks: Iterable[bytes]) -> str:
+        """Compute a signature over canonical JSON bytes supplied in pieces.
+
+
+        Equivalent to ``sign_canonical(b''.join(chunks))``; implementations
+        that can hash incrementally override this to keep memory bounded.
+        """
+        return self.sign_canonical(b''.join(chunks))
+    def verify_canonical(self, signature: str, msg: bytes) -> bool:
+        """Check *signature* against already-canonical bytes *msg* (constant time).
+
+
+        Signers whose signatures are not plainly ``sign_canonical(msg)``
+        (e.g. key ids routing to one of several keys) override this.
+        """
+        return hmac.compare_digest(self.sign_canonical(msg), signature)
+    @abstractmethod
     def verify(self, signature: str, data: Any) -> bool:
         """Check whether *signature* matches *data*.
 
@@ -29,3 +65,35 @@ class Signer(ABC):
         bool: True if valid, False otherwise.
         """
         raise NotImplementedError
+    def for_algorithm(self, algorithm: str) -> 'Signer':
+        """The signer with the same key(s) for *algorithm* (400 ``unsupported_algorithm`` if it has none)."""
+        if algorithm == self.algorithm:
+            return self
+        raise APIError(status_code=400, code='unsupported_algorithm',
+                       message=f'Signature algorithm {algorithm!r} is not available')
+
+
+class KeyedSigner(Signer):
+    """Signer built from a single secret, with pre-keyed state kept for reuse.
+
+    Signers for the same secret under other algorithms are built through the
+    registry on first :meth:`for_algorithm` call and kept, so every
+    algorithm pays its key setup once per process.
+    """
+    empty_secret_message = 'Signing secret must not be empty'
+    def __init__(self, secret: bytes):
+        if not secret:
+            raise ValueError(self.empty_secret_message)
+        self._secret = secret
+        self._siblings: Dict[str, Signer] = {}
+    def __reduce__(self):
+        # Pre-keyed hash objects are not picklable; rebuild them from the key.
+        return (type(self), (self._secret,))
+    def for_algorithm(self, algorithm: str) -> Signer:
+        if algorithm == self.algorithm:
+            return self
+        signer = self._siblings.get(algorithm)
+        if signer is None:
+            from .registry import build_signer
+            signer = self._siblings.setdefault(algorithm, build_signer(algorithm, self._secret))
+        return signer
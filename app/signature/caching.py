@@ -0,0 +1,45 @@
+from __future__ import annotations
+import hmac
+from typing import Any, Iterable
+from app.utils.json_canonical import canonicalize
+from app.utils.lru import BoundedLRUCache
+from .base import Signer
+
+class CachingSigner(Signer):
+    """Signer decorator caching signatures by canonical JSON bytes.
+
+    Repeated payloads are canonicalized (cheap) and then served from the cache
+    instead of being re-hashed. The cache belongs to one signer, i.e. one key:
+    a new signer (new secret) starts with an empty cache.
+    """
+
+    def __init__(self, inner: Signer, cache: BoundedLRUCache):
+        self._inner = inner
+        self.cache = cache
+        self.algorithm = inner.algorithm
+
+    def __reduce__(self):
+        # The cache is per process: pickling (e.g. for a process pool) ships
+        # only the wrapped strategy.
+        return self._inner.__reduce__()
+
+    def sign(self, data: Any) -> str:
+        return self.sign_canonical(canonicalize(data))
+
+    def sign_canonical(self, msg: bytes) -> str:
+        signature = self.cache.get(msg)
+        if signature is None:
+            signature = self._inner.sign_canonical(msg)
+            self.cache.put(msg, signature, len(msg) + len(signature))
+        return signature
+
+    def sign_chunks(self, chunks: Iterable[bytes]) -> str:
+        # Streamed documents are too large to key a cache on.
+        return self._inner.sign_chunks(chunks)
+
+    def verify(self, signature: str, data: Any) -> bool:
+        return hmac.compare_digest(self.sign(data), signature)
+
+    def for_algorithm(self, algorithm: str) -> Signer:
+        # Other algorithms of the same key are served uncached.
+        return self if algorithm == self.algorithm else self._inner.for_algorithm(algorithm)
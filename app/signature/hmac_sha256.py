@@ -1,26 +1,46 @@
 from __future__ import annotations
 import hmac, hashlib
-from typing import Any
+from typing import Any, Iterable
 from app.utils.json_canonical import canonicalize
-from .base import Signer
+from .base import KeyedSigner
 
-class HmacSha256Signer(Signer):
+class HmacSha256Signer(KeyedSigner):
     """Signer that computes HMAC-SHA256 over canonical JSON bytes.
 
 
     The use of canonical JSON ensures order-independent signatures, satisfying
     the requirement that property reordering must not change the signature.
+
+    The key schedule (ipad/opad blocks) is computed once: a pre-keyed HMAC
+    template is kept and ``.copy()``-ed per message, so instances are meant to
+    be long-lived (see :func:`app.deps.get_signer`). Copies are independent,
+    so a single instance is safe to share between concurrent requests.
     """
 
+    algorithm = 'hmac-sha256'
+    digestmod: Any = hashlib.sha256
+    empty_secret_message = 'HMAC secret must not be empty'
+
     def __init__(self, secret: bytes):
-        if not secret:
-            raise ValueError('HMAC secret must not be empty')
-        self._secret = secret
+        super().__init__(secret)
+        self._template = hmac.new(secret, digestmod=self.digestmod)
 
     def sign(self, data: Any) -> str:
-        """Return hex-encoded HMAC-SHA256 signature for *data*."""
-        msg = canonicalize(data)
-        return hmac.new(self._secret, msg, hashlib.sha256).hexdigest()
+        """Return hex-encoded HMAC signature for *data*."""
+        return self.sign_canonical(canonicalize(data))
+
+    def sign_canonical(self, msg: bytes) -> str:
+        """Return hex-encoded HMAC of already-canonical bytes *msg*."""
+        mac = self._template.copy()
+        mac.update(msg)
+        return mac.hexdigest()
+
+    def sign_chunks(self, chunks: Iterable[bytes]) -> str:
+        """Incremental :meth:`sign_canonical`: feeds each chunk to ``update()``."""
+        mac = self._template.copy()
+        for chunk in chunks:
+            mac.update(chunk)
+        return mac.hexdigest()
 
     def verify(self, signature: str, data: Any) -> bool:
         """Return True if *signature* matches *data*, else False.
@@ -30,3 +50,11 @@ class HmacSha256Signer(Signer):
         """
         expected = self.sign(data)
         return hmac.compare_digest(expected, signature)
+
+
+class HmacSha512_256Signer(HmacSha256Signer):
+    """HMAC over SHA-512/256: 64-bit arithmetic, so faster than SHA-256 on
+    64-bit CPUs without SHA extensions; same 32-byte (64 hex) output."""
+
+    algorithm = 'hmac-sha512-256'
+    digestmod = 'sha512_256'
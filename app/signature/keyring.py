@@ -0,0 +1,230 @@
+"""Multi-key HMAC signing with key ids, per-tenant keyrings and hot reload.
+
+Signatures made from a keyring carry the id of the key that made them:
+``<kid>.<hex>``. Verification splits off the id and checks against exactly
+one pre-keyed signer found in a dict, so rotating keys (sign with the new
+one, keep old ones for verification) costs no extra HMAC work.
+
+The keyring file (``APP_KEYRING_FILE``) is JSON::
+
+    {
+      "active": "2024-06",
+      "keys": {"2024-01": "old secret", "2024-06": "new secret"},
+      "unprefixed": "2024-01",
+      "tenants": {
+        "acme": {"active": "a2", "keys": {"a1": "...", "a2": "..."}}
+      }
+    }
+
+``unprefixed`` (optional) names the key that verifies signatures without a
+key id, i.e. those issued before the keyring was introduced. ``tenants``
+(optional) holds per-tenant rings selected with the ``X-Tenant-ID`` header;
+the top-level ring serves requests without the header.
+"""
+from __future__ import annotations
+import hmac
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+import orjson
+from app.errors import APIError
+from app.utils.json_canonical import canonicalize
+from app.utils.lru import BoundedLRUCache
+from .base import DEFAULT_ALGORITHM, Signer
+from .registry import build_signer
+
+logger = logging.getLogger('riot-crypto-api.keyring')
+
+TENANT_HEADER = 'X-Tenant-ID'
+KEY_ID_SEPARATOR = '.'
+_KEY_ID = re.compile(r'[A-Za-z0-9_-]{1,64}')
+# Rough per-key footprint (HMAC states + bookkeeping) for the signer cache bound.
+_KEY_OVERHEAD_BYTES = 512
+
+
+def _check_ring(keys: Mapping[str, Any], active: str, unprefixed: Optional[str]) -> None:
+    """Raise ValueError unless key ids are well-formed and *active*/*unprefixed* name keys."""
+    for kid in keys:
+        if not _KEY_ID.fullmatch(kid):
+            raise ValueError(f'invalid key id {kid!r} (1-64 of A-Z a-z 0-9 _ -)')
+    for role, kid in (('active', active), ('unprefixed', unprefixed)):
+        if kid is not None and kid not in keys:
+            raise ValueError(f'{role} key {kid!r} is not in the keyring')
+
+
+class KeyringSigner(Signer):
+    """Signs with the active key as ``<kid>.<hex>``; verifies with the key named in the signature.
+
+    Every key signs with *algorithm* (see app/signature/registry.py);
+    :meth:`for_algorithm` returns the same keyring under another one.
+    """
+
+    def __init__(self, keys: Mapping[str, bytes], active: str, unprefixed: Optional[str] = None,
+                 algorithm: str = DEFAULT_ALGORITHM):
+        _check_ring(keys, active, unprefixed)
+        self._secrets = dict(keys)
+        self._signers = {kid: build_signer(algorithm, secret) for kid, secret in self._secrets.items()}
+        self.algorithm = algorithm
+        self._siblings: Dict[str, KeyringSigner] = {}
+        self.active = active
+        self.unprefixed = unprefixed
+        self._prefix = active + KEY_ID_SEPARATOR
+        self._active = self._signers[active]
+
+    def __reduce__(self):
+        return (type(self), (self._secrets, self.active, self.unprefixed, self.algorithm))
+
+    def for_algorithm(self, algorithm: str) -> Signer:
+        if algorithm == self.algorithm:
+            return self
+        signer = self._siblings.get(algorithm)
+        if signer is None:
+            signer = KeyringSigner(self._secrets, self.active, self.unprefixed, algorithm)
+            self._siblings[algorithm] = signer
+        return signer
+
+    def sign(self, data: Any) -> str:
+        return self.sign_canonical(canonicalize(data))
+
+    def sign_canonical(self, msg: bytes) -> str:
+        return self._prefix + self._active.sign_canonical(msg)
+
+    def sign_chunks(self, chunks: Iterable[bytes]) -> str:
+        return self._prefix + self._active.sign_chunks(chunks)
+
+    def verify(self, signature: str, data: Any) -> bool:
+        return self.verify_canonical(signature, canonicalize(data))
+
+    def verify_canonical(self, signature: str, msg: bytes) -> bool:
+        kid, sep, mac = signature.partition(KEY_ID_SEPARATOR)
+        if sep:
+            signer = self._signers.get(kid)
+        else:
+            signer, mac = self._signers.get(self.unprefixed) if self.unprefixed else None, signature
+        if signer is None:
+            return False
+        return hmac.compare_digest(signer.sign_canonical(msg), mac)
+
+    def size_bytes(self) -> int:
+        return sum(len(secret) + _KEY_OVERHEAD_BYTES for secret in self._secrets.values())
+
+
+class _Ring(NamedTuple):
+    keys: Dict[str, bytes]
+    active: str
+    unprefixed: Optional[str]
+
+
+def _parse_ring(raw: Any, where: str) -> _Ring:
+    if (not isinstance(raw, dict) or not isinstance(raw.get('active'), str)
+            or not isinstance(raw.get('keys'), dict) or not raw['keys']):
+        raise ValueError(f'{where}: expected {{"active": "<kid>", "keys": {{"<kid>": "<secret>", ...}}}}')
+    keys = {}
+    for kid, secret in raw['keys'].items():
+        if not isinstance(secret, str) or not secret:
+            raise ValueError(f'{where}: key {kid!r} must be a non-empty string')
+        keys[kid] = secret.encode('utf-8')
+    ring = _Ring(keys, raw.get('active'), raw.get('unprefixed'))
+    # Signers (keyed hash state) are built on first use, in KeyringFile.signer.
+    _check_ring(ring.keys, ring.active, ring.unprefixed)
+    return ring
+
+
+def parse_keyring(raw: Any) -> Dict[Optional[str], _Ring]:
+    """Validate a keyring document; map tenant (``None`` = default) to its ring."""
+    if not isinstance(raw, dict):
+        raise ValueError('keyring must be a JSON object')
+    rings: Dict[Optional[str], _Ring] = {}
+    if 'keys' in raw:
+        rings[None] = _parse_ring(raw, 'keyring')
+    tenants = raw.get('tenants', {})
+    if not isinstance(tenants, dict):
+        raise ValueError('keyring: "tenants" must be an object')
+    for tenant, ring in tenants.items():
+        rings[tenant] = _parse_ring(ring, f'tenant {tenant!r}')
+    if not rings:
+        raise ValueError('keyring defines no keys')
+    return rings
+
+
+class KeyringFile:
+    """Keyring loaded from *path*, reloaded when the file changes.
+
+    The file's ``stat`` is checked at most every *reload_seconds*; a changed
+    file is re-parsed and, if valid, replaces the rings (an invalid edit is
+    logged and the previous keyring kept). Signers are built on first use
+    per tenant and kept in a bounded LRU cache, so thousands of tenants do
+    not all hold pre-keyed HMAC state.
+    """
+
+    def __init__(self, path: str, reload_seconds: float = 2.0, cache_entries: int = 1024,
+                 cache_bytes: int = 64 * 1024 * 1024, algorithm: str = DEFAULT_ALGORITHM):
+        self.path = path
+        self.algorithm = algorithm
+        self.reload_seconds = reload_seconds
+        self._cache_bounds = (cache_entries, cache_bytes)
+        self.cache = BoundedLRUCache(max_entries=cache_entries, max_bytes=cache_bytes)
+        self._lock = threading.Lock()
+        self._rings: Dict[Optional[str], _Ring] = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._generation = 0
+        self._next_check = 0.0
+        self.reloads = 0
+        self._load(initial=True)
+
+    def signer(self, tenant: Optional[str]) -> Signer:
+        """The signer for *tenant* (``None``: the default ring)."""
+        if time.monotonic() >= self._next_check:
+            self._maybe_reload()
+        key = (self._generation, tenant)
+        signer = self.cache.get(key)
+        if signer is None:
+            ring = self._rings.get(tenant)
+            if ring is None:
+                if tenant is None:
+                    raise APIError(status_code=400, code='tenant_required', message=f'{TENANT_HEADER} header required')
+                raise APIError(status_code=400, code='unknown_tenant', message=f'Unknown tenant {tenant!r}')
+            signer = KeyringSigner(ring.keys, ring.active, ring.unprefixed, self.algorithm)
+            self.cache.put(key, signer, signer.size_bytes())
+        return signer
+
+    def _file_stamp(self) -> Tuple[int, int, int]:
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _maybe_reload(self) -> None:
+        with self._lock:
+            if time.monotonic() < self._next_check:
+                return  # another thread just checked
+            self._next_check = time.monotonic() + self.reload_seconds
+            try:
+                changed = self._file_stamp() != self._stamp
+            except OSError as exc:
+                logger.error('keyring %s unreadable, keeping the loaded keys: %s', self.path, exc)
+                return
+            if changed:
+                self._load(initial=False)
+
+    def _load(self, initial: bool) -> None:
+        try:
+            stamp = self._file_stamp()
+            with open(self.path, 'rb') as f:
+                rings = parse_keyring(orjson.loads(f.read()))
+        except (OSError, ValueError) as exc:  # orjson.JSONDecodeError is a ValueError
+            if initial:
+                raise APIError(status_code=503, code='keyring_invalid', message=f'Keyring {self.path}: {exc}')
+            logger.error('keyring %s not reloaded, keeping the loaded keys: %s', self.path, exc)
+            return
+        # Drop signers of the old keys; the generation in the cache key also
+        # keeps a signer built from the old rings mid-reload from being reused.
+        self._rings, self._stamp = rings, stamp
+        self._generation += 1
+        if not initial:
+            self.cache = BoundedLRUCache(*self._cache_bounds)
+        self._next_check = time.monotonic() + self.reload_seconds
+        if not initial:
+            self.reloads += 1
+            logger.info('keyring %s reloaded (%d rings)', self.path, len(rings))
@@ -0,0 +1,58 @@
+"""Per-field (Merkle) signatures over JSON objects.
+
+Each depth-1 member is hashed on its own into a *leaf*::
+
+    leaf(k, v) = SHA-256(0x00 || canonicalize({k: v}))
+
+and the root hashes the leaves sorted by key::
+
+    root = SHA-256(0x01 || leaf_1 || ... || leaf_n)
+
+i.e. a two-level tree: verification is always given every leaf (changed
+ones recomputed, the others as digests), so deeper levels would only add
+hashing without enabling anything. The root is signed by any
+:class:`~.base.Signer` through ``sign_canonical(MERKLE_TAG + root)``.
+``MERKLE_TAG`` starts with a NUL byte, which canonical JSON never does, so
+a Merkle signature can never be replayed as a plain one (or vice versa).
+
+Like canonical JSON, the root does not depend on member order. Unlike it,
+a client that kept the leaf digests of a signed version can have a new
+version verified (or re-signed) by sending only the changed members plus
+the digests of the others: unchanged values are never re-serialized.
+"""
+from __future__ import annotations
+import hashlib
+import re
+from typing import Any, Dict, Mapping
+from app.utils.json_canonical import canonicalize
+from .base import Signer
+
+MERKLE_TAG = b'\x00merkle-sha256-v1\x00'
+LEAF_HEX = re.compile(r'[0-9a-f]{64}')
+_LEAF = b'\x00'
+_NODE = b'\x01'
+
+
+def leaf_digest(key: str, value: Any) -> bytes:
+    """SHA-256 leaf of the member ``key: value``."""
+    return hashlib.sha256(_LEAF + canonicalize({key: value})).digest()
+
+
+def leaf_digests(obj: Mapping[str, Any]) -> Dict[str, bytes]:
+    """Leaf of every depth-1 member of *obj*."""
+    return {key: leaf_digest(key, value) for key, value in obj.items()}
+
+
+def merkle_root(leaves: Mapping[str, bytes]) -> bytes:
+    """Root of *leaves* taken in key order."""
+    return hashlib.sha256(_NODE + b''.join([leaves[key] for key in sorted(leaves)])).digest()
+
+
+def sign_leaves(signer: Signer, leaves: Mapping[str, bytes]) -> str:
+    """Signature of the object whose members hash to *leaves*."""
+    return signer.sign_canonical(MERKLE_TAG + merkle_root(leaves))
+
+
+def verify_leaves(signer: Signer, signature: str, leaves: Mapping[str, bytes]) -> bool:
+    """Whether *signature* is the Merkle signature of the object whose members hash to *leaves*."""
+    return signer.verify_canonical(signature, MERKLE_TAG + merkle_root(leaves))
@@ -0,0 +1,54 @@
+"""Signature algorithms by name.
+
+``APP_SIGNATURE_ALG`` picks the default; ``/sign?alg=`` picks one per
+request and ``/verify`` reads the ``alg`` member of its body. Every
+algorithm uses the same secret (or keyring key) and signs canonical JSON.
+Signatures of any algorithm but ``hmac-sha256`` are returned with an
+``alg`` tag, so an untagged signature always means HMAC-SHA256, as it did
+before other algorithms existed.
+
+- ``hmac-sha256``: the original algorithm, and the default.
+- ``hmac-sha512-256``: HMAC over SHA-512/256.
+- ``blake2b``: keyed BLAKE2b-256, a single hash pass.
+
+Which is fastest depends on the CPU: with SHA extensions (most x86 since
+2017-2019, ARMv8) SHA-256 beats both others on large payloads; without
+them, BLAKE2b and SHA-512/256 are the faster ones (see the
+``sign[<alg>]/<bytes>`` cases of ``benchmarks/micro.py``).
+"""
+from __future__ import annotations
+import re
+from typing import Callable, Dict
+from app.errors import APIError
+from .base import Signer
+from .blake2b import Blake2bSigner
+from .hmac_sha256 import HmacSha256Signer, HmacSha512_256Signer
+
+ALGORITHMS: Dict[str, Callable[[bytes], Signer]] = {
+    'hmac-sha256': HmacSha256Signer,
+    'hmac-sha512-256': HmacSha512_256Signer,
+    'blake2b': Blake2bSigner,
+}
+ALG_DESCRIPTION = ('Signature algorithm: ' + ', '.join(ALGORITHMS)
+                   + ' (default: APP_SIGNATURE_ALG)')
+_NAME = re.compile(r'[a-z0-9][a-z0-9-]{0,31}')
+
+
+def register(name: str, factory: Callable[[bytes], Signer]) -> None:
+    """Make *factory* (secret -> pre-keyed signer) available as algorithm *name*."""
+    if not _NAME.fullmatch(name):
+        raise ValueError(f'invalid algorithm name {name!r} (a-z, 0-9, -)')
+    ALGORITHMS[name] = factory
+
+
+def unknown_algorithm_error(name: str) -> APIError:
+    return APIError(status_code=400, code='unknown_algorithm',
+                    message=f'Unknown signature algorithm {name!r} (one of: {", ".join(ALGORITHMS)})')
+
+
+def build_signer(name: str, secret: bytes) -> Signer:
+    """A new signer for *name* keyed with *secret* (400 ``unknown_algorithm`` if not registered)."""
+    factory = ALGORITHMS.get(name)
+    if factory is None:
+        raise unknown_algorithm_error(name)
+    return factory(secret)
@@ -0,0 +1,101 @@
+"""Streaming routes for documents larger than ``APP_MAX_BODY_BYTES``.
+
+Bodies are spooled to a temporary file as they arrive (limited by
+``APP_MAX_STREAM_BODY_BYTES``) and processed from a memory map through the
+incremental helpers in :mod:`app.utils.json_stream`, so neither the request,
+its canonical form nor the response is ever held in memory as a whole.
+"""
+from __future__ import annotations
+import os
+from typing import Iterator, Optional
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.deps import EncryptorDep, OffloaderDep, SignerDep
+from app.models import SignOutput
+from app.signature.registry import ALG_DESCRIPTION
+from app.utils.json_body import body_schema, missing_body_error
+from app.utils.json_stream import open_mapped, spool_to_file
+from app import ops
+
+STREAM_PATHS = ('/sign/stream', '/encrypt/stream', '/decrypt/stream')
+_OBJECT_BODY = body_schema({'type': 'object', 'additionalProperties': True})
+
+router = APIRouter()
+
+
+@router.post('/sign/stream', response_model=SignOutput, openapi_extra=body_schema({}),
+             summary='Sign a large JSON document with bounded memory')
+async def sign_stream(request: Request, signer: SignerDep, offloader: OffloaderDep,
+                      alg: Optional[str] = Query(None, description=ALG_DESCRIPTION)):
+    """Streaming form of ``/sign``: same signature, bounded peak memory.
+
+    The canonical JSON is produced in chunks and fed straight into the HMAC,
+    so peak memory is about ``STREAM_INLINE_BYTES`` (1 MiB) of parsed values
+    plus one key-index entry per member of each large object on the path
+    being walked, regardless of document size.
+    """
+    if alg is not None:
+        signer = signer.for_algorithm(alg)
+    path, size = await spool_to_file(request.stream())
+    try:
+        if size == 0:
+            raise missing_body_error()
+        if offloader.runs_inline(size):
+            # Still off the event loop: the file can be far larger than any inline job.
+            content = await run_in_threadpool(ops.sign_file, signer, path)
+        else:
+            content = await offloader.run(size, ops.sign_file, signer, path)
+    finally:
+        os.unlink(path)
+    return Response(content=content, media_type='application/json')
+
+
+async def _map_object_body(request: Request):
+    """Spool, map and index the body; the temp file is unlinked right away."""
+    path, size = await spool_to_file(request.stream())
+    try:
+        buf = open_mapped(path)
+    finally:
+        os.unlink(path)
+    if size == 0:
+        raise missing_body_error()
+    try:
+        # Validation pass over every member, off the event loop.
+        index = await run_in_threadpool(ops.index_body, buf)
+    except BaseException:
+        buf.close()
+        raise
+    return buf, index
+
+
+def _closing(buf, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    try:
+        yield from chunks
+    finally:
+        buf.close()
+
+
+@router.post('/encrypt/stream', openapi_extra=_OBJECT_BODY,
+             summary='Encrypt a wide object member by member, streaming the result')
+async def encrypt_stream(request: Request, encryptor: EncryptorDep):
+    """Streaming form of ``/encrypt``; the output bytes are identical.
+
+    Each top-level value is parsed, encrypted and written out on its own
+    (duplicate keys: first position, last value, as in ``/encrypt``). Peak
+    memory is the key index plus one value and one 64 KiB output chunk.
+    """
+    buf, index = await _map_object_body(request)
+    # A sync iterator: Starlette pulls each chunk on a worker thread.
+    return StreamingResponse(_closing(buf, ops.iter_encrypted_object(encryptor, buf, index)),
+                             media_type='application/json')
+
+
+@router.post('/decrypt/stream', openapi_extra=_OBJECT_BODY,
+             summary='Decrypt a wide object member by member, streaming the result')
+async def decrypt_stream(request: Request, encryptor: EncryptorDep):
+    """Streaming form of ``/decrypt``; the output bytes are identical."""
+    buf, index = await _map_object_body(request)
+    return StreamingResponse(_closing(buf, ops.iter_decrypted_object(encryptor, buf, index)),
+                             media_type='application/json')
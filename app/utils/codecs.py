@@ -0,0 +1,182 @@
+"""Body formats: JSON, MessagePack and CBOR.
+
+Binary bodies decode to the same Python values ``orjson`` produces for JSON,
+so everything downstream (encryption tokens, ``canonicalize`` and thus
+signatures) is identical whichever format the client speaks. Values with no
+JSON equivalent (bytes, non-string keys, tags and extension types,
+NaN/Infinity, integers outside 64 bits) are rejected with a 422.
+
+``msgpack`` and ``cbor2`` are optional dependencies, imported on first use.
+"""
+from __future__ import annotations
+import io
+import math
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+import orjson
+from fastapi.exceptions import RequestValidationError
+from app.utils.json_body import missing_body_error, parse_json_body
+
+
+class Codec(NamedTuple):
+    name: str  # also the prefix of the 422 error type, e.g. ``msgpack_invalid``
+    label: str
+    media_type: str
+    loads: Callable[[bytes], Any]  # raises ValueError on malformed input
+    dumps: Callable[[Any], bytes]
+
+
+def _msgpack_loads(body: bytes) -> Any:
+    import msgpack
+    try:
+        return msgpack.unpackb(body, raw=False, strict_map_key=True)
+    except (ValueError, TypeError) as exc:  # TypeError: unhashable map key
+        raise ValueError(str(exc) or type(exc).__name__) from None
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    import msgpack
+    return msgpack.packb(value, use_bin_type=True)
+
+
+def _cbor_loads(body: bytes) -> Any:
+    import cbor2
+    fp = io.BytesIO(body)
+    try:
+        value = cbor2.CBORDecoder(fp).decode()
+    except (cbor2.CBORDecodeError, RecursionError) as exc:
+        raise ValueError(str(exc) or type(exc).__name__) from None
+    if fp.tell() != len(body):
+        raise ValueError('extra data after the CBOR item')
+    return value
+
+
+def _cbor_dumps(value: Any) -> bytes:
+    import cbor2
+    return cbor2.dumps(value)
+
+
+JSON = Codec('json', 'JSON', 'application/json', orjson.loads, orjson.dumps)
+MSGPACK = Codec('msgpack', 'MessagePack', 'application/msgpack', _msgpack_loads, _msgpack_dumps)
+CBOR = Codec('cbor', 'CBOR', 'application/cbor', _cbor_loads, _cbor_dumps)
+
+# Media type (lowercase, without parameters) -> codec.
+MEDIA_TYPES: Dict[str, Codec] = {
+    'application/json': JSON,
+    'application/msgpack': MSGPACK,
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+    'application/cbor': CBOR,
+}
+
+# Documented request/response media types (one per codec).
+CODEC_MEDIA_TYPES = tuple(codec.media_type for codec in (JSON, MSGPACK, CBOR))
+
+_MODULES = {'msgpack': 'msgpack', 'cbor': 'cbor2'}
+_available: Dict[str, bool] = {'json': True}
+
+
+def available(codec: Codec) -> bool:
+    """Whether *codec*'s optional dependency is installed (checked once)."""
+    ok = _available.get(codec.name)
+    if ok is None:
+        try:
+            __import__(_MODULES[codec.name])
+            ok = True
+        except ImportError:
+            ok = False
+        _available[codec.name] = ok
+    return ok
+
+
+def parse_body(body: bytes, codec: Codec = JSON) -> Any:
+    """Decode *body* with *codec*, or raise a FastAPI-style 422."""
+    if codec is JSON:
+        return parse_json_body(body)
+    if not body:
+        raise missing_body_error()
+    try:
+        value = codec.loads(body)
+    except ValueError as exc:
+        raise RequestValidationError([{
+            'type': f'{codec.name}_invalid', 'loc': ('body',), 'msg': f'{codec.label} decode error',
+            'input': {}, 'ctx': {'error': str(exc)},
+        }])
+    if not _json_compatible(value):
+        loc, msg = _json_problem(value)
+        raise RequestValidationError([{
+            'type': 'json_incompatible', 'loc': ('body', *loc), 'msg': msg, 'input': None,
+        }])
+    return value
+
+
+_INT_MIN, _INT_MAX = -(1 << 63), (1 << 64) - 1
+
+
+def _json_compatible(value: Any) -> bool:
+    """Whether *value* holds only JSON types (fast check, no error location).
+
+    Iterative, so deeply nested input cannot exhaust the Python stack.
+    """
+    isfinite = math.isfinite
+    stack = [value]
+    pop, push = stack.pop, stack.append
+    while stack:
+        container = pop()
+        t = type(container)
+        if t is dict:
+            for k in container:
+                if type(k) is not str:
+                    return False
+            values = container.values()
+        elif t is list:
+            values = container
+        else:
+            values = (container,)
+        for v in values:
+            t = type(v)
+            if t is str or v is None or t is bool:
+                continue
+            if t is dict or t is list:
+                push(v)
+            elif t is int:
+                if not _INT_MIN <= v <= _INT_MAX:
+                    return False
+            elif t is float:
+                if not isfinite(v):
+                    return False
+            else:
+                return False
+    return True
+
+
+def _scalar_problem(v: Any) -> Optional[str]:
+    t = type(v)
+    if t is str or t is bool or v is None:
+        return None
+    if t is int:
+        return None if _INT_MIN <= v <= _INT_MAX else 'Integer outside the 64-bit range'
+    if t is float:
+        return None if math.isfinite(v) else 'NaN and Infinity have no JSON equivalent'
+    return f'{t.__name__} has no JSON equivalent'
+
+
+def _json_problem(value: Any) -> Optional[Tuple[tuple, str]]:
+    """``(loc, message)`` of the first value with no JSON equivalent, or None.
+
+    The slow path behind :func:`_json_compatible`, for the 422 body.
+    """
+    stack: List[Tuple[tuple, Any]] = [((), value)]
+    while stack:
+        loc, v = stack.pop()
+        if type(v) is dict:
+            for k, item in v.items():
+                if type(k) is not str:
+                    return loc, f'Map keys must be strings, got {type(k).__name__}'
+                stack.append(((*loc, k), item))
+        elif type(v) is list:
+            stack.extend(((*loc, i), item) for i, item in enumerate(v))
+        else:
+            problem = _scalar_problem(v)
+            if problem is not None:
+                return loc, problem
+    return None
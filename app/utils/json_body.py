@@ -0,0 +1,76 @@
+"""Raw-bytes JSON request handling for the hot routes.
+
+Routes read ``request.body()`` once and parse it with ``orjson.loads`` instead
+of going through FastAPI's body decoding and pydantic validation. Failures are
+reported as :class:`RequestValidationError` with the same error shape FastAPI
+produces, so status codes and error bodies are unchanged (422).
+"""
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Type, TypeVar
+import orjson
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+
+M = TypeVar('M', bound=BaseModel)
+
+
+def parse_json_body(body: bytes) -> Any:
+    """Return the parsed JSON *body*, or raise a FastAPI-style 422."""
+    if not body:
+        raise missing_body_error()
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError as exc:
+        raise json_invalid_error(exc.pos, exc.msg)
+
+
+def missing_body_error() -> RequestValidationError:
+    """The 422 FastAPI returns for an empty required body."""
+    return RequestValidationError([{'type': 'missing', 'loc': ('body',), 'msg': 'Field required', 'input': None}])
+
+
+def json_invalid_error(pos: int, msg: str) -> RequestValidationError:
+    """The 422 FastAPI returns for a body that is not valid JSON."""
+    return RequestValidationError([{
+        'type': 'json_invalid',
+        'loc': ('body', pos),
+        'msg': 'JSON decode error',
+        'input': {},
+        'ctx': {'error': msg},
+    }])
+
+
+def require_object(payload: Any) -> Dict[str, Any]:
+    """Root-is-object check with the 422 FastAPI gives a ``Dict`` body."""
+    if not isinstance(payload, dict):
+        raise require_object_error(payload)
+    return payload
+
+
+def require_object_error(payload: Any = None) -> RequestValidationError:
+    """The 422 FastAPI returns for a non-object ``Dict`` body.
+
+    Streaming routes never parse a non-object root, so they omit *payload*.
+    """
+    return RequestValidationError([{
+        'type': 'dict_type', 'loc': ('body',), 'msg': 'Input should be a valid dictionary', 'input': payload,
+    }])
+
+
+def validate_model(model: Type[M], payload: Any) -> M:
+    """Validate *payload* with *model*, raising FastAPI's 422 on failure.
+
+    Meant as the slow path once a hand-written check has rejected the
+    payload, so pydantic stays off the success path while error bodies are
+    exactly the ones FastAPI would have produced.
+    """
+    try:
+        return model.model_validate(payload)
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**err, 'loc': ('body', *err['loc'])} for err in exc.errors(include_url=False)])
+
+
+def body_schema(schema: Dict[str, Any], media_types: Iterable[str] = ('application/json',)) -> Dict[str, Any]:
+    """``openapi_extra`` documenting a required body (JSON by default) for a raw-body route."""
+    return {'requestBody': {'required': True, 'content': {mt: {'schema': schema} for mt in media_types}}}
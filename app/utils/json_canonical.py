@@ -1,6 +1,82 @@
-from typing import Any
+from typing import Any, Iterator
 import orjson
+from app.utils.json_stream import coalesce, iter_array_elements, iter_object_members, load_span, strip_span
 
 def canonicalize(data: Any) -> bytes:
     """Return deterministic JSON bytes (sorted keys, no whitespace)."""
     return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+
+# Spans up to this size are parsed and canonicalized in one go by orjson;
+# larger objects/arrays are walked member by member instead.
+STREAM_INLINE_BYTES = 1024 * 1024
+STREAM_CHUNK_BYTES = 256 * 1024
+
+def iter_canonical(buf, start: int = 0, end: int = -1, inline_bytes: int = STREAM_INLINE_BYTES,
+                   chunk_bytes: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    """Yield ``canonicalize(orjson.loads(buf[start:end]))`` in chunks.
+
+    *buf* is any bytes-like object supporting slicing and regex search
+    (typically an ``mmap`` of a spooled request body). Objects and arrays
+    larger than *inline_bytes* are never parsed whole: their members are
+    scanned in place, object keys are sorted (last duplicate wins, as with
+    ``orjson.loads``), and each value is canonicalized recursively. Output is
+    byte-identical to :func:`canonicalize`.
+
+    Memory: at most one span of about *inline_bytes* is materialized at a
+    time (times a small constant for the parsed objects), plus one key index
+    entry per member of each large object on the current path, plus one
+    output chunk of *chunk_bytes*.
+    """
+    if end < 0:
+        end = len(buf)
+    return coalesce(_canonical_pieces(buf, start, end, inline_bytes), chunk_bytes)
+
+def _canonical_pieces(buf, start: int, end: int, inline_bytes: int) -> Iterator[bytes]:
+    start, end = strip_span(buf, start, end)
+    first = buf[start] if start < end else None
+    if end - start <= inline_bytes or first not in (0x7B, 0x5B):
+        yield canonicalize(load_span(buf, start, end))
+    elif first == 0x7B:
+        members = {}
+        for key, vstart, vend in iter_object_members(buf, start, end):
+            members[key] = (vstart, vend)
+        yield b'{'
+        for i, key in enumerate(sorted(members)):
+            yield (b',' if i else b'') + orjson.dumps(key) + b':'
+            yield from _canonical_pieces(buf, *members[key], inline_bytes)
+        yield b'}'
+    else:
+        # Consecutive small elements are canonicalized together: one orjson
+        # round-trip per ~inline_bytes run instead of one per element.
+        yield b'['
+        first_piece = True
+        run_start = run_end = -1
+        for vstart, vend in iter_array_elements(buf, start, end):
+            if vend - vstart > inline_bytes:
+                if run_start >= 0:
+                    yield _array_run(buf, run_start, run_end, first_piece)
+                    first_piece, run_start = False, -1
+                if not first_piece:
+                    yield b','
+                yield from _canonical_pieces(buf, vstart, vend, inline_bytes)
+                first_piece = False
+                continue
+            if run_start < 0:
+                run_start = vstart
+            elif vend - run_start > inline_bytes:
+                yield _array_run(buf, run_start, run_end, first_piece)
+                first_piece, run_start = False, vstart
+            run_end = vend
+        if run_start >= 0:
+            yield _array_run(buf, run_start, run_end, first_piece)
+        yield b']'
+
+def _array_run(buf, start: int, end: int, first: bool) -> bytes:
+    """Canonical form of the comma-separated elements in ``buf[start:end]``."""
+    try:
+        items = orjson.loads(b'[' + buf[start:end] + b']')
+    except orjson.JSONDecodeError:
+        load_span(buf, start, end)  # re-raise with a document offset
+        raise
+    body = canonicalize(items)[1:-1]
+    return body if first else b',' + body
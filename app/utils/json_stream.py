@@ -0,0 +1,231 @@
+"""Incremental access to large JSON documents without parsing them whole.
+
+The document is spooled to a temporary file and memory-mapped; a regex
+scanner then walks *one* container level, reporting the byte span of each
+member (object) or element (array). Nested values are skipped bracket to
+bracket without visiting their contents. Only those spans are handed to
+``orjson.loads``, so at most one value is materialized at a time and callers
+can recurse into spans that are themselves too large.
+
+Structure is checked by the scanner (keys, colons, commas, nesting) and every
+value is eventually validated by ``orjson``, so malformed input raises
+:class:`JsonScanError` instead of being accepted.
+"""
+from __future__ import annotations
+import mmap
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from typing import AsyncIterable, Dict, Iterable, Iterator, List, Tuple, Union
+import orjson
+from starlette.concurrency import run_in_threadpool
+
+# spool_to_file writes received chunks to disk in blocks of at least this size.
+SPOOL_WRITE_BYTES = 1024 * 1024
+# A JSON string literal, escapes included.
+_STR = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+# Skip to the next ',' or bracket outside strings (one match per stop).
+_STOP = re.compile(rb'[^"\[\]{},]*(?:' + _STR + rb'[^"\[\]{},]*)*([\[\]{},])', re.DOTALL)
+# Skip to the next bracket outside strings (used inside nested values).
+_NEST = re.compile(rb'[^"\[\]{}]*(?:' + _STR + rb'[^"\[\]{}]*)*([\[\]{}])', re.DOTALL)
+# Object key: optional whitespace, string, whitespace, ':'.
+_KEY = re.compile(rb'[ \t\n\r]*(' + _STR + rb')[ \t\n\r]*:', re.DOTALL)
+_WS = b' \t\n\r'
+_OPEN = (0x7B, 0x5B)  # '{', '['
+
+
+class JsonScanError(ValueError):
+    """Structural JSON error found by the scanner, at byte offset *pos*."""
+
+    def __init__(self, msg: str, pos: int):
+        super().__init__(f'{msg} at byte {pos}')
+        self.msg = msg
+        self.pos = pos
+
+
+def skip_ws(buf, start: int, end: int) -> int:
+    """Index of the first non-whitespace byte in ``buf[start:end]`` (or *end*)."""
+    while start < end and buf[start] in _WS:
+        start += 1
+    return start
+
+
+def strip_span(buf, start: int, end: int) -> Tuple[int, int]:
+    """Span ``[start, end)`` with surrounding JSON whitespace removed."""
+    start = skip_ws(buf, start, end)
+    while end > start and buf[end - 1] in _WS:
+        end -= 1
+    return start, end
+
+
+def _value_end(buf, pos: int, end: int) -> int:
+    """Offset of the ',', '}' or ']' that ends the value starting at *pos*.
+
+    Nested containers are skipped bracket to bracket; commas, colons and
+    scalars inside them are jumped over by the regex, not visited.
+    """
+    depth = 0
+    while True:
+        m = (_NEST if depth else _STOP).match(buf, pos, end)
+        if m is None:
+            raise JsonScanError('unterminated value', end)
+        pos = m.end()
+        ch = buf[pos - 1]
+        if ch in _OPEN:
+            depth += 1
+        elif depth:
+            depth -= 1
+        else:  # ',' or a closing bracket at the value's own level
+            return pos - 1
+
+
+def iter_object_members(buf, start: int, end: int) -> Iterator[Tuple[str, int, int]]:
+    """Yield ``(key, value_start, value_end)`` for the object in ``buf[start:end]``.
+
+    Members come in document order, duplicates included; value spans may
+    carry surrounding whitespace. The span must hold exactly one object.
+    """
+    start, end = strip_span(buf, start, end)
+    if start >= end or buf[start] != 0x7B:
+        raise JsonScanError('expected object', start)
+    pos = skip_ws(buf, start + 1, end)
+    if pos < end and buf[pos] == 0x7D:
+        _expect_end(buf, pos + 1, end)
+        return
+    while True:
+        m = _KEY.match(buf, pos, end)
+        if m is None:
+            raise JsonScanError('expected object key', skip_ws(buf, pos, end))
+        key = load_span(buf, m.start(1), m.end(1))
+        vstart = m.end()
+        vend = _value_end(buf, vstart, end)
+        _expect_value(buf, vstart, vend)
+        yield key, vstart, vend
+        if buf[vend] == 0x7D:
+            _expect_end(buf, vend + 1, end)
+            return
+        if buf[vend] != 0x2C:
+            raise JsonScanError("expected ',' or '}'", vend)
+        pos = vend + 1
+
+
+def iter_array_elements(buf, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    """Yield ``(value_start, value_end)`` for each element of the array in ``buf[start:end]``."""
+    start, end = strip_span(buf, start, end)
+    if start >= end or buf[start] != 0x5B:
+        raise JsonScanError('expected array', start)
+    pos = skip_ws(buf, start + 1, end)
+    if pos < end and buf[pos] == 0x5D:
+        _expect_end(buf, pos + 1, end)
+        return
+    while True:
+        vend = _value_end(buf, pos, end)
+        _expect_value(buf, pos, vend)
+        yield pos, vend
+        if buf[vend] == 0x5D:
+            _expect_end(buf, vend + 1, end)
+            return
+        if buf[vend] != 0x2C:
+            raise JsonScanError("expected ',' or ']'", vend)
+        pos = vend + 1
+
+
+def _expect_value(buf, start: int, end: int) -> None:
+    if skip_ws(buf, start, end) == end:
+        raise JsonScanError('expected value', start)
+
+
+def _expect_end(buf, pos: int, end: int) -> None:
+    if skip_ws(buf, pos, end) != end:
+        raise JsonScanError('trailing data after JSON value', pos)
+
+
+def load_span(buf, start: int, end: int):
+    """``orjson.loads`` one span; decode errors report document offsets."""
+    try:
+        return orjson.loads(buf[start:end])
+    except orjson.JSONDecodeError as exc:
+        raise JsonScanError(exc.msg, start + exc.pos) from None
+
+
+async def spool_to_file(chunks: AsyncIterable[bytes]) -> Tuple[str, int]:
+    """Write an async byte stream to a named temporary file.
+
+    Returns ``(path, size)``; the caller owns (and must remove) the file.
+    Size limits are left to the body-size middleware. Chunks are gathered
+    into blocks of ``SPOOL_WRITE_BYTES`` and written from a worker thread,
+    so a slow disk never blocks the event loop.
+    """
+    fd, path = tempfile.mkstemp(prefix='riot-body-')
+    out = os.fdopen(fd, 'wb')
+    size = 0
+    try:
+        pending: List[bytes] = []
+        pending_bytes = 0
+        async for chunk in chunks:
+            size += len(chunk)
+            pending.append(chunk)
+            pending_bytes += len(chunk)
+            if pending_bytes >= SPOOL_WRITE_BYTES:
+                await run_in_threadpool(out.write, b''.join(pending))
+                pending.clear()
+                pending_bytes = 0
+        if pending:
+            await run_in_threadpool(out.write, b''.join(pending))
+        await run_in_threadpool(out.close)
+    except BaseException:
+        out.close()
+        os.unlink(path)
+        raise
+    return path, size
+
+
+def open_mapped(path: str) -> Union[mmap.mmap, bytes]:
+    """Read-only memory map of *path* (``b''`` for an empty file).
+
+    The map stays valid after the file is unlinked, so callers can remove a
+    spooled body immediately and let closing the map free the disk space.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@contextmanager
+def mapped(path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Context-managed :func:`open_mapped`."""
+    buf = open_mapped(path)
+    try:
+        yield buf
+    finally:
+        if isinstance(buf, mmap.mmap):
+            buf.close()
+
+
+def index_object(buf) -> Dict[str, Tuple[int, int]]:
+    """Map each top-level key of the object in *buf* to its value span.
+
+    Same semantics as ``orjson.loads``: keys keep the position of their first
+    occurrence and the span of their last one. Every value is parsed once
+    (and discarded) so that malformed JSON is reported before any output is
+    produced; memory is one span plus the index itself.
+    """
+    index: Dict[str, Tuple[int, int]] = {}
+    for key, vstart, vend in iter_object_members(buf, 0, len(buf)):
+        load_span(buf, vstart, vend)
+        index[key] = (vstart, vend)
+    return index
+
+
+def coalesce(pieces: Iterable[bytes], chunk_bytes: int) -> Iterator[bytes]:
+    """Regroup small byte pieces into chunks of about *chunk_bytes*."""
+    out = bytearray()
+    for piece in pieces:
+        out += piece
+        if len(out) >= chunk_bytes:
+            yield bytes(out)
+            out.clear()
+    if out:
+        yield bytes(out)
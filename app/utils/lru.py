@@ -0,0 +1,73 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+class BoundedLRUCache:
+    """Thread-safe LRU cache bounded by entry count *and* total byte size.
+
+    Callers supply the byte size of each entry (whatever dominates its memory,
+    typically key + value lengths). Entries larger than *max_bytes* are never
+    stored. Hit, miss and eviction counters are kept for monitoring.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        if max_entries <= 0 or max_bytes <= 0:
+            raise ValueError('cache bounds must be positive')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: OrderedDict[Hashable, Tuple[Any, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for *key* (marking it recently used)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        """Store *value* under *key*, evicting least-recently-used entries."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of counters and current occupancy."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._data),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+            }
+
+
+def optional_cache(max_entries: int, max_bytes: int) -> Optional[BoundedLRUCache]:
+    """Build a cache from settings values; ``0`` entries means disabled."""
+    if max_entries <= 0:
+        return None
+    return BoundedLRUCache(max_entries=max_entries, max_bytes=max_bytes)
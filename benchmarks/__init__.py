@@ -0,0 +1,2 @@
+"""Benchmarks for the crypto API (run from the repository root, e.g.
+``python -m benchmarks.bench_fast_path``). Not collected by pytest."""
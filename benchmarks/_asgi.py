@@ -0,0 +1,53 @@
+"""Minimal in-process ASGI client used by the benchmarks.
+
+Calls the application directly (no sockets, no httpx) so that measurements
+reflect the app and its middleware rather than the client stack.
+"""
+from __future__ import annotations
+import asyncio
+from typing import Iterable, List, Tuple
+
+Headers = Iterable[Tuple[bytes, bytes]]
+
+
+async def call(app, method: str, path: str, body: bytes = b'',
+               headers: Headers = ((b'content-type', b'application/json'),)) -> Tuple[int, bytes]:
+    """Send one request to *app*; return ``(status, response_body)``."""
+    raw_headers: List[Tuple[bytes, bytes]] = [(b'host', b'bench'), *headers]
+    raw_headers.append((b'content-length', str(len(body)).encode()))
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0', 'spec_version': '2.3'}, 'http_version': '1.1',
+        'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': b'', 'headers': raw_headers, 'client': ('127.0.0.1', 50000),
+        'server': ('bench', 80),
+    }
+    sent = False
+    done = asyncio.Event()
+    status = 0
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+        elif message['type'] == 'http.response.body':
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body', False):
+                done.set()
+
+    await app(scope, receive, send)
+    done.set()
+    return status, b''.join(chunks)
+
+
+def run(coro):
+    """Run *coro* on a fresh event loop (benchmarks are plain scripts)."""
+    return asyncio.run(coro)
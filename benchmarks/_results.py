@@ -0,0 +1,54 @@
+"""JSON result files written by the suite and read by ``benchmarks.compare``.
+
+Layout::
+
+    {"suite": "micro", "meta": {...}, "results": {"<case>": {"<metric>": value}}}
+
+Metric names carry their direction (see :data:`HIGHER_IS_BETTER`), so the
+comparison script needs no per-suite knowledge.
+"""
+from __future__ import annotations
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+
+Results = Dict[str, Dict[str, float]]
+
+# Every other metric is treated as lower-is-better.
+HIGHER_IS_BETTER = frozenset({'rps'})
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def metadata(**extra: Any) -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'git_rev': _git_rev(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'argv': sys.argv[1:],
+        **extra,
+    }
+
+
+def write_results(path: str, suite: str, results: Results, **meta: Any) -> None:
+    doc = {'suite': suite, 'meta': metadata(**meta), 'results': results}
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(doc, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS))
+
+
+def read_results(path: str) -> Dict[str, Any]:
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
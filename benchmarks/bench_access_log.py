@@ -0,0 +1,133 @@
+"""Per-request cost of access logging: no log vs a direct handler vs the queue-backed handler.
+
+A minimal app behind ``RequestIdMiddleware`` and
+:class:`~app.middleware.access_log.AccessLogMiddleware` is called in
+process, sequentially. "direct" formats and writes each record on the
+event loop (a ``logging.Handler`` doing what a ``StreamHandler`` with a
+JSON formatter does, one write and flush per record); "queue" is
+:func:`app.access_log.install` (a put on the event loop, formatting and
+batched writes on the writer thread). Both write the same JSON lines to a
+file; ``--sink slow`` adds a 200 µs stall to every write, like a terminal
+or a pipe that is not drained fast enough. Reported: mean and p99 request
+time, and the mean cost over "none".
+
+Usage::
+
+    python -m benchmarks.bench_access_log [--requests 20000] [--sink file|slow]
+"""
+from __future__ import annotations
+import argparse
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from fastapi import FastAPI, Request
+
+from app.access_log import BatchWriter, QueueHandler, json_line
+from app.errors import add_exception_handlers
+from app.middleware.access_log import AccessLogMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from benchmarks._asgi import call, run
+from benchmarks.bench_offload import _pct
+
+BODY = b'{"message":"Hello World","timestamp":1616161616}'
+
+
+class SlowFile:
+    """File whose every write stalls, like a slow consumer on the other end of stdout."""
+
+    def __init__(self, path: str, stall_s: float):
+        self._f = open(path, 'ab')
+        self.stall_s = stall_s
+
+    def write(self, data: bytes) -> int:
+        time.sleep(self.stall_s)
+        return self._f.write(data)
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+class DirectHandler(logging.Handler):
+    def __init__(self, stream):
+        super().__init__()
+        self.stream = stream
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.stream.write(json_line(record))
+        self.stream.flush()
+
+
+def build(logger: logging.Logger) -> FastAPI:
+    app = FastAPI()
+    add_exception_handlers(app)
+
+    @app.post('/echo')
+    async def echo(request: Request):
+        return {'size': len(await request.body())}
+
+    app.add_middleware(RequestIdMiddleware)
+    app.add_middleware(AccessLogMiddleware, logger=logger)
+    return app
+
+
+def open_sink(path: str, sink: str):
+    return SlowFile(path, 0.0002) if sink == 'slow' else open(path, 'ab')
+
+
+async def measure(app: FastAPI, requests: int):
+    for _ in range(500):  # warm-up
+        await call(app, 'POST', '/echo', BODY)
+    times = []
+    for _ in range(requests):
+        t0 = time.perf_counter()
+        await call(app, 'POST', '/echo', BODY)
+        times.append((time.perf_counter() - t0) * 1e6)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--sink', choices=('file', 'slow'), default='file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for kind in ('none', 'direct', 'queue'):
+            logger = logging.getLogger(f'bench-{kind}.access')
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            stream = open_sink(os.path.join(tmp, f'{kind}.log'), args.sink)
+            writer = None
+            if kind == 'none':
+                logger.disabled = True
+            elif kind == 'direct':
+                logger.addHandler(DirectHandler(stream))
+            else:
+                handler = QueueHandler(queue_size=10000)
+                logger.addHandler(handler)
+                writer = BatchWriter(handler, stream=stream)
+                writer.start()
+            results[kind] = run(measure(build(logger), args.requests))
+            if writer is not None:
+                results[kind + ' dropped'] = writer.handler.dropped
+                writer.stop()
+            stream.close()
+
+        base = statistics.fmean(results['none'])
+        print(f"{'handler':<8}{'mean us':>9}{'p99 us':>9}{'cost us':>9}{'dropped':>9}")
+        for kind in ('none', 'direct', 'queue'):
+            times = results[kind]
+            mean = statistics.fmean(times)
+            print(f'{kind:<8}{mean:>9.1f}{_pct(times, 0.99):>9.1f}{mean - base:>9.1f}'
+                  f'{results.get(kind + " dropped", 0):>9}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Latency of admitted requests and shed rate under a burst, with and without admission control.
+
+Drives ``app.main.app`` in-process with ``--clients`` concurrent clients
+(far more than the worker can serve promptly), each sending small ``/sign``
+requests with a ~1 MiB ``/encrypt`` every ``--large-every`` requests, for
+``--seconds``. The app is imported with ``APP_ADMISSION_ENABLED=false`` and
+wrapped here in an ``AdmissionMiddleware`` per variant (none, fixed limit,
+adaptive limit), so only admission differs. Reports goodput, p50/p99 of
+admitted small requests, 503s per second (clients retry after 10 ms)
+and the peak in-flight body bytes.
+
+Usage::
+
+    python -m benchmarks.bench_admission [--clients 256] [--seconds 3]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault('RIOT_HMAC_SECRET', 'bench-secret')
+os.environ['APP_ADMISSION_ENABLED'] = 'false'
+
+import orjson  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.middleware.admission import AdaptiveLimit, AdmissionController, AdmissionMiddleware, FixedLimit  # noqa: E402
+from benchmarks._asgi import call  # noqa: E402
+from benchmarks.bench_fast_path import make_payload  # noqa: E402
+from benchmarks.bench_offload import _pct  # noqa: E402
+
+SMALL = orjson.dumps({'message': 'Hello World', 'timestamp': 1616161616})
+
+
+class _PeakBytes:
+    """Tracks declared body bytes of requests inside the app (what it may buffer)."""
+
+    def __init__(self, app):
+        self.app = app
+        self.current = self.peak = 0
+
+    async def __call__(self, scope, receive, send):
+        size = int(dict(scope['headers']).get(b'content-length', b'0'))
+        self.current += size
+        self.peak = max(self.peak, self.current)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.current -= size
+
+
+async def scenario(target, clients: int, seconds: float, large_every: int, large_body: bytes):
+    deadline = time.perf_counter() + seconds
+    small, shed, ok = [], 0, 0
+
+    async def client(n: int):
+        nonlocal shed, ok
+        i = n
+        while time.perf_counter() < deadline:
+            i += 1
+            large = large_every and i % large_every == 0
+            t0 = time.perf_counter()
+            status, _ = await call(target, 'POST', '/encrypt' if large else '/sign', large_body if large else SMALL)
+            if status == 503:
+                shed += 1
+                await asyncio.sleep(0.01)  # a real client would honor Retry-After
+                continue
+            assert status == 200, status
+            ok += 1
+            if not large:
+                small.append((time.perf_counter() - t0) * 1e3)
+
+    await asyncio.gather(*(client(n) for n in range(clients)))
+    return small, ok, shed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=256)
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--large-every', type=int, default=10)
+    parser.add_argument('--large-bytes', type=int, default=1_000_000)
+    args = parser.parse_args()
+    large_body = orjson.dumps(make_payload(args.large_bytes))
+
+    def controller(limit):
+        return AdmissionController(limit, settings.admission_max_inflight_bytes, settings.admission_queue_size,
+                                   settings.admission_queue_timeout_ms / 1000)
+
+    variants = [
+        ('none', None),
+        ('fixed', controller(FixedLimit(settings.admission_max_concurrency))),
+        ('adaptive', controller(AdaptiveLimit(settings.admission_min_concurrency,
+                                              settings.admission_max_concurrency))),
+    ]
+    print(f"{'admission':<10}{'ok/s':>8}{'p50 ms':>10}{'p99 ms':>10}{'503/s':>8}{'peak MiB':>10}{'limit':>7}")
+    for name, ctl in variants:
+        inner = _PeakBytes(app)
+        target = inner if ctl is None else AdmissionMiddleware(inner, ctl, settings.max_body_bytes)
+        small, ok, shed = asyncio.run(scenario(target, args.clients, args.seconds, args.large_every, large_body))
+        limit = '-' if ctl is None else str(ctl.limit.value)
+        print(f'{name:<10}{ok / args.seconds:>8.0f}{statistics.median(small):>10.2f}{_pct(small, 0.99):>10.2f}'
+              f'{shed / args.seconds:>8.0f}{inner.peak / 2 ** 20:>10.1f}{limit:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""``/encrypt``/``/decrypt`` field loops: Base64 vs AES-GCM strategies.
+
+Times :func:`app.ops.encrypt_object` and :func:`app.ops.decrypt_object` on
+typical 20-field objects (names, dates, numbers, small nested values) for:
+
+- ``base64``: ``Base64JsonEncryptor`` (encoding only, the baseline);
+- ``aes-gcm``: ``AesGcmEncryptor`` (one cipher context per key, counter
+  nonces);
+- ``aes-gcm naive``: the same token format with a new ``AESGCM`` object and
+  an ``os.urandom`` nonce per field, to show what the reuse buys.
+
+Usage::
+
+    python -m benchmarks.bench_aes_gcm [--objects 2000] [--repeat 5]
+"""
+from __future__ import annotations
+import argparse
+import base64
+import os
+import random
+import time
+
+import orjson
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from app import ops
+from app.crypto.aes_gcm import VERSION, AesGcmEncryptor
+from app.crypto.base64_json import Base64JsonEncryptor
+
+KEY = bytes(range(32))
+
+
+class NaiveAesGcmEncryptor(AesGcmEncryptor):
+    """Per-field cipher setup and urandom nonce (for comparison only)."""
+
+    def encrypt_value(self, value):
+        nonce = os.urandom(12)
+        blob = bytes((VERSION,)) + nonce + AESGCM(self._key).encrypt(nonce, orjson.dumps(value), None)
+        return base64.urlsafe_b64encode(blob).rstrip(b'=').decode('ascii')
+
+
+def make_objects(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    values = [lambda: 'Jane Doe', lambda: '1998-11-19', lambda: rng.randint(0, 10 ** 6), lambda: rng.random(),
+              lambda: True, lambda: None, lambda: 'jane@example.com', lambda: ['a', 'b'],
+              lambda: {'city': 'Dublin', 'zip': 'D02'}, lambda: 'x' * rng.randint(8, 64)]
+    return [{f'field_{i:02d}': rng.choice(values)() for i in range(20)} for _ in range(n)]
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--objects', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    objects = make_objects(args.objects)
+    strategies = {
+        'base64': Base64JsonEncryptor(),
+        'aes-gcm': AesGcmEncryptor(KEY),
+        'aes-gcm naive': NaiveAesGcmEncryptor(KEY),
+    }
+
+    print(f"{'strategy':<15}{'encrypt us/obj':>16}{'decrypt us/obj':>16}{'token bytes/obj':>17}")
+    for name, enc in strategies.items():
+        encrypted = [ops.encrypt_object(enc, o) for o in objects]
+        assert [ops.decrypt_object(enc, e) for e in encrypted] == objects
+        t_enc = best_of(lambda: [ops.encrypt_object(enc, o) for o in objects], args.repeat)
+        t_dec = best_of(lambda: [ops.decrypt_object(enc, e) for e in encrypted], args.repeat)
+        size = sum(len(orjson.dumps(e)) for e in encrypted) / len(encrypted)
+        print(f'{name:<15}{t_enc / len(objects) * 1e6:>16.1f}{t_dec / len(objects) * 1e6:>16.1f}{size:>17.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Bulk CLI throughput and memory: records/s and peak RSS per worker count, ordered vs unordered.
+
+Writes NDJSON files of ``--records`` and 4x ``--records`` small objects to
+a temporary directory, then runs ``python -m app.cli sign`` on them (output
+to a file) for each worker count, in order and with ``--unordered``. Peak
+RSS is the largest single process (CLI or pool worker); it should not grow
+with the file size. Compare with the HTTP path (``benchmarks.load``) or
+``/sign/batch`` for the same records.
+
+Usage::
+
+    python -m benchmarks.bench_cli [--records 500000] [--workers 1,2,4]
+"""
+from __future__ import annotations
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import orjson
+
+
+def write_records(path: str, records: int) -> int:
+    with open(path, 'wb', buffering=1024 * 1024) as f:
+        for i in range(records):
+            f.write(orjson.dumps({'id': i, 'player': f'p-{i:08d}', 'score': i * 0.5, 'tags': ['a', 'b']}) + b'\n')
+    return os.path.getsize(path)
+
+
+def run_cli(args) -> float:
+    env = {**os.environ}
+    env.setdefault('RIOT_HMAC_SECRET', 'bench-secret')
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-m', 'app.cli', *args], env=env, stderr=subprocess.DEVNULL)
+    assert proc.returncode == 0, proc.returncode
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--records', type=int, default=500_000)
+    parser.add_argument('--workers', default=f'1,{os.cpu_count() or 1}')
+    args = parser.parse_args()
+    worker_counts = sorted({int(w) for w in args.workers.split(',')})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'records':>9}{'MB':>7}{'workers':>8}{'order':>10}{'records/s':>11}{'peak RSS MB':>13}")
+        for records in (args.records, 4 * args.records):
+            src, dst = os.path.join(tmp, 'in.ndjson'), os.path.join(tmp, 'out.ndjson')
+            size = write_records(src, records)
+            for workers in worker_counts:
+                for ordered in (True, False):
+                    cmd = ['sign', src, '-o', dst, '--workers', str(workers)] + ([] if ordered else ['--unordered'])
+                    before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+                    elapsed = run_cli(cmd)
+                    # ru_maxrss of children is a running maximum: only growth is visible.
+                    peak = max(before, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+                    print(f'{records:>9}{size / 1e6:>7.0f}{workers:>8}{"ordered" if ordered else "unordered":>10}'
+                          f'{records / elapsed:>11,.0f}{peak / 1024:>13.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""``/decrypt`` field loop: exception-based detection vs ``try_decrypt_value``.
+
+Builds 20-field objects with a varying share of real tokens; the rest are
+plain strings (dates, names, emails, ids) of the kind our payloads carry.
+``raise`` is the previous loop (``decrypt_value`` inside ``try/except``),
+``prescreen`` is :func:`app.ops.decrypt_object`.
+
+Usage::
+
+    python -m benchmarks.bench_decrypt_prescreen [--objects 2000] [--repeat 5]
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+
+from app import ops
+from app.crypto.base64_json import Base64JsonEncryptor
+
+FIELDS = 20
+PLAIN = ['1998-11-19', 'John Doe', 'jane@example.com', 'Dublin', 'a1b2c3d4', '2024-01-01T00:00:00Z',
+         'premium', 'EUR', 'Hello World', 'ok']
+
+
+def make_objects(n: int, token_share: float, seed: int = 0):
+    rng = random.Random(seed)
+    enc = Base64JsonEncryptor()
+    objects = []
+    for _ in range(n):
+        obj = {}
+        for i in range(FIELDS):
+            value = rng.choice(PLAIN)
+            obj[f'f{i}'] = enc.encrypt_value(value) if rng.random() < token_share else value
+        objects.append(obj)
+    return objects
+
+
+def decrypt_raising(encryptor, payload):
+    out = {}
+    for k, v in payload.items():
+        if isinstance(v, str):
+            try:
+                v = encryptor.decrypt_value(v)
+            except Exception:
+                pass
+        out[k] = v
+    return out
+
+
+def best_of(fn, encryptor, objects, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for obj in objects:
+            fn(encryptor, obj)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--objects', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    enc = Base64JsonEncryptor()
+
+    print(f"{'tokens':>7}{'raise us/obj':>15}{'prescreen us/obj':>19}{'speedup':>10}")
+    for share in (0.0, 0.25, 0.5, 0.75, 1.0):
+        objects = make_objects(args.objects, share)
+        assert all(decrypt_raising(enc, o) == ops.decrypt_object(enc, o) for o in objects)
+        old = best_of(decrypt_raising, enc, objects, args.repeat) / args.objects * 1e6
+        new = best_of(ops.decrypt_object, enc, objects, args.repeat) / args.objects * 1e6
+        print(f'{share:>7.0%}{old:>15.2f}{new:>19.2f}{old / new:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""``/encrypt`` crypto + render stages: per-field tokens then ``orjson.dumps`` vs the fused writer.
+
+For objects of ``--widths`` top-level members (strings, numbers, booleans
+and small nested objects), times on the parsed object:
+
+- ``tokens+dumps``: :func:`app.ops.encrypt_object` (an ``orjson`` bytes, a
+  Base64 bytes and a decoded ``str`` per field, plus the result dict)
+  followed by ``orjson.dumps`` of that dict, which re-scans every token for
+  escaping. This was the ``/encrypt`` path before the fused writer.
+- ``fused``: :meth:`Base64JsonEncryptor.encrypt_object_to_bytes`, which
+  writes keys and Base64 tokens straight into one response buffer.
+
+Reports the best time per object, field throughput, and peak memory above
+the input while the call runs (``tracemalloc``: every intermediate that is
+alive at once, including the output).
+
+Usage::
+
+    python -m benchmarks.bench_encrypt_render [--widths 10,1000,100000] [--repeat 5]
+"""
+from __future__ import annotations
+import argparse
+import timeit
+import tracemalloc
+
+import orjson
+
+from app import ops
+from app.crypto.base64_json import Base64JsonEncryptor
+
+
+def make_object(width: int) -> dict:
+    return {f'field_{i}': (f'value-{i}', i * 1.5, {'a': i, 'b': [1, 2]}, True)[i % 4] for i in range(width)}
+
+
+def best_seconds(fn, repeat: int) -> float:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def peak_bytes(fn) -> int:
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        out = fn()
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    del out
+    return peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--widths', default='10,1000,100000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    enc = Base64JsonEncryptor()
+    paths = {
+        'tokens+dumps': lambda obj: orjson.dumps(ops.encrypt_object(enc, obj)),
+        'fused': enc.encrypt_object_to_bytes,
+    }
+
+    print(f"{'width':>7}{'out KB':>9}  {'path':<14}{'us/object':>11}{'Mfields/s':>11}{'peak KB':>10}")
+    for width in (int(w) for w in args.widths.split(',')):
+        obj = make_object(width)
+        outputs = {name: fn(obj) for name, fn in paths.items()}
+        assert len(set(outputs.values())) == 1, 'paths disagree'
+        size = len(outputs['fused'])
+        for name, fn in paths.items():
+            seconds = best_seconds(lambda: fn(obj), args.repeat)
+            peak = peak_bytes(lambda: fn(obj))
+            print(f'{width:>7}{size / 1024:>9.0f}  {name:<14}{seconds * 1e6:>11.1f}'
+                  f'{width / seconds / 1e6:>11.2f}{peak / 1024:>10.0f}')
+
+
+if __name__ == '__main__':
+    main()
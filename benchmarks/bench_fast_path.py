@@ -0,0 +1,115 @@
+"""Before/after benchmark for the raw-bytes orjson request path.
+
+"before" re-declares the routes as they were written originally: a
+``Body(...)``/pydantic parameter parsed by FastAPI and a stdlib-``json``
+``JSONResponse``. "after" mounts the routes from ``app.main``. Both apps run
+without middleware so only request parsing, validation and rendering differ.
+
+Usage::
+
+    python -m benchmarks.bench_fast_path [--sizes 65536,1048576,2000000] [--repeat 20]
+"""
+from __future__ import annotations
+import argparse
+import os
+import time
+from typing import Any, Dict
+
+os.environ.setdefault('RIOT_HMAC_SECRET', 'bench-secret')
+
+import orjson  # noqa: E402
+from fastapi import Body, FastAPI, Response  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app import ops  # noqa: E402
+from app.crypto.base64_json import Base64JsonEncryptor  # noqa: E402
+from app.deps import EncryptorDep, SignerDep  # noqa: E402
+from app.errors import add_exception_handlers  # noqa: E402
+from app.main import app as main_app  # noqa: E402
+from app.models import SignOutput, VerifyInput  # noqa: E402
+from benchmarks._asgi import call, run  # noqa: E402
+
+PATHS = ('/encrypt', '/decrypt', '/sign', '/verify')
+
+
+def build_before() -> FastAPI:
+    app = FastAPI()
+    add_exception_handlers(app)
+
+    @app.post('/encrypt')
+    async def encrypt(encryptor: EncryptorDep, payload: Dict[str, Any] = Body(..., embed=False)):
+        return JSONResponse(content=ops.encrypt_object(encryptor, ops.ensure_object(payload)))
+
+    @app.post('/decrypt')
+    async def decrypt(encryptor: EncryptorDep, payload: Dict[str, Any] = Body(..., embed=False)):
+        return JSONResponse(content=ops.decrypt_object(encryptor, ops.ensure_object(payload)))
+
+    @app.post('/sign', response_model=SignOutput)
+    async def sign(signer: SignerDep, payload: Any = Body(..., embed=False)):
+        return SignOutput(signature=signer.sign(payload))
+
+    @app.post('/verify', status_code=204)
+    async def verify(body: VerifyInput, signer: SignerDep):
+        ops.verify_signature(signer, body.signature, body.data)
+        return Response(status_code=204)
+
+    return app
+
+
+def build_after() -> FastAPI:
+    app = FastAPI()
+    add_exception_handlers(app)
+    app.router.routes.extend(r for r in main_app.routes if getattr(r, 'path', None) in PATHS)
+    return app
+
+
+def make_payload(target_bytes: int) -> Dict[str, Any]:
+    """Object of mixed depth-1 fields whose JSON is about *target_bytes* long."""
+    field = {'id': 123456, 'name': 'Jane Doe', 'ok': True, 'score': 3.14159,
+             'tags': ['alpha', 'beta', 'gamma'], 'addr': {'city': 'Dublin', 'zip': 'D02'}}
+    per_field = len(orjson.dumps(field)) + 12
+    return {f'field_{i:06d}': field for i in range(max(1, target_bytes // per_field))}
+
+
+def bodies(payload: Dict[str, Any], app: FastAPI) -> Dict[str, bytes]:
+    encrypted = orjson.dumps(ops.encrypt_object(Base64JsonEncryptor(), payload))
+    _, sig = run(call(app, 'POST', '/sign', orjson.dumps(payload)))
+    signature = orjson.loads(sig)['signature']
+    return {
+        '/encrypt': orjson.dumps(payload),
+        '/decrypt': encrypted,
+        '/sign': orjson.dumps(payload),
+        '/verify': orjson.dumps({'signature': signature, 'data': payload}),
+    }
+
+
+def timeit(app: FastAPI, path: str, body: bytes, repeat: int) -> float:
+    async def _loop() -> float:
+        best = float('inf')
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            status, _ = await call(app, 'POST', path, body)
+            best = min(best, time.perf_counter() - t0)
+            assert status in (200, 204), (path, status)
+        return best
+    return run(_loop())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='65536,1048576,2000000')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    before, after = build_before(), build_after()
+    print(f"{'endpoint':<10}{'size':>10}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        payload = make_payload(size)
+        for path, body in bodies(payload, after).items():
+            b = timeit(before, path, body, args.repeat) * 1e3
+            a = timeit(after, path, body, args.repeat) * 1e3
+            print(f'{path:<10}{len(body):>10}{b:>12.2f}{a:>12.2f}{b / a:>9.2f}x')
+
+
+if __name__ == '__main__':
+    main()
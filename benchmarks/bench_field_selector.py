@@ -0,0 +1,80 @@
+"""``/encrypt`` and ``/decrypt`` of wide objects: every field vs a 3-field ``?fields=`` selector.
+
+Builds objects of ``--widths`` top-level members (strings, numbers and a
+few small nested objects) and times the route bodies in process:
+``ops.encrypt_body``/``ops.decrypt_body`` (every depth-1 value) against
+``ops.encrypt_fields_body``/``ops.decrypt_fields_body`` with the selector
+``f1,f2,nested.card`` (two top-level values and one nested one). Parsing
+and rendering still read and write the whole body (``orjson``, and the body
+must be validated anyway), so the selector's time is that floor: what is
+left once the per-field crypto is gone.
+
+Usage::
+
+    python -m benchmarks.bench_field_selector [--widths 100,1000,10000] [--repeat 200] [--encryptor base64]
+"""
+from __future__ import annotations
+import argparse
+import time
+
+import orjson
+
+from app import ops
+from app.crypto.base64_json import Base64JsonEncryptor
+from app.utils.field_paths import compile_fields
+
+SELECTOR = 'f1,f2,nested.card'
+
+
+def make_object(width: int) -> dict:
+    obj = {}
+    for i in range(width):
+        obj[f'f{i}'] = (f'value-{i}', i * 1.5, {'a': i, 'b': [1, 2]})[i % 3]
+    obj['nested'] = {'card': '4111111111111111', 'exp': '12/30'}
+    return obj
+
+
+def encryptor(name: str):
+    if name == 'aes-gcm':
+        import os
+        from app.crypto.aes_gcm import AesGcmEncryptor
+        return AesGcmEncryptor(os.urandom(32))
+    return Base64JsonEncryptor()
+
+
+def best_us(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(5):
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / repeat)
+    return best * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--widths', default='100,1000,10000')
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--encryptor', choices=('base64', 'aes-gcm'), default='base64')
+    args = parser.parse_args()
+    enc = encryptor(args.encryptor)
+    fields = compile_fields(SELECTOR)
+
+    print(f"{'width':>7}{'KB':>7}  {'op':<8}{'all us':>10}{'fields us':>11}{'speedup':>9}")
+    for width in (int(w) for w in args.widths.split(',')):
+        body = orjson.dumps(make_object(width))
+        tokens = ops.encrypt_body(enc, body)
+        selected = ops.encrypt_fields_body(enc, fields, body)
+        repeat = max(3, args.repeat * 100 // width)
+        rows = (
+            ('encrypt', lambda: ops.encrypt_body(enc, body), lambda: ops.encrypt_fields_body(enc, fields, body)),
+            ('decrypt', lambda: ops.decrypt_body(enc, tokens), lambda: ops.decrypt_fields_body(enc, fields, selected)),
+        )
+        for op, everything, only in rows:
+            full, sel = best_us(everything, repeat), best_us(only, repeat)
+            print(f'{width:>7}{len(body) / 1024:>7.0f}  {op:<8}{full:>10.1f}{sel:>11.1f}{full / sel:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
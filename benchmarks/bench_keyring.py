@@ -0,0 +1,47 @@
+"""``/verify`` during rotation: try every key vs key-id lookup.
+
+With ``N`` keys live, the naive approach checks an unprefixed signature
+against each key until one matches; a signature from the oldest key costs
+``N`` HMACs. ``KeyringSigner`` reads the key id from the signature and runs
+exactly one. Times ``verify`` for a signature made with the oldest key.
+
+Usage::
+
+    python -m benchmarks.bench_keyring [--keys 1,4,16] [--number 2000]
+"""
+from __future__ import annotations
+import argparse
+import hmac
+import timeit
+
+from app.signature.hmac_sha256 import HmacSha256Signer
+from app.signature.keyring import KeyringSigner
+from benchmarks.payloads import PROFILES, make_document
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--keys', default='1,4,16')
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+    data = make_document(PROFILES['small'])
+
+    print(f"{'keys':>5}{'try-all us':>12}{'key id us':>11}")
+    for n in (int(k) for k in args.keys.split(',')):
+        secrets = {f'k{i}': f'secret-{i}'.encode() for i in range(n)}
+        signers = [HmacSha256Signer(s) for s in reversed(secrets.values())]  # newest first
+        keyring = KeyringSigner(secrets, active=f'k{n - 1}')
+        plain_sig = HmacSha256Signer(secrets['k0']).sign(data)
+        keyed_sig = 'k0.' + plain_sig
+
+        def try_all():
+            return any(hmac.compare_digest(s.sign(data), plain_sig) for s in signers)
+
+        assert try_all() and keyring.verify(keyed_sig, data)
+        naive = min(timeit.repeat(try_all, number=args.number, repeat=5)) / args.number
+        keyed = min(timeit.repeat(lambda: keyring.verify(keyed_sig, data), number=args.number, repeat=5)) / args.number
+        print(f'{n:>5}{naive * 1e6:>12.1f}{keyed * 1e6:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Re-signing and verifying a new version of a large object: whole document vs Merkle leaves.
+
+For a fraction of changed top-level fields, times the ``/sign`` and
+``/verify`` operations (``app.ops``, request bytes in, parse included) on
+the new version three ways: plain (canonicalize and HMAC everything), Merkle
+over the full document, and Merkle from the changed fields plus the stored
+leaf digests of the others (``partial``). Also reports the request size of
+the full and partial bodies.
+
+Usage::
+
+    python -m benchmarks.bench_merkle [--profile large] [--fractions 0,0.01,0.1,0.5,1] [--number 50]
+"""
+from __future__ import annotations
+import argparse
+import timeit
+
+import orjson
+
+from app import ops
+from app.signature.hmac_sha256 import HmacSha256Signer
+from app.signature.merkle import leaf_digests, sign_leaves
+from benchmarks.payloads import PROFILES, make_document
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', default='large', choices=sorted(PROFILES))
+    parser.add_argument('--fractions', default='0,0.01,0.1,0.5,1')
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args()
+    signer = HmacSha256Signer(b'bench-secret')
+    old = make_document(PROFILES[args.profile])
+    new_values = make_document(PROFILES[args.profile], seed=1)
+    old_leaves = {key: digest.hex() for key, digest in leaf_digests(old).items()}
+
+    def per_call(fn) -> float:
+        return min(timeit.repeat(fn, number=args.number, repeat=3)) / args.number * 1e3
+
+    print(f"{'changed':>8}{'sign ms':>9}{'merkle':>8}{'partial':>9}{'verify ms':>11}{'merkle':>8}{'partial':>9}"
+          f"{'full KB':>9}{'partial KB':>11}")
+    for fraction in (float(f) for f in args.fractions.split(',')):
+        changed_keys = list(old)[:round(fraction * len(old))]
+        changed = {key: new_values[key] for key in changed_keys}
+        doc = {**old, **changed}
+        unchanged = {key: digest for key, digest in old_leaves.items() if key not in changed}
+        plain_sig = signer.sign(doc)
+        merkle_sig = sign_leaves(signer, leaf_digests(doc))
+
+        full = orjson.dumps(doc)
+        partial = orjson.dumps({'data': changed, 'leaves': unchanged})
+        verify_plain = orjson.dumps({'signature': plain_sig, 'data': doc})
+        verify_full = orjson.dumps({'signature': merkle_sig, 'data': doc})
+        verify_partial = orjson.dumps({'signature': merkle_sig, 'data': changed, 'leaves': unchanged})
+        assert orjson.loads(ops.sign_merkle_body(signer, False, True, partial))['signature'] == merkle_sig
+        ops.verify_body(signer, verify_partial)
+
+        times = [
+            per_call(lambda: ops.sign_body(signer, full)),
+            per_call(lambda: ops.sign_merkle_body(signer, False, False, full)),
+            per_call(lambda: ops.sign_merkle_body(signer, False, True, partial)),
+            per_call(lambda: ops.verify_body(signer, verify_plain)),
+            per_call(lambda: ops.verify_body(signer, verify_full, merkle=True)),
+            per_call(lambda: ops.verify_body(signer, verify_partial)),
+        ]
+        print(f'{fraction:>8.0%}{times[0]:>9.3f}{times[1]:>8.3f}{times[2]:>9.3f}{times[3]:>11.3f}{times[4]:>8.3f}'
+              f'{times[5]:>9.3f}{len(full) / 1024:>9.1f}{len(partial) / 1024:>11.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Metrics overhead at peak RPS: ``/metrics`` recording on vs off.
+
+Runs the in-process load driver (:mod:`benchmarks.load`) on each endpoint with
+the small payload profile, alternating rounds with ``REGISTRY.enabled`` on and
+off so drift affects both equally, and reports the best RPS of each.
+Recording covers the metrics middleware and the per-stage timers in
+``app.ops``.
+
+End-to-end RPS differences of a few percent are within run-to-run noise on a
+shared machine, so the script also times the recording work of one request
+in isolation (the middleware's counter and histogram updates plus four stage
+marks; the extra ASGI hop itself only shows in the RPS columns) and reports
+it as a share of the request time at the measured peak RPS.
+
+Usage::
+
+    python -m benchmarks.bench_metrics [--rounds 3] [--requests 5000] [--concurrency 16]
+"""
+from __future__ import annotations
+import argparse
+import os
+import timeit
+
+os.environ.setdefault('RIOT_HMAC_SECRET', 'bench-secret')
+
+from app.metrics import REGISTRY, REQUEST_BYTES, REQUEST_SECONDS, REQUESTS, stage_timer  # noqa: E402
+from benchmarks.load import PATHS, bodies, load_endpoint  # noqa: E402
+
+
+def record_one_request() -> None:
+    """The metrics work of one single-item request."""
+    timer = stage_timer('sign')
+    for stage in ('parse', 'canonicalize', 'crypto', 'render'):
+        timer.mark(stage)
+    REQUESTS.inc(('/sign', '200'))
+    REQUEST_SECONDS.observe(('/sign',), 0.001)
+    REQUEST_BYTES.observe(('/sign',), 300)
+
+
+def recording_seconds() -> float:
+    timer = timeit.Timer(record_one_request)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=5, number=number)) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', default='small')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    payloads = bodies(args.profile)
+    REGISTRY.enabled = True
+    cost = recording_seconds()
+    print(f'recording cost: {cost * 1e6:.2f} us/request\n')
+    print(f"{'endpoint':<10}{'off rps':>10}{'on rps':>10}{'rps delta':>11}{'recording share':>17}")
+    for path in PATHS:
+        best = {False: 0.0, True: 0.0}
+        for _ in range(args.rounds):
+            for enabled in (False, True):
+                REGISTRY.enabled = enabled
+                r = load_endpoint(path, payloads[path], args.requests, args.concurrency, warmup=200)
+                best[enabled] = max(best[enabled], r['rps'])
+        print(f'{path:<10}{best[False]:>10.0f}{best[True]:>10.0f}{1 - best[True] / best[False]:>11.1%}'
+              f'{cost * best[False]:>17.1%}')
+    REGISTRY.enabled = True
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Per-request overhead of the middleware stack: BaseHTTPMiddleware vs pure ASGI.
+
+"before" re-declares the original ``BaseHTTPMiddleware`` request-id and
+Content-Length limiter; "after" uses ``app.middleware``. Both wrap the same
+minimal app so the difference is the middleware cost alone.
+
+Usage::
+
+    python -m benchmarks.bench_middleware [--requests 20000]
+"""
+from __future__ import annotations
+import argparse
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.errors import APIError, add_exception_handlers
+from app.middleware.body_limit import BodySizeLimitMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from benchmarks._asgi import call, run
+
+MAX_BYTES = 2 * 1024 * 1024
+BODY = b'{"message":"Hello World","timestamp":1616161616}'
+
+
+class LegacyRequestId(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        rid = request.headers.get('X-Request-ID') or str(uuid.uuid4())
+        response = await call_next(request)
+        response.headers['X-Request-ID'] = rid
+        return response
+
+
+class LegacyBodySizeLimiter(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        cl = request.headers.get('content-length')
+        try:
+            if cl is not None and int(cl) > MAX_BYTES:
+                raise APIError(status_code=413, code='payload_too_large', message='Payload too large')
+        except ValueError:
+            raise APIError(status_code=400, code='invalid_content_length', message='Invalid Content-Length')
+        return await call_next(request)
+
+
+def _bare() -> FastAPI:
+    app = FastAPI()
+    add_exception_handlers(app)
+
+    @app.post('/echo')
+    async def echo(request: Request):
+        return {'size': len(await request.body())}
+
+    return app
+
+
+def build(kind: str) -> FastAPI:
+    app = _bare()
+    if kind == 'before':
+        app.add_middleware(LegacyRequestId)
+        app.add_middleware(LegacyBodySizeLimiter)
+    elif kind == 'after':
+        app.add_middleware(BodySizeLimitMiddleware, max_bytes=MAX_BYTES)
+        app.add_middleware(RequestIdMiddleware)
+    return app
+
+
+def per_request_us(app: FastAPI, n: int) -> float:
+    async def _loop() -> float:
+        for _ in range(min(n, 500)):  # warm-up
+            await call(app, 'POST', '/echo', BODY)
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await call(app, 'POST', '/echo', BODY)
+        return (time.perf_counter() - t0) / n * 1e6
+    return run(_loop())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    results = {kind: per_request_us(build(kind), args.requests) for kind in ('none', 'before', 'after')}
+    for kind, us in results.items():
+        print(f'{kind:<8}{us:>10.1f} us/request   overhead {us - results["none"]:>8.1f} us')
+
+
+if __name__ == '__main__':
+    main()
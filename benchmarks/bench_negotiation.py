@@ -0,0 +1,66 @@
+"""Bytes on the wire and CPU per request, per body format and compression.
+
+For each payload profile and endpoint, sends the same document as JSON,
+MessagePack and CBOR (response in the same format) with each
+``Accept-Encoding`` (identity, gzip, deflate, zstd when installed) through
+the in-process ASGI client, and reports request and response bytes and the
+process CPU time per request (all threads, so offloaded work counts too;
+best of 3 blocks).
+
+Usage::
+
+    python -m benchmarks.bench_negotiation [--profiles small,wide,nested] [--requests 200]
+"""
+from __future__ import annotations
+import argparse
+import os
+import time
+
+os.environ.setdefault('RIOT_HMAC_SECRET', 'bench-secret')
+
+import orjson  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.utils.codecs import CBOR, JSON, MSGPACK, available  # noqa: E402
+from app.utils.compression import ENCODINGS  # noqa: E402
+from benchmarks._asgi import call, run  # noqa: E402
+from benchmarks.payloads import PROFILES, make_document  # noqa: E402
+
+
+async def measure(path: str, body: bytes, headers, requests: int, repeat: int = 3):
+    status, out = await call(app, 'POST', path, body, headers)
+    assert status == 200, (path, status, out[:200])
+    best = float('inf')
+    for _ in range(repeat):
+        cpu = time.process_time()
+        for _ in range(requests):
+            await call(app, 'POST', path, body, headers)
+        best = min(best, (time.process_time() - cpu) / requests)
+    return len(out), best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', default='small,wide,nested')
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+    codecs = [c for c in (JSON, MSGPACK, CBOR) if available(c)]
+    encodings = ['identity', *ENCODINGS]
+
+    print(f"{'profile':<8}{'path':<10}{'format':<9}{'encoding':<10}{'req B':>9}{'resp B':>9}{'cpu us':>9}")
+    for name in args.profiles.split(','):
+        doc = make_document(PROFILES[name])
+        tokens = orjson.loads(run(call(app, 'POST', '/encrypt', orjson.dumps(doc)))[1])
+        for path, value in (('/encrypt', doc), ('/decrypt', tokens), ('/sign', doc)):
+            for codec in codecs:
+                body = codec.dumps(value)
+                for encoding in encodings:
+                    headers = ((b'content-type', codec.media_type.encode()),
+                               (b'accept-encoding', encoding.encode()))
+                    resp_bytes, cpu = run(measure(path, body, headers, args.requests))
+                    print(f'{name:<8}{path:<10}{codec.name:<9}{encoding:<10}{len(body):>9}{resp_bytes:>9}'
+                          f'{cpu * 1e6:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
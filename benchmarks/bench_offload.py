@@ -0,0 +1,80 @@
+"""Small-request latency while large requests are in flight, per offload mode.
+
+Drives ``app.main.app`` in-process: ``--large`` background tasks keep sending
+~2 MiB ``/sign`` bodies while the foreground sends small ``/sign`` requests
+one at a time and records their latency. Each offload mode (``off`` = the
+previous all-inline behavior, ``thread``, ``process``) gets its own
+``Offloader`` through FastAPI dependency overrides.
+
+Usage::
+
+    python -m benchmarks.bench_offload [--small 300] [--large 2]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault('RIOT_HMAC_SECRET', 'bench-secret')
+
+import orjson  # noqa: E402
+
+from app.deps import get_offloader  # noqa: E402
+from app.main import app  # noqa: E402
+from app.offload import Offloader  # noqa: E402
+from benchmarks._asgi import call  # noqa: E402
+from benchmarks.bench_fast_path import make_payload  # noqa: E402
+
+SMALL = orjson.dumps({'message': 'Hello World', 'timestamp': 1616161616})
+
+
+def _pct(samples, q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def scenario(small_requests: int, large_tasks: int, large_body: bytes):
+    stop = asyncio.Event()
+
+    async def hammer():
+        while not stop.is_set():
+            await call(app, 'POST', '/sign', large_body)
+
+    background = [asyncio.ensure_future(hammer()) for _ in range(large_tasks)]
+    await asyncio.sleep(0.2)  # let the large requests get going
+    latencies = []
+    for _ in range(small_requests):
+        t0 = time.perf_counter()
+        status, _ = await call(app, 'POST', '/sign', SMALL)
+        latencies.append((time.perf_counter() - t0) * 1e3)
+        assert status == 200
+    stop.set()
+    await asyncio.gather(*background)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--small', type=int, default=300)
+    parser.add_argument('--large', type=int, default=2)
+    parser.add_argument('--large-bytes', type=int, default=2_000_000)
+    args = parser.parse_args()
+    large_body = orjson.dumps(make_payload(args.large_bytes))
+
+    print(f"{'mode':<10}{'load':>6}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    runs = [('off', 0)] + [(mode, args.large) for mode in ('off', 'thread', 'process')]
+    for mode, large in runs:
+        offloader = Offloader(mode=mode, threshold_bytes=256 * 1024, max_queue=64)
+        app.dependency_overrides[get_offloader] = lambda o=offloader: o
+        try:
+            lat = asyncio.run(scenario(args.small, large, large_body))
+        finally:
+            offloader.shutdown()
+            app.dependency_overrides.pop(get_offloader, None)
+        print(f'{mode:<10}{large:>6}{statistics.median(lat):>10.2f}{_pct(lat, 0.99):>10.2f}{max(lat):>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Small-request latency and throughput: HTTP/JSON vs the Unix-socket sidecar protocol.
+
+Starts one server process (``uvicorn app.main:app``, one worker) listening
+for HTTP on a Unix socket and with ``APP_SIDECAR_SOCKET`` set, so both
+transports share the same process, strategies and socket type; only the
+protocol stack differs. For ``/sign`` and ``/encrypt`` of a ~100-byte
+object it reports:
+
+- sequential round-trip latency (p50/p99): one request at a time, HTTP
+  over a keep-alive connection with a minimal raw client, the sidecar with
+  :class:`~app.sidecar.client.SidecarClient`;
+- throughput with ``--concurrency`` requests outstanding: HTTP over that
+  many keep-alive connections (HTTP/1.1 has no out-of-order responses),
+  the sidecar pipelined over a single connection.
+
+Usage::
+
+    python -m benchmarks.bench_sidecar [--requests 5000] [--concurrency 32]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import orjson
+
+from app.sidecar.client import SidecarClient
+from app.sidecar.protocol import OP_ENCRYPT, OP_SIGN
+from benchmarks.bench_offload import _pct
+
+BODY = orjson.dumps({'message': 'Hello World', 'timestamp': 1616161616, 'player': 'p-123456', 'ok': True})
+
+
+class HttpConnection:
+    """Minimal HTTP/1.1 keep-alive client (no httpx) so the client stack stays out of the way."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader, self.writer = reader, writer
+
+    @classmethod
+    async def open(cls, path: str) -> 'HttpConnection':
+        return cls(*await asyncio.open_unix_connection(path))
+
+    async def post(self, path: str, body: bytes) -> bytes:
+        self.writer.write(b'POST %s HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n'
+                          b'Content-Length: %d\r\n\r\n%s' % (path.encode(), len(body), body))
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        length = 0
+        for line in head.split(b'\r\n'):
+            if line[:15].lower() == b'content-length:':
+                length = int(line[15:])
+        assert head.startswith(b'HTTP/1.1 200'), head
+        return await self.reader.readexactly(length)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def _wait_for(path: str, proc: subprocess.Popen) -> None:
+    while not os.path.exists(path):
+        if proc.poll() is not None:
+            raise SystemExit(f'server exited with {proc.returncode}')
+        await asyncio.sleep(0.05)
+
+
+async def run(http_path: str, sidecar_path: str, requests: int, concurrency: int) -> None:
+    http = await HttpConnection.open(http_path)
+    sidecar = await SidecarClient.connect(sidecar_path)
+    print(f"{'op':<9}{'transport':<10}{'p50 us':>9}{'p99 us':>9}{'req/s @' + str(concurrency):>13}")
+    for op, route in ((OP_SIGN, '/sign'), (OP_ENCRYPT, '/encrypt')):
+        calls = {
+            'http': lambda conn: conn.post(route, BODY),
+            'sidecar': lambda client: client.request(op, BODY),
+        }
+        for name, call in calls.items():
+            conn = http if name == 'http' else sidecar
+            for _ in range(200):  # warm-up
+                await call(conn)
+            latencies = []
+            for _ in range(requests):
+                t0 = time.perf_counter()
+                await call(conn)
+                latencies.append((time.perf_counter() - t0) * 1e6)
+
+            if name == 'http':
+                conns = [await HttpConnection.open(http_path) for _ in range(concurrency)]
+            else:
+                conns = [sidecar] * concurrency
+            per_worker = requests // concurrency
+
+            async def worker(c):
+                for _ in range(per_worker):
+                    await call(c)
+
+            t0 = time.perf_counter()
+            await asyncio.gather(*(worker(c) for c in conns))
+            rps = per_worker * concurrency / (time.perf_counter() - t0)
+            if name == 'http':
+                for c in conns:
+                    c.close()
+            print(f'{route[1:]:<9}{name:<10}{statistics.median(latencies):>9.0f}{_pct(latencies, 0.99):>9.0f}'
+                  f'{rps:>13.0f}')
+    http.close()
+    await sidecar.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        http_path, sidecar_path = os.path.join(tmp, 'http.sock'), os.path.join(tmp, 'sidecar.sock')
+        env = {**os.environ, 'APP_SIDECAR_SOCKET': sidecar_path, 'APP_LOG_LEVEL': 'WARNING'}
+        env.setdefault('RIOT_HMAC_SECRET', 'bench-secret')
+        cmd = [sys.executable, '-m', 'uvicorn', 'app.main:app', '--uds', http_path, '--log-level', 'warning',
+               '--no-access-log']
+        proc = subprocess.Popen(cmd, env=env)
+        try:
+            async def bench():
+                await _wait_for(http_path, proc)
+                await _wait_for(sidecar_path, proc)
+                await run(http_path, sidecar_path, args.requests, args.concurrency)
+            asyncio.run(bench())
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+
+if __name__ == '__main__':
+    main()
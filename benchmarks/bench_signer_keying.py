@@ -0,0 +1,79 @@
+"""Share of signing CPU spent on HMAC key setup, and what reuse saves.
+
+Compares, for small canonical payloads:
+
+- ``before``: a new signer per request and ``hmac.new(secret, msg)`` per call
+  (key schedule recomputed every time);
+- ``after``: the process-wide signer from ``get_signer`` copying its
+  pre-keyed HMAC template.
+
+Usage::
+
+    python -m benchmarks.bench_signer_keying [--calls 200000]
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import hmac
+import os
+import time
+from typing import Any, Callable
+
+os.environ.setdefault('RIOT_HMAC_SECRET', 'bench-secret')
+
+from app.deps import get_signer  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.utils.json_canonical import canonicalize  # noqa: E402
+
+PAYLOADS = {
+    '50 B': {'message': 'Hello World', 'timestamp': 1616161616},
+    '200 B': {f'k{i}': f'value-{i}' for i in range(12)},
+    '1 KiB': {f'key_{i:03d}': {'v': i, 's': 'x' * 8} for i in range(40)},
+}
+
+
+def legacy_sign(data: Any) -> str:
+    secret = settings.hmac_secret.encode('utf-8')  # new signer per request
+    return hmac.new(secret, canonicalize(data), hashlib.sha256).hexdigest()
+
+
+def reused_sign(data: Any) -> str:
+    return get_signer().sign(data)
+
+
+def ns_per_call(fn: Callable[[], Any], calls: int) -> float:
+    for _ in range(min(calls, 1000)):
+        fn()
+    t0 = time.perf_counter_ns()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter_ns() - t0) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args()
+
+    secret = settings.hmac_secret.encode('utf-8')
+    template = hmac.new(secret, digestmod=hashlib.sha256)
+    print(f"{'payload':<8}{'before ns':>11}{'after ns':>10}{'signs/s after':>15}{'key setup share':>17}")
+    for name, data in PAYLOADS.items():
+        assert legacy_sign(data) == reused_sign(data)
+        msg = canonicalize(data)
+        keyed = ns_per_call(lambda: hmac.new(secret, msg, hashlib.sha256).hexdigest(), args.calls)
+        prekeyed = ns_per_call(lambda: _copy_sign(template, msg), args.calls)
+        before = ns_per_call(lambda: legacy_sign(data), args.calls)
+        after = ns_per_call(lambda: reused_sign(data), args.calls)
+        share = (keyed - prekeyed) / before * 100
+        print(f'{name:<8}{before:>11.0f}{after:>10.0f}{1e9 / after:>15,.0f}{share:>16.1f}%')
+
+
+def _copy_sign(template: Any, msg: bytes) -> str:
+    mac = template.copy()
+    mac.update(msg)
+    return mac.hexdigest()
+
+
+if __name__ == '__main__':
+    main()
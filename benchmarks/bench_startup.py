@@ -0,0 +1,121 @@
+"""Import time, first-request latency and server cold start.
+
+Each run is a fresh interpreter (``python -c``), timing:
+
+- ``framework``: importing FastAPI, pydantic and pydantic-settings, which
+  the app cannot avoid;
+- ``app``: importing ``app.main`` on top of that (Settings, models,
+  strategies, route and middleware construction);
+- ``first``/``second``: the first and second ``POST /sign`` through the
+  in-process ASGI client; the gap is what a fresh worker pays on its first
+  request for work done lazily.
+
+With ``--serve`` it also starts ``python -m app.serve`` and reports the
+time until the first ``POST /sign`` answers 200, and how long a graceful
+stop (SIGTERM) takes.
+
+Usage::
+
+    python -m benchmarks.bench_startup [--runs 7] [--serve] [--workers 2]
+"""
+from __future__ import annotations
+import argparse
+import http.client
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import orjson
+
+_PROBE = '''
+import time, orjson
+t0 = time.perf_counter()
+import fastapi, pydantic, pydantic_settings
+t1 = time.perf_counter()
+import app.main
+t2 = time.perf_counter()
+from benchmarks._asgi import call, run
+times = []
+for _ in range(2):
+    t = time.perf_counter()
+    status, _ = run(call(app.main.app, 'POST', '/sign', b'{"a": 1}'))
+    assert status == 200, status
+    times.append(time.perf_counter() - t)
+print(orjson.dumps({'framework': t1 - t0, 'app': t2 - t1, 'first': times[0], 'second': times[1]}).decode())
+'''
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault('RIOT_HMAC_SECRET', 'bench-secret')
+    return env
+
+
+def probe(runs: int) -> None:
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', _PROBE], env=_env(), capture_output=True, text=True, check=True)
+        samples.append(orjson.loads(out.stdout.strip().splitlines()[-1]))
+    print(f'median of {runs} fresh interpreters:')
+    for key in ('framework', 'app', 'first', 'second'):
+        print(f'  {key:<10}{statistics.median(s[key] for s in samples) * 1e3:>9.1f} ms')
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _sign(port: int) -> int:
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+    try:
+        conn.request('POST', '/sign', body=b'{"a": 1}', headers={'Content-Type': 'application/json'})
+        return conn.getresponse().status
+    finally:
+        conn.close()
+
+
+def serve(workers: int) -> None:
+    port = _free_port()
+    cmd = [sys.executable, '-m', 'app.serve', '--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise SystemExit(f'server exited with {proc.returncode}')
+            try:
+                if _sign(port) == 200:
+                    break
+            except OSError:
+                time.sleep(0.01)
+        ready = time.perf_counter() - start
+        stop = time.perf_counter()
+        proc.send_signal(signal.SIGTERM)
+        proc.wait(timeout=60)
+        stopped = time.perf_counter() - stop
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+    print(f'app.serve, {workers} worker(s): first 200 after {ready * 1e3:.0f} ms, '
+          f'graceful stop in {stopped * 1e3:.0f} ms')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--serve', action='store_true', help='also time a real server (python -m app.serve)')
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+    probe(args.runs)
+    if args.serve:
+        serve(args.workers)
+
+
+if __name__ == '__main__':
+    main()
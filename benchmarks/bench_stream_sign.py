@@ -0,0 +1,90 @@
+"""Peak RSS and time: buffered ``/sign`` pipeline vs streaming canonical HMAC.
+
+Writes a synthetic document of ``--mb`` MiB to a temporary file, then signs it
+in a fresh subprocess per mode so ``ru_maxrss`` reflects that mode alone:
+
+- ``buffered``: read bytes, ``orjson.loads``, ``canonicalize``, HMAC (the
+  ``/sign`` pipeline);
+- ``stream``: memory-map the file and feed ``iter_canonical`` chunks into
+  ``HmacSha256Signer.sign_chunks`` (the ``/sign/stream`` pipeline).
+
+Usage::
+
+    python -m benchmarks.bench_stream_sign [--mb 200]
+"""
+from __future__ import annotations
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import orjson
+
+SECRET = b'bench-secret'
+
+
+def write_document(path: str, target_bytes: int) -> None:
+    """Object of 64 arrays of small records, written without building it in memory."""
+    record = {'id': 1, 'name': 'Jane Doe', 'tags': ['a', 'b'], 'geo': {'lat': 53.3, 'lon': -6.2}}
+    per_key = max(1, target_bytes // 64 // (len(orjson.dumps(record)) + 1))
+    with open(path, 'wb') as out:
+        out.write(b'{')
+        for k in range(64):
+            out.write(b'%s"key_%02d":[' % (b',' if k else b'', 63 - k))
+            for i in range(per_key):
+                record['id'] = i
+                out.write((b',' if i else b'') + orjson.dumps(record))
+            out.write(b']')
+        out.write(b'}')
+
+
+def sign_in_process(mode: str, path: str) -> None:
+    from app.signature.hmac_sha256 import HmacSha256Signer
+    from app.utils.json_canonical import iter_canonical
+    from app.utils.json_stream import mapped
+
+    signer = HmacSha256Signer(SECRET)
+    t0 = time.perf_counter()
+    if mode == 'buffered':
+        with open(path, 'rb') as f:
+            signature = signer.sign(orjson.loads(f.read()))
+    else:
+        with mapped(path) as buf:
+            signature = signer.sign_chunks(iter_canonical(buf))
+    elapsed = time.perf_counter() - t0
+    peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(orjson.dumps({'signature': signature, 'seconds': elapsed, 'peak_rss_mib': peak_mib}).decode())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mb', type=int, default=200)
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        sign_in_process(*args.child)
+        return
+
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    try:
+        write_document(path, args.mb * 1024 * 1024)
+        size_mib = os.path.getsize(path) / 1024 / 1024
+        results = {}
+        for mode in ('buffered', 'stream'):
+            out = subprocess.run([sys.executable, '-m', 'benchmarks.bench_stream_sign', '--child', mode, path],
+                                 check=True, capture_output=True)
+            results[mode] = orjson.loads(out.stdout)
+        assert results['buffered']['signature'] == results['stream']['signature']
+        print(f'document: {size_mib:.0f} MiB (signatures identical)')
+        for mode, r in results.items():
+            print(f"{mode:<10}{r['seconds']:>8.2f} s{r['peak_rss_mib']:>10.0f} MiB peak RSS")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Compare a benchmark result file against a stored baseline.
+
+Prints every metric the two files share with its relative change and exits
+with status 1 when any gated metric regressed by more than ``--threshold``
+(a fraction: 0.10 = 10 %). "Regressed" follows the metric's direction: a
+drop for ``rps``, a rise for times and sizes. Cases present in only one
+file are listed but never fail the run.
+
+The baseline is always an explicit path. Reference baselines are committed
+under ``benchmarks/baselines/`` (refresh them with ``--out`` on the
+reference machine); ad-hoc runs go to the git-ignored ``benchmarks/results/``.
+
+Usage::
+
+    python -m benchmarks.micro --out benchmarks/results/micro.json
+    python -m benchmarks.compare benchmarks/baselines/micro.json benchmarks/results/micro.json
+"""
+from __future__ import annotations
+import argparse
+import sys
+from typing import List, Optional, Sequence
+
+from benchmarks._results import HIGHER_IS_BETTER, Results, read_results
+
+DEFAULT_METRICS = ('us_per_op', 'rps', 'p50_ms', 'p99_ms')
+
+
+def regressions(baseline: Results, current: Results, threshold: float,
+                metrics: Sequence[str] = DEFAULT_METRICS) -> List[str]:
+    """Print the comparison table; return ``"case metric"`` for each regression."""
+    failed: List[str] = []
+    print(f"{'case':<34}{'metric':<14}{'baseline':>12}{'current':>12}{'change':>9}")
+    for case in sorted(baseline.keys() | current.keys()):
+        if case not in baseline or case not in current:
+            print(f"{case:<34}{'(only in ' + ('current' if case in current else 'baseline') + ')'}")
+            continue
+        for metric in sorted(baseline[case].keys() & current[case].keys()):
+            old, new = baseline[case][metric], current[case][metric]
+            change = (new - old) / old if old else 0.0
+            worse = -change if metric in HIGHER_IS_BETTER else change
+            flag = ''
+            if metric in metrics and worse > threshold:
+                failed.append(f'{case} {metric}')
+                flag = '  REGRESSION'
+            print(f'{case:<34}{metric:<14}{old:>12.2f}{new:>12.2f}{change:>+9.1%}{flag}')
+    return failed
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.10)
+    parser.add_argument('--metrics', default=','.join(DEFAULT_METRICS),
+                        help='comma-separated metrics that can fail the run')
+    args = parser.parse_args(argv)
+
+    baseline, current = read_results(args.baseline), read_results(args.current)
+    if baseline['suite'] != current['suite']:
+        parser.error(f"suite mismatch: {baseline['suite']!r} vs {current['suite']!r}")
+    failed = regressions(baseline['results'], current['results'], args.threshold, args.metrics.split(','))
+    if failed:
+        print(f'\n{len(failed)} regression(s) beyond {args.threshold:.0%}: ' + ', '.join(failed))
+        return 1
+    print(f'\nno regressions beyond {args.threshold:.0%}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
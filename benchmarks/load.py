@@ -0,0 +1,115 @@
+"""In-process ASGI load driver for the four endpoints.
+
+Drives ``app.main.app`` (middleware included) through
+:func:`benchmarks._asgi.call`: ``--concurrency`` workers share a budget of
+``--requests`` requests per endpoint, after ``--warmup`` untimed ones. Each
+endpoint reports throughput (``rps``), latency percentiles (``p50_ms``,
+``p99_ms``, ``p999_ms``) and the process peak RSS seen so far
+(``peak_rss_mib``; ``ru_maxrss`` never goes down, so it is cumulative across
+endpoints in the order they run).
+
+Since client and server share one process and one event loop, this measures
+the application's cost per request, not socket or HTTP parsing overhead.
+
+Usage::
+
+    python -m benchmarks.load [--profile small] [--concurrency 16] [--requests 5000] [--out load.json]
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import resource
+import time
+from typing import Dict, List
+
+os.environ.setdefault('RIOT_HMAC_SECRET', 'bench-secret')
+
+import orjson  # noqa: E402
+
+from app.main import app  # noqa: E402
+from benchmarks._asgi import call, run  # noqa: E402
+from benchmarks._results import Results, write_results  # noqa: E402
+from benchmarks.payloads import PROFILES, make_document  # noqa: E402
+
+PATHS = ('/encrypt', '/decrypt', '/sign', '/verify')
+
+
+def bodies(profile: str) -> Dict[str, bytes]:
+    """Request body per endpoint, built through the app itself."""
+    plain = orjson.dumps(make_document(PROFILES[profile]))
+
+    async def _build() -> Dict[str, bytes]:
+        _, encrypted = await call(app, 'POST', '/encrypt', plain)
+        _, signed = await call(app, 'POST', '/sign', plain)
+        verify = b'{"signature":%s,"data":%s}' % (orjson.dumps(orjson.loads(signed)['signature']), plain)
+        return {'/encrypt': plain, '/decrypt': encrypted, '/sign': plain, '/verify': verify}
+    return run(_build())
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def drive(path: str, body: bytes, requests: int, concurrency: int) -> List[float]:
+    """Send *requests* requests with *concurrency* workers; return latencies in seconds."""
+    remaining = requests
+    latencies: List[float] = []
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            t0 = time.perf_counter()
+            status, out = await call(app, 'POST', path, body)
+            latencies.append(time.perf_counter() - t0)
+            if status not in (200, 204):
+                raise RuntimeError(f'{path} returned {status}: {out[:200]!r}')
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def load_endpoint(path: str, body: bytes, requests: int, concurrency: int, warmup: int) -> Dict[str, float]:
+    async def _run():
+        await drive(path, body, warmup, concurrency)
+        t0 = time.perf_counter()
+        latencies = await drive(path, body, requests, concurrency)
+        return latencies, time.perf_counter() - t0
+
+    latencies, elapsed = run(_run())
+    ordered = sorted(latencies)
+    return {
+        'rps': len(ordered) / elapsed,
+        'p50_ms': percentile(ordered, 0.50) * 1e3,
+        'p99_ms': percentile(ordered, 0.99) * 1e3,
+        'p999_ms': percentile(ordered, 0.999) * 1e3,
+        'peak_rss_mib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profile', default='small', choices=sorted(PROFILES))
+    parser.add_argument('--paths', default=','.join(PATHS))
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--out', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    payloads = bodies(args.profile)
+    results: Results = {}
+    print(f"{'endpoint':<10}{'bytes':>9}{'rps':>10}{'p50 ms':>9}{'p99 ms':>9}{'p999 ms':>9}{'rss MiB':>9}")
+    for path in args.paths.split(','):
+        r = load_endpoint(path, payloads[path], args.requests, args.concurrency, args.warmup)
+        results[f'{path.lstrip("/")}/{args.profile}/c{args.concurrency}'] = r
+        print(f"{path:<10}{len(payloads[path]):>9}{r['rps']:>10.0f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['p999_ms']:>9.2f}{r['peak_rss_mib']:>9.0f}")
+    if args.out:
+        write_results(args.out, 'load', results, profile=args.profile, concurrency=args.concurrency,
+                      requests=args.requests)
+
+
+if __name__ == '__main__':
+    main()
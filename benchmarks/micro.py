@@ -0,0 +1,94 @@
+"""Microbenchmarks for the strategies and canonicalization, per payload shape.
+
+For every profile in :data:`benchmarks.payloads.PROFILES` this times, on
+pre-built Python objects (no HTTP, no parsing of the request body):
+
+- ``encrypt``: :func:`app.ops.encrypt_object` with ``Base64JsonEncryptor``;
+- ``decrypt``: :func:`app.ops.decrypt_object` on the encrypted object;
+- ``sign``: ``HmacSha256Signer.sign`` (canonicalize + HMAC);
+- ``canonicalize``: :func:`app.utils.json_canonical.canonicalize` alone.
+
+It then times ``sign_canonical`` (the MAC alone, on already-canonical
+bytes) for every algorithm in :data:`app.signature.registry.ALGORITHMS`
+over ``--sign-sizes`` message sizes, as ``sign[<alg>]/<size>``.
+
+Each case reports the best of ``--repeat`` rounds (``us_per_op``), each round
+sized by ``timeit`` autorange so small payloads are not dominated by timer
+resolution. ``--out`` writes a result file for ``benchmarks.compare``.
+
+Usage::
+
+    python -m benchmarks.micro [--profiles small,wide] [--sign-sizes 100,1024,...] [--repeat 5] [--out micro.json]
+"""
+from __future__ import annotations
+import argparse
+import timeit
+from typing import Callable, Dict
+
+from app import ops
+from app.crypto.base64_json import Base64JsonEncryptor
+from app.signature.hmac_sha256 import HmacSha256Signer
+from app.signature.registry import ALGORITHMS, build_signer
+from app.utils.json_canonical import canonicalize
+from benchmarks._results import Results, write_results
+from benchmarks.payloads import PROFILES, document_bytes, make_document
+
+
+def cases(profile: str) -> Dict[str, Callable[[], object]]:
+    doc = make_document(PROFILES[profile])
+    encryptor = Base64JsonEncryptor()
+    encrypted = ops.encrypt_object(encryptor, doc)
+    signer = HmacSha256Signer(b'bench-secret')
+    return {
+        'encrypt': lambda: ops.encrypt_object(encryptor, doc),
+        'decrypt': lambda: ops.decrypt_object(encryptor, encrypted),
+        'sign': lambda: signer.sign(doc),
+        'canonicalize': lambda: canonicalize(doc),
+    }
+
+
+SIGN_SIZES = '100,1024,16384,262144,2097152'
+
+
+def sign_cases(size: int) -> Dict[str, Callable[[], object]]:
+    msg = bytes(range(256)) * (size // 256) + bytes(size % 256)
+    signers = {alg: build_signer(alg, b'bench-secret') for alg in ALGORITHMS}
+    return {f'sign[{alg}]': (lambda s=signer: s.sign_canonical(msg)) for alg, signer in signers.items()}
+
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """Best per-call time in seconds."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--profiles', default=','.join(PROFILES))
+    parser.add_argument('--sign-sizes', default=SIGN_SIZES, help="comma-separated bytes ('' to skip)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--out', help='write results as JSON to this path')
+    args = parser.parse_args()
+
+    results: Results = {}
+    print(f"{'case':<32}{'bytes':>10}{'us/op':>12}{'MB/s':>10}")
+    for profile in args.profiles.split(','):
+        size = document_bytes(PROFILES[profile])
+        for name, fn in cases(profile).items():
+            seconds = measure(fn, args.repeat)
+            key = f'{name}/{profile}'
+            results[key] = {'us_per_op': seconds * 1e6, 'bytes': size}
+            print(f'{key:<32}{size:>10}{seconds * 1e6:>12.1f}{size / seconds / 1e6:>10.1f}')
+    for size in (int(n) for n in args.sign_sizes.split(',') if n):
+        for name, fn in sign_cases(size).items():
+            seconds = measure(fn, args.repeat)
+            key = f'{name}/{size}'
+            results[key] = {'us_per_op': seconds * 1e6, 'bytes': size}
+            print(f'{key:<32}{size:>10}{seconds * 1e6:>12.1f}{size / seconds / 1e6:>10.1f}')
+    if args.out:
+        write_results(args.out, 'micro', results, repeat=args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""Deterministic payload generators shared by the benchmark suite.
+
+A document is described by four knobs:
+
+- ``keys``: number of top-level fields (what ``/encrypt`` and ``/decrypt``
+  iterate over);
+- ``depth``: nesting levels below each top-level field (0 = scalars only);
+- ``width``: members per nested object / elements per nested array;
+- ``string_bytes``: length of string leaves, which mostly drives size.
+
+:data:`PROFILES` names the shapes the suite runs by default.
+"""
+from __future__ import annotations
+import random
+from typing import Any, Dict, NamedTuple
+
+import orjson
+
+
+class Shape(NamedTuple):
+    keys: int
+    depth: int = 0
+    width: int = 4
+    string_bytes: int = 16
+
+
+PROFILES: Dict[str, Shape] = {
+    'small': Shape(keys=8),
+    'wide': Shape(keys=2000),
+    'deep': Shape(keys=4, depth=8, width=2),
+    'nested': Shape(keys=32, depth=2, width=8),
+    'large': Shape(keys=256, depth=2, width=16, string_bytes=64),
+}
+
+
+def _leaf(rng: random.Random, string_bytes: int) -> Any:
+    roll = rng.random()
+    if roll < 0.5:
+        return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz ') for _ in range(string_bytes))
+    if roll < 0.7:
+        return rng.randint(-10 ** 9, 10 ** 9)
+    if roll < 0.85:
+        return rng.random() * 1000
+    return rng.choice((True, False, None))
+
+
+def _value(rng: random.Random, shape: Shape, depth: int) -> Any:
+    if depth == 0:
+        return _leaf(rng, shape.string_bytes)
+    if rng.random() < 0.5:
+        return [_value(rng, shape, depth - 1) for _ in range(shape.width)]
+    # Reverse-ordered keys so canonicalization has sorting to do.
+    return {f'k{shape.width - i:03d}': _value(rng, shape, depth - 1) for i in range(shape.width)}
+
+
+def make_document(shape: Shape, seed: int = 0) -> Dict[str, Any]:
+    """Object with ``shape.keys`` top-level fields, reproducible for a given *seed*."""
+    rng = random.Random(seed)
+    return {f'field_{shape.keys - i:06d}': _value(rng, shape, shape.depth) for i in range(shape.keys)}
+
+
+def document_bytes(shape: Shape, seed: int = 0) -> int:
+    """Serialized size of :func:`make_document`."""
+    return len(orjson.dumps(make_document(shape, seed)))
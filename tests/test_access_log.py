@@ -0,0 +1,86 @@
+import os
+
+# Define the HMAC secret BEFORE importing the app (see test_api.py).
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import logging  # noqa: E402
+
+import orjson  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import metrics  # noqa: E402
+from app.access_log import BatchWriter, QueueHandler, install  # noqa: E402
+from app.errors import add_exception_handlers  # noqa: E402
+from app.middleware.access_log import AccessLogMiddleware  # noqa: E402
+from app.middleware.request_id import REQUEST_ID_HEADER, RequestIdMiddleware  # noqa: E402
+
+
+def _build_app(logger: logging.Logger, sample_rate: float = 1.0) -> FastAPI:
+    app = FastAPI()
+    add_exception_handlers(app)
+
+    @app.post("/items/{item_id}")
+    async def item(item_id: int, request: Request):
+        return {"id": item_id, "size": len(await request.body())}
+
+    app.add_middleware(RequestIdMiddleware)
+    app.add_middleware(AccessLogMiddleware, logger=logger, sample_rate=sample_rate)
+    return app
+
+
+def _lines(path):
+    return [orjson.loads(line) for line in path.read_bytes().splitlines()]
+
+
+def test_one_json_line_per_request(tmp_path):
+    out = tmp_path / "access.log"
+    writer = install("test-access-1", str(out))
+    writer.start()
+    client = TestClient(_build_app(logging.getLogger("test-access-1.access")))
+    ok = client.post("/items/7", content=b"hello", headers={REQUEST_ID_HEADER: "rid-1"})
+    missing = client.get("/nowhere")
+    writer.stop()
+
+    first, second = _lines(out)
+    assert first["request_id"] == ok.headers[REQUEST_ID_HEADER] == "rid-1"
+    assert (first["method"], first["path"], first["status"]) == ("POST", "/items/{item_id}", 200)
+    assert (first["request_bytes"], first["response_bytes"]) == (5, len(ok.content))
+    assert first["duration_ms"] >= 0 and first["message"] == "POST /items/{item_id} 200"
+    assert first["logger"] == "test-access-1.access" and first["level"] == "INFO" and first["ts"]
+    # Generated ids are logged too; unrouted requests keep their raw path.
+    assert second["request_id"] == missing.headers[REQUEST_ID_HEADER]
+    assert (second["path"], second["status"]) == ("/nowhere", 404)
+
+
+def test_sampling_keeps_errors(tmp_path):
+    out = tmp_path / "access.log"
+    writer = install("test-access-2", str(out))
+    writer.start()
+    client = TestClient(_build_app(logging.getLogger("test-access-2.access"), sample_rate=0.0))
+    for _ in range(20):
+        client.post("/items/1", content=b"{}")
+    client.post("/items/not-a-number")
+    writer.stop()
+    assert [(line["path"], line["status"]) for line in _lines(out)] == [("/items/{item_id}", 422)]
+
+
+def test_full_queue_drops_and_counts_then_stop_flushes(tmp_path):
+    handler = QueueHandler(queue_size=2)
+    logger = logging.getLogger("test-access-3")
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    before = metrics.REGISTRY.snapshot().get(("riot_access_log_dropped_total", ()), [0])[0]
+
+    for i in range(5):  # nothing drains yet: the writer is not started
+        logger.info("record %d", i)
+    assert handler.dropped == 3
+    assert metrics.REGISTRY.snapshot()[("riot_access_log_dropped_total", ())][0] - before == 3
+
+    out = tmp_path / "app.log"
+    writer = BatchWriter(handler, str(out), batch_size=1)
+    writer.start()
+    writer.stop()
+    assert [line["message"] for line in _lines(out)] == ["record 0", "record 1"]
+    assert writer.written == 2
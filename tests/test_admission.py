@@ -0,0 +1,137 @@
+import os
+
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import asyncio  # noqa: E402
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app.errors import add_exception_handlers  # noqa: E402
+from app.middleware.admission import AdaptiveLimit, AdmissionController, AdmissionMiddleware, FixedLimit  # noqa: E402
+
+
+def test_full_controller_queues_then_sheds():
+    controller = AdmissionController(FixedLimit(1), max_bytes=1000, queue_size=1, queue_timeout=0.05)
+
+    async def scenario():
+        assert await controller.acquire(10) is None
+        waiting = asyncio.ensure_future(controller.acquire(10))
+        await asyncio.sleep(0)
+        assert await controller.acquire(10) == "queue_full"
+        controller.release(10, 0.01)
+        assert await waiting is None  # handed the freed slot
+        assert await controller.acquire(10) == "queue_timeout"
+        controller.release(10)
+
+    asyncio.run(scenario())
+    assert controller.stats()["in_flight"] == 0
+    assert controller.rejected == {"queue_full": 1, "queue_timeout": 1}
+    assert (controller.admitted, controller.queued) == (2, 2)
+
+
+def test_byte_budget_is_fifo_and_oversized_bodies_run_alone():
+    controller = AdmissionController(FixedLimit(10), max_bytes=100, queue_size=4, queue_timeout=1)
+
+    async def scenario():
+        assert await controller.acquire(60) is None
+        large = asyncio.ensure_future(controller.acquire(500))
+        small = asyncio.ensure_future(controller.acquire(10))
+        await asyncio.sleep(0)
+        assert not large.done() and not small.done()  # small waits behind the large head
+        controller.release(60)
+        assert await large is None
+        await asyncio.sleep(0)
+        assert not small.done() and controller.in_flight_bytes == 500
+        controller.release(500)
+        assert await small is None
+        controller.release(10)
+
+    asyncio.run(scenario())
+    assert controller.in_flight_bytes == 0
+
+
+def test_adaptive_limit_shrinks_when_latency_rises_and_recovers():
+    limit = AdaptiveLimit(min_limit=4, max_limit=100)
+    for _ in range(200):
+        limit.update(0.01)
+    assert limit.value == 100
+    for _ in range(100):
+        limit.update(0.1)
+    assert limit.value < 20
+    for _ in range(300):
+        limit.update(0.01)
+    assert limit.value == 100
+
+
+def _build_app(controller: AdmissionController, release: asyncio.Event) -> FastAPI:
+    app = FastAPI()
+    add_exception_handlers(app)
+
+    @app.post("/slow")
+    async def slow():
+        await release.wait()
+        return {"ok": True}
+
+    @app.get("/health/live")
+    async def live():
+        return {"status": "ok"}
+
+    app.add_middleware(AdmissionMiddleware, controller=controller, max_body_bytes=1000, retry_after_seconds=2)
+    return app
+
+
+def test_overload_is_503_with_retry_after_and_health_is_exempt():
+    controller = AdmissionController(FixedLimit(1), max_bytes=1000, queue_size=0, queue_timeout=1)
+
+    async def scenario():
+        release = asyncio.Event()
+        transport = httpx.ASGITransport(app=_build_app(controller, release))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.post("/slow", content=b"{}"))
+            while controller.in_flight == 0:
+                await asyncio.sleep(0.001)
+            shed = await client.post("/slow", content=b"{}")
+            health = await client.get("/health/live")
+            release.set()
+            return await first, shed, health
+
+    first, shed, health = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "2"
+    assert shed.json() == {"error": "Server overloaded, retry later", "code": "server_overloaded"}
+    assert health.status_code == 200
+    assert controller.rejected["queue_full"] == 1
+    assert controller.in_flight == 0
+
+
+@pytest.mark.parametrize("method, headers, cost", [
+    ("POST", {"content-length": "10"}, 10), ("POST", {"content-length": "5000"}, 1000),
+    ("POST", {"transfer-encoding": "chunked"}, 1000), ("POST", {}, 1000),
+    ("GET", {}, 0), ("HEAD", {}, 0), ("OPTIONS", {}, 0),
+    ("GET", {"content-length": "10"}, 10), ("GET", {"transfer-encoding": "chunked"}, 1000),
+])
+def test_cost_is_declared_length_capped_at_the_body_limit(method, headers, cost):
+    seen = []
+
+    class Recording(AdmissionController):
+        async def acquire(self, cost):
+            seen.append(cost)
+            return await super().acquire(cost)
+
+    controller = Recording(FixedLimit(1), max_bytes=10_000, queue_size=0, queue_timeout=1)
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = AdmissionMiddleware(app, controller=controller, max_body_bytes=1000)
+    scope = {"type": "http", "method": method, "path": "/encrypt", "headers": [(k.encode(), v.encode()) for k, v in headers.items()]}
+
+    async def noop(*args):
+        return {"type": "http.request"}
+
+    asyncio.run(middleware(scope, noop, noop))
+    assert seen == [cost]
@@ -139,3 +139,25 @@ def test_verify_rejects_non_object_data():
     sig = client.post("/sign", json={"x": 1}).json()["signature"]
     res = client.post("/verify", json={"signature": sig, "data": [1, 2, 3]})
     assert res.status_code == 422
+
+
+def test_invalid_json_body_returns_422():
+    """
+    Malformed or empty JSON bodies are rejected with FastAPI's 422 error shape.
+    """
+    res = client.post("/sign", content=b"{bad", headers={"Content-Type": "application/json"})
+    assert res.status_code == 422
+    assert res.json()["detail"][0]["type"] == "json_invalid"
+
+    res = client.post("/encrypt", content=b"")
+    assert res.status_code == 422
+    assert res.json()["detail"][0]["type"] == "missing"
+
+
+def test_verify_blank_signature_returns_422():
+    """
+    A whitespace-only signature fails validation with 422 on the body field.
+    """
+    res = client.post("/verify", json={"signature": "   ", "data": {"x": 1}})
+    assert res.status_code == 422
+    assert res.json()["detail"][0]["loc"] == ["body", "signature"]
@@ -0,0 +1,103 @@
+import os
+
+# Define the HMAC secret BEFORE importing the app (see test_api.py).
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import orjson  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+
+client = TestClient(app)
+
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def _lines(res):
+    return [orjson.loads(line) for line in res.content.splitlines()]
+
+
+def test_encrypt_batch_json_array_matches_single_endpoint():
+    """
+    Each result line must equal the single /encrypt output, in input order.
+    """
+    items = [{"name": "John Doe"}, {"age": 30, "tags": ["a", "b"]}]
+    res = client.post("/encrypt/batch", json=items)
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    lines = _lines(res)
+    assert [line["index"] for line in lines] == [0, 1]
+    for item, line in zip(items, lines):
+        assert line["result"] == client.post("/encrypt", json=item).json()
+
+
+def test_ndjson_round_trip_with_per_item_errors():
+    """
+    NDJSON input: invalid items produce error lines without failing the batch.
+    """
+    body = b'{"a": 1}\n\n[1, 2]\nnot json\n{"b": "x"}'
+    enc = client.post("/encrypt/batch", content=body, headers=NDJSON)
+    assert enc.status_code == 200
+    lines = _lines(enc)
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert lines[1]["code"] == "root_not_object"
+    assert lines[2]["code"] == "invalid_json"
+
+    ok = [lines[0]["result"], lines[3]["result"]]
+    dec_body = b"\n".join(orjson.dumps(o) for o in ok)
+    dec = _lines(client.post("/decrypt/batch", content=dec_body, headers=NDJSON))
+    assert [line["result"] for line in dec] == [{"a": 1}, {"b": "x"}]
+
+
+def test_sign_and_verify_batch():
+    """
+    Batch signatures verify through /verify/batch; tampered items fail alone.
+    """
+    data = [{"x": 1}, {"y": [1, 2]}]
+    sigs = [line["signature"] for line in _lines(client.post("/sign/batch", json=data))]
+    assert sigs[0] == client.post("/sign", json=data[0]).json()["signature"]
+
+    checks = [
+        {"signature": sigs[0], "data": data[0]},
+        {"signature": sigs[1], "data": {"y": [1, 3]}},
+        {"signature": sigs[1]},
+    ]
+    lines = _lines(client.post("/verify/batch", json=checks))
+    assert lines[0] == {"index": 0, "valid": True}
+    assert lines[1]["code"] == "invalid_signature"
+    assert lines[2]["code"] == "validation_error"
+
+
+def test_batch_rejects_non_array_json_body():
+    """
+    A JSON body that is not an array fails the whole request with 400.
+    """
+    res = client.post("/sign/batch", json={"not": "an array"})
+    assert res.status_code == 400
+    assert res.json()["code"] == "root_not_array"
+
+
+def test_ndjson_lines_split_across_small_chunks():
+    """
+    Lines may arrive in any chunking: long lines, newlines at chunk edges, oversized lines.
+    """
+    import asyncio
+    from app.batch import _OVERSIZED, _iter_ndjson_lines
+
+    long_line = orjson.dumps({"k": "v" * 5000})
+    body = long_line + b"\n\n" + b'{"a": 1}\n' + b'"' + b"x" * 300 + b'"\n' + b'{"b": 2}'
+
+    class Request:
+        def __init__(self, size):
+            self.size = size
+
+        async def stream(self):
+            for i in range(0, len(body), self.size):
+                yield body[i:i + self.size]
+
+    async def collect(size, max_line):
+        return [line async for line in _iter_ndjson_lines(Request(size), max_line)]
+
+    for size in (1, 7, 64, len(body)):
+        assert asyncio.run(collect(size, 10_000)) == [long_line, b'{"a": 1}', b'"' + b"x" * 300 + b'"', b'{"b": 2}']
+        lines = asyncio.run(collect(size, 200))
+        assert lines == [_OVERSIZED, b'{"a": 1}', _OVERSIZED, b'{"b": 2}'], size
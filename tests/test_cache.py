@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from app.crypto.base64_json import Base64JsonEncryptor
+from app.crypto.caching import CachingEncryptor
+from app.signature.caching import CachingSigner
+from app.signature.hmac_sha256 import HmacSha256Signer
+from app.utils.lru import BoundedLRUCache
+
+
+def test_lru_evicts_by_entries_and_bytes():
+    cache = BoundedLRUCache(max_entries=2, max_bytes=10)
+    cache.put("a", 1, 4)
+    cache.put("b", 2, 4)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.put("c", 3, 4)  # over 10 bytes -> evicts "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    cache.put("huge", 4, 11)  # larger than the whole budget: never stored
+    assert cache.get("huge") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1)
+    assert stats["entries"] == 2 and stats["bytes"] == 8
+
+
+def test_caching_encryptor_never_shares_mutable_values():
+    enc = CachingEncryptor(Base64JsonEncryptor(), BoundedLRUCache(16, 1 << 20))
+    token = enc.encrypt_value({"email": "john@example.com", "tags": [1, 2]})
+    first = enc.decrypt_value(token)
+    first["tags"].append(3)
+    second = enc.decrypt_value(token)
+    assert second == {"email": "john@example.com", "tags": [1, 2]}
+    assert enc.cache.stats()["hits"] == 1
+    with pytest.raises(Exception):
+        enc.decrypt_value("not-base64!!")
+
+
+def test_caching_signer_matches_inner_and_counts_hits():
+    inner = HmacSha256Signer(b"secret")
+    signer = CachingSigner(inner, BoundedLRUCache(16, 1 << 20))
+    a = {"message": "Hello World", "timestamp": 1616161616}
+    b = {"timestamp": 1616161616, "message": "Hello World"}
+    assert signer.sign(a) == inner.sign(a)
+    assert signer.sign(b) == inner.sign(a)  # same canonical bytes -> cache hit
+    assert signer.verify(inner.sign(a), b)
+    assert signer.cache.stats()["hits"] == 2
+
+
+def test_cache_is_consistent_under_threads():
+    cache = BoundedLRUCache(max_entries=64, max_bytes=1 << 20)
+    signer = CachingSigner(HmacSha256Signer(b"secret"), cache)
+    expected = {i: HmacSha256Signer(b"secret").sign({"i": i}) for i in range(200)}
+    errors = []
+
+    def worker():
+        for i in range(200):
+            if signer.sign({"i": i}) != expected[i]:
+                errors.append(i)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(cache) <= 64
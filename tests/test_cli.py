@@ -0,0 +1,77 @@
+import os
+
+# Define the HMAC secret BEFORE importing the app (see test_api.py).
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import io  # noqa: E402
+import sys  # noqa: E402
+
+import orjson  # noqa: E402
+import pytest  # noqa: E402
+
+from app import cli, deps, ops  # noqa: E402
+
+DOCS = [{"id": i, "name": f"player-{i}", "tags": ["a", {"b": i}]} for i in range(300)]
+
+
+def _write(path, docs):
+    path.write_bytes(b"".join(orjson.dumps(d) + b"\n" for d in docs))
+    return str(path)
+
+
+def _lines(path):
+    return [orjson.loads(line) for line in path.read_bytes().splitlines()]
+
+
+def test_sign_lines_match_the_batch_items(tmp_path):
+    out = tmp_path / "out.ndjson"
+    assert cli.main(["sign", _write(tmp_path / "in.ndjson", DOCS), "-o", str(out), "--workers", "1"]) == 0
+    signer = deps.get_signer()
+    assert _lines(out) == [{"index": i, **ops.sign_item(signer, d)} for i, d in enumerate(DOCS)]
+
+
+def test_encrypt_then_decrypt_round_trips(tmp_path):
+    encrypted, decrypted = tmp_path / "enc.ndjson", tmp_path / "dec.ndjson"
+    cli.main(["encrypt", _write(tmp_path / "in.ndjson", DOCS), "-o", str(encrypted), "--workers", "1"])
+    tokens = [line["result"] for line in _lines(encrypted)]
+    cli.main(["decrypt", _write(tmp_path / "tokens.ndjson", tokens), "-o", str(decrypted), "--workers", "1"])
+    assert [line["result"] for line in _lines(decrypted)] == DOCS
+
+
+def test_pool_output_matches_inline_in_order(tmp_path):
+    src = _write(tmp_path / "in.ndjson", DOCS)
+    inline, pooled, unordered = tmp_path / "a", tmp_path / "b", tmp_path / "c"
+    cli.main(["sign", src, "-o", str(inline), "--workers", "1"])
+    cli.main(["sign", src, "-o", str(pooled), "--workers", "2", "--chunk-bytes", "1000"])
+    cli.main(["sign", src, "-o", str(unordered), "--workers", "2", "--chunk-bytes", "1000", "--unordered"])
+    assert pooled.read_bytes() == inline.read_bytes()
+    assert sorted(unordered.read_bytes().splitlines()) == sorted(inline.read_bytes().splitlines())
+
+
+def test_bad_lines_become_error_lines(tmp_path):
+    src = tmp_path / "in.ndjson"
+    src.write_bytes(b'{"a": 1}\n{not json\n\n[1, 2]\n{"b": 2}')  # blank line 2, no final newline
+    out = tmp_path / "out.ndjson"
+    assert cli.main(["encrypt", str(src), "-o", str(out), "--workers", "1"]) == 1
+    lines = _lines(out)
+    assert [line["index"] for line in lines] == [0, 1, 3, 4]
+    assert [line.get("code") for line in lines] == [None, "invalid_json", "root_not_object", None]
+
+
+def test_stdin_chunks_match_file_chunks(tmp_path, monkeypatch):
+    src = _write(tmp_path / "in.ndjson", DOCS)
+    from_file = io.BytesIO()
+    cli.run("sign", cli.file_chunks(src, 1000), from_file, workers=1)
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(open(src, "rb").read())))
+    out = tmp_path / "out.ndjson"
+    cli.main(["sign", "-", "-o", str(out), "--workers", "1", "--chunk-bytes", "777"])
+    assert out.read_bytes() == from_file.getvalue()
+
+
+@pytest.mark.parametrize("option", ["--workers", "--chunk-bytes"])
+@pytest.mark.parametrize("value", ["0", "-1", "x"])
+def test_rejects_non_positive_sizes(option, value, capsys):
+    with pytest.raises(SystemExit) as exc:
+        cli.main(["sign", "-", option, value])
+    assert exc.value.code == 2
+    assert option in capsys.readouterr().err
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+import pytest
+
+from benchmarks import compare
+from benchmarks._results import write_results
+
+BASELINES = Path(__file__).resolve().parents[1] / "benchmarks" / "baselines"
+BASELINE = {
+    "sign/small": {"us_per_op": 10.0, "bytes": 249},
+    "encrypt/small/c16": {"rps": 1000.0, "p99_ms": 5.0},
+    "gone/small": {"us_per_op": 1.0},
+}
+
+
+def _files(tmp_path, current, suite="micro"):
+    base, cur = tmp_path / "baseline.json", tmp_path / "current.json"
+    write_results(str(base), "micro", BASELINE)
+    write_results(str(cur), suite, current)
+    return [str(base), str(cur)]
+
+
+def test_regressions_follow_metric_direction_and_threshold(capsys):
+    current = {
+        "sign/small": {"us_per_op": 11.5, "bytes": 999},  # +15 % time; bytes is not gated
+        "encrypt/small/c16": {"rps": 850.0, "p99_ms": 5.4},  # -15 % rps; +8 % p99
+        "new/small": {"us_per_op": 99.0},
+    }
+    assert compare.regressions(BASELINE, current, 0.10) == ["encrypt/small/c16 rps", "sign/small us_per_op"]
+    assert compare.regressions(BASELINE, current, 0.20) == []
+    assert compare.regressions(BASELINE, current, 0.05) == [
+        "encrypt/small/c16 p99_ms", "encrypt/small/c16 rps", "sign/small us_per_op"]
+    assert compare.regressions(BASELINE, current, 0.10, metrics=["rps"]) == ["encrypt/small/c16 rps"]
+    out = capsys.readouterr().out
+    assert "(only in baseline)" in out and "(only in current)" in out
+
+
+def test_improvements_never_fail():
+    current = {"sign/small": {"us_per_op": 2.0}, "encrypt/small/c16": {"rps": 5000.0, "p99_ms": 0.1}}
+    assert compare.regressions(BASELINE, current, 0.0) == []
+
+
+def test_main_exit_status(tmp_path, capsys):
+    assert compare.main(_files(tmp_path, {"sign/small": {"us_per_op": 10.5}})) == 0
+    assert "no regressions beyond 10%" in capsys.readouterr().out
+    argv = _files(tmp_path, {"sign/small": {"us_per_op": 12.0}})
+    assert compare.main(argv) == 1
+    assert "1 regression(s) beyond 10%: sign/small us_per_op" in capsys.readouterr().out
+    assert compare.main(argv + ["--threshold", "0.25"]) == 0
+
+
+def test_main_rejects_suite_mismatch(tmp_path):
+    with pytest.raises(SystemExit) as exc:
+        compare.main(_files(tmp_path, {}, suite="load"))
+    assert exc.value.code == 2
+
+
+def test_committed_baselines_are_readable():
+    for suite in ("micro", "load"):
+        doc = compare.read_results(str(BASELINES / f"{suite}.json"))
+        assert doc["suite"] == suite and doc["results"]
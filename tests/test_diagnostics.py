@@ -0,0 +1,83 @@
+import threading
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.diagnostics import LagMonitor, SamplingProfiler
+from app.middleware.request_id import RequestIdMiddleware
+
+
+def test_lag_monitor_captures_blocking_stack_and_request_id():
+    monitor = LagMonitor(threshold_s=0.05)
+
+    @asynccontextmanager
+    async def lifespan(_):
+        monitor.start()
+        yield
+        monitor.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(RequestIdMiddleware)
+
+    blocked = []
+
+    @app.get("/block")
+    async def block():
+        t0 = time.monotonic()
+        time.sleep(0.3)  # blocks the event loop
+        blocked.append((time.monotonic() - t0) * 1e3)
+        return {}
+
+    with TestClient(app) as client:
+        assert client.get("/block", headers={"X-Request-ID": "req-42"}).status_code == 200
+        time.sleep(0.1)  # let the watchdog see the loop resume
+
+    assert len(monitor.stalls) == 1
+    stall = monitor.stalls[0]
+    assert stall["request_id"] == "req-42"
+    assert any("time.sleep(0.3)" in line for line in stall["stack"])
+    # The stall starts at the last heartbeat before the sleep and ends at the
+    # first one after it, so it covers the sleep to within about one interval.
+    interval_ms = monitor.interval_s * 1e3
+    assert blocked[0] - interval_ms <= stall["duration_ms"] <= blocked[0] + 100
+
+
+def test_profiler_writes_collapsed_stacks(tmp_path):
+    started, stop = threading.Event(), threading.Event()
+
+    def busy_function():
+        started.set()
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_function, name="busy")
+    worker.start()
+    started.wait()  # sample only once the thread is past its bootstrap frames
+    profiler = SamplingProfiler(str(tmp_path), max_seconds=5)
+    try:
+        path = profiler.start(0.2, 0.005)
+        while profiler.running:
+            time.sleep(0.01)
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = open(path).read().splitlines()
+    assert profiler.last_samples > 0
+    busy = [line for line in lines if line.startswith("busy;")]
+    assert busy and all("busy_function (test_diagnostics.py:" in line for line in busy)
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0
+
+
+def test_profiler_start_failure_frees_the_slot(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("")
+    profiler = SamplingProfiler(str(blocker / "profiles"), max_seconds=5)
+    for _ in range(2):  # the second call fails the same way, not with 409 profile_running
+        with pytest.raises(OSError):
+            profiler.start(0.1, 0.005)
+        assert not profiler.running
@@ -26,3 +26,98 @@ def test_invalid_token_raises():
     enc = Base64JsonEncryptor()
     with pytest.raises(Exception):
         enc.decrypt_value("not-base64!!")
+
+
+def test_try_decrypt_value_matches_decrypt_value():
+    from app.crypto.base import NOT_A_TOKEN
+    enc = Base64JsonEncryptor()
+    samples = [enc.encrypt_value(v) for v in ("John Doe", 30, None, [1, {"a": True}], "")] + [
+        "1998-11-19", "John", "", "MTIz", "MTIz=", "MTIz==", "AAAA", "e30=", "e30", "IjEi", "bnVsbA==",
+        "IA==", "not-base64!!", "abcd", "dHJ1ZQ", "W10=\n", "e30===",
+    ]
+    for token in samples:
+        try:
+            expected = enc.decrypt_value(token)
+        except Exception:
+            expected = NOT_A_TOKEN
+        assert enc.try_decrypt_value(token) == expected, token
+
+
+def test_encrypt_object_to_bytes_matches_rendering_the_tokens():
+    import orjson
+    from app.crypto.base import Encryptor
+    enc = Base64JsonEncryptor()
+    for obj in ({}, {"a": 1}, {"name": "Jöhn \"D\"", "k\\ey\n": [1, {"a": None}], "": "", "e": 1.5, "t": True}):
+        expected = orjson.dumps({k: enc.encrypt_value(v) for k, v in obj.items()})
+        assert enc.encrypt_object_to_bytes(obj) == expected
+        assert Encryptor.encrypt_object_to_bytes(enc, obj) == expected  # the generic default
+        assert {k: enc.decrypt_value(v) for k, v in orjson.loads(expected).items()} == obj
+
+
+def _aes():
+    pytest.importorskip("cryptography")
+    from app.crypto.aes_gcm import AesGcmEncryptor
+    return AesGcmEncryptor(bytes(range(32)))
+
+
+def test_aes_gcm_round_trip_and_token_format():
+    enc = _aes()
+    for value in ("John Doe", 30, None, [1, {"a": True}], {"email": "john@example.com"}):
+        token = enc.encrypt_value(value)
+        assert token.startswith("A") and "=" not in token  # version 1, unpadded base64url
+        assert enc.decrypt_value(token) == value
+    # Fresh nonce per call: same value, different tokens.
+    assert enc.encrypt_value("x") != enc.encrypt_value("x")
+
+
+def test_aes_gcm_rejects_tampered_foreign_and_plain_strings():
+    from app.crypto.aes_gcm import AesGcmEncryptor
+    from app.crypto.base import NOT_A_TOKEN
+    enc = _aes()
+    token = enc.encrypt_value({"a": 1})
+    tampered = token[:-2] + ("A" if token[-2] != "A" else "B") + token[-1]
+    other_key = AesGcmEncryptor(b"k" * 16).encrypt_value({"a": 1})
+    for bad in (tampered, other_key, "1998-11-19", "", "A" * 60, Base64JsonEncryptor().encrypt_value("x" * 40)):
+        assert enc.try_decrypt_value(bad) is NOT_A_TOKEN
+        with pytest.raises(ValueError):
+            enc.decrypt_value(bad)
+
+
+def test_aes_gcm_nonces_unique_and_survive_pickling():
+    import pickle
+    enc = _aes()
+    nonces = {enc._nonce() for _ in range(10000)}
+    assert len(nonces) == 10000
+    clone = pickle.loads(pickle.dumps(enc))
+    assert clone.decrypt_value(enc.encrypt_value([1, 2])) == [1, 2]
+    assert clone._prefix != enc._prefix  # the copy draws its own nonce prefix
+
+
+def test_decode_key():
+    import base64
+    from app.crypto.aes_gcm import decode_key
+    key = bytes(range(32))
+    assert decode_key(base64.b64encode(key).decode()) == key
+    assert decode_key(base64.urlsafe_b64encode(key).decode().rstrip("=")) == key
+    for bad in ("not base64!", base64.b64encode(b"short").decode()):
+        with pytest.raises(ValueError):
+            decode_key(bad)
+
+
+def test_get_encryptor_selects_strategy_from_settings(monkeypatch):
+    pytest.importorskip("cryptography")
+    import base64
+    from app import deps
+    from app.crypto.aes_gcm import AesGcmEncryptor
+    from app.errors import APIError
+
+    monkeypatch.setattr(deps, "_encryptor", None)
+    monkeypatch.setattr(deps.settings, "encryptor", "aes-gcm")
+    monkeypatch.setattr(deps.settings, "encryption_key", "")
+    with pytest.raises(APIError) as err:
+        deps.get_encryptor()
+    assert (err.value.status_code, err.value.code) == (503, "encryption_key_missing")
+
+    monkeypatch.setattr(deps.settings, "encryption_key", base64.b64encode(b"k" * 32).decode())
+    assert isinstance(deps.get_encryptor(), AesGcmEncryptor)
+    monkeypatch.setattr(deps, "_encryptor", None)
@@ -0,0 +1,71 @@
+import os
+
+# Define the HMAC secret BEFORE importing the app (see test_api.py).
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.errors import APIError  # noqa: E402
+from app.main import app  # noqa: E402
+from app.utils.field_paths import apply_fields, compile_fields  # noqa: E402
+
+client = TestClient(app)
+
+DOC = {
+    "id": 7,
+    "ssn": "123-45-6789",
+    "card": {"number": "4111", "exp": "12/30"},
+    "contacts": [{"email": "a@x", "name": "A"}, {"name": "B"}],
+    "meta": {"x": {"secret": 1, "y": 2}, "z": {"secret": 5}},
+}
+
+
+def test_selector_compiles_to_a_merged_tree():
+    assert compile_fields("ssn, $.card.number,contacts[*].email,meta.*.secret,meta.x") == {
+        "ssn": None,
+        "card": {"number": None},
+        "contacts": {"*": {"email": None}},
+        "meta": {"*": {"secret": None}, "x": None},  # the whole of meta.x wins over meta.*.secret
+    }
+    assert compile_fields("a.b,a") == compile_fields("a,a.b") == {"a": None}
+    assert compile_fields("rows[1][*]") == {"rows": {1: {"*": None}}}
+    assert compile_fields("x.y") is compile_fields("x.y")  # cached
+
+
+@pytest.mark.parametrize("selector", ["", "a,,b", "a..b", ".a", "a[x]", "a[1", "a]"])
+def test_malformed_selectors_are_rejected(selector):
+    with pytest.raises(APIError) as err:
+        compile_fields(selector)
+    assert err.value.code == "invalid_field_selector"
+
+
+def test_only_selected_values_are_transformed():
+    doc = {**DOC, "contacts": [dict(c) for c in DOC["contacts"]], "meta": {"x": {"secret": 1}, "z": {"secret": 5}}}
+    out = apply_fields(doc, compile_fields("ssn,contacts[*].email,contacts[5].name,meta.*.secret,missing.path,id.x"),
+                       lambda v: f"<{v}>")
+    assert out == {
+        "id": 7,
+        "ssn": "<123-45-6789>",
+        "card": {"number": "4111", "exp": "12/30"},
+        "contacts": [{"email": "<a@x>", "name": "A"}, {"name": "B"}],
+        "meta": {"x": {"secret": "<1>"}, "z": {"secret": "<5>"}},
+    }
+
+
+def test_encrypt_and_decrypt_selected_fields():
+    params = {"fields": "ssn,card.number,contacts[*].email"}
+    encrypted = client.post("/encrypt", params=params, json=DOC).json()
+    assert encrypted["ssn"] == client.post("/encrypt", json={"ssn": DOC["ssn"]}).json()["ssn"]
+    assert encrypted["card"]["number"] != "4111" and encrypted["card"]["exp"] == "12/30"
+    assert encrypted["contacts"][1] == {"name": "B"}
+    assert {k: encrypted[k] for k in ("id", "meta")} == {"id": 7, "meta": DOC["meta"]}
+    assert client.post("/decrypt", params=params, json=encrypted).json() == DOC
+    # Tokens outside the selector are left alone.
+    assert client.post("/decrypt", params={"fields": "ssn"}, json=encrypted).json()["card"] == encrypted["card"]
+
+
+def test_invalid_selector_is_a_400():
+    res = client.post("/encrypt", params={"fields": "a..b"}, json=DOC)
+    assert res.status_code == 400
+    assert res.json()["code"] == "invalid_field_selector"
@@ -0,0 +1,103 @@
+import os
+
+# Define the HMAC secret BEFORE importing the app (see test_api.py).
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import orjson  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import deps  # noqa: E402
+from app.errors import APIError  # noqa: E402
+from app.main import app  # noqa: E402
+from app.signature.hmac_sha256 import HmacSha256Signer  # noqa: E402
+from app.signature.keyring import KeyringFile, KeyringSigner  # noqa: E402
+
+DATA = {"message": "Hello World", "timestamp": 1616161616}
+
+
+def _write(path, doc):
+    path.write_bytes(orjson.dumps(doc))
+    # Make each rewrite visible to the mtime check, even within one clock tick.
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_rotation_verifies_old_and_new_signatures_by_key_id():
+    old = KeyringSigner({"k1": b"one"}, active="k1")
+    rotated = KeyringSigner({"k1": b"one", "k2": b"two"}, active="k2", unprefixed="k1")
+    old_sig = old.sign(DATA)
+    new_sig = rotated.sign(DATA)
+    assert old_sig == "k1." + HmacSha256Signer(b"one").sign(DATA)
+    assert new_sig.startswith("k2.")
+    assert rotated.verify(old_sig, DATA) and rotated.verify(new_sig, DATA)
+    # Pre-keyring (unprefixed) signatures verify against the "unprefixed" key only.
+    assert rotated.verify(HmacSha256Signer(b"one").sign(DATA), DATA)
+    assert not rotated.verify(HmacSha256Signer(b"two").sign(DATA), DATA)
+    assert not rotated.verify("k9." + new_sig[3:], DATA)
+    assert not rotated.verify(new_sig, {**DATA, "x": 1})
+
+
+def test_invalid_keyrings_are_rejected(tmp_path):
+    for doc in ({"keys": {"k1": "s"}}, {"active": "k2", "keys": {"k1": "s"}},
+                {"active": "k.1", "keys": {"k.1": "s"}}, {"active": "k1", "keys": {"k1": ""}}, {},
+                {"active": "k1", "keys": {"k1": "s"}, "unprefixed": "k0"},
+                {"tenants": {"acme": {"active": "a1", "keys": {"a1": "A", "a 2": "B"}}}}):
+        path = tmp_path / "ring.json"
+        _write(path, doc)
+        with pytest.raises(APIError) as err:
+            KeyringFile(str(path))
+        assert err.value.code == "keyring_invalid"
+
+
+def test_hot_reload_and_tenant_cache(tmp_path):
+    path = tmp_path / "ring.json"
+    _write(path, {"active": "k1", "keys": {"k1": "one"}, "tenants": {"acme": {"active": "a1", "keys": {"a1": "A"}}}})
+    keyring = KeyringFile(str(path), reload_seconds=0, cache_entries=1)
+    default, acme = keyring.signer(None), keyring.signer("acme")
+    assert default.sign(DATA).startswith("k1.") and acme.sign(DATA).startswith("a1.")
+    assert len(keyring.cache) == 1  # bounded: building acme evicted the default ring's signer
+    with pytest.raises(APIError) as err:
+        keyring.signer("other")
+    assert (err.value.status_code, err.value.code) == (400, "unknown_tenant")
+
+    _write(path, {"active": "k2", "keys": {"k1": "one", "k2": "two"}})
+    rotated = keyring.signer(None)
+    assert keyring.reloads == 1
+    assert rotated.sign(DATA).startswith("k2.") and rotated.verify(default.sign(DATA), DATA)
+
+    path.write_text("{ not json")  # a broken edit keeps the loaded keyring
+    os.utime(path, ns=(0, 1))
+    assert keyring.signer(None).sign(DATA) == rotated.sign(DATA)
+    assert keyring.reloads == 1
+
+
+def test_loading_builds_no_signers(tmp_path, monkeypatch):
+    from app.signature import keyring as keyring_module
+    built = []
+    monkeypatch.setattr(keyring_module, "build_signer",
+                        lambda alg, secret: built.append(secret) or HmacSha256Signer(secret))
+    path = tmp_path / "ring.json"
+    tenants = {f"t{i}": {"active": "a1", "keys": {"a1": f"s{i}", "a2": "x"}} for i in range(100)}
+    _write(path, {"tenants": tenants})
+    keyring = KeyringFile(str(path), reload_seconds=0)
+    _write(path, {"tenants": {**tenants, "new": {"active": "n1", "keys": {"n1": "n"}}}})
+    keyring.signer("t7")
+    assert keyring.reloads == 1
+    assert sorted(built) == [b"s7", b"x"]  # only the ring in use is keyed
+
+
+def test_api_uses_tenant_keyring(tmp_path, monkeypatch):
+    path = tmp_path / "ring.json"
+    _write(path, {"active": "k1", "keys": {"k1": "one"}, "tenants": {"acme": {"active": "a1", "keys": {"a1": "A"}}}})
+    monkeypatch.setattr(deps.settings, "keyring_file", str(path))
+    monkeypatch.setattr(deps, "_keyring", None)
+    client = TestClient(app)
+
+    sig = client.post("/sign", json=DATA, headers={"X-Tenant-ID": "acme"}).json()["signature"]
+    assert sig == "a1." + HmacSha256Signer(b"A").sign(DATA)
+    body = {"signature": sig, "data": DATA}
+    assert client.post("/verify", json=body, headers={"X-Tenant-ID": "acme"}).status_code == 204
+    assert client.post("/verify", json=body).status_code == 400  # default ring has no key "a1"
+    res = client.post("/sign", json=DATA, headers={"X-Tenant-ID": "nobody"})
+    assert (res.status_code, res.json()["code"]) == (400, "unknown_tenant")
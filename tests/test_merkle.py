@@ -0,0 +1,80 @@
+import os
+
+# Define the HMAC secret BEFORE importing the app (see test_api.py).
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import hashlib  # noqa: E402
+import hmac  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.signature.hmac_sha256 import HmacSha256Signer  # noqa: E402
+from app.signature.keyring import KeyringSigner  # noqa: E402
+from app.signature.merkle import MERKLE_TAG, leaf_digests, merkle_root, sign_leaves, verify_leaves  # noqa: E402
+
+client = TestClient(app)
+
+DOC = {"name": "John Doe", "age": 30, "tags": ["a", {"b": None}], "address": {"city": "Paris", "zip": "75001"}}
+
+
+def test_root_is_order_independent_and_matches_the_spec():
+    reordered = dict(reversed(list(DOC.items())))
+    assert merkle_root(leaf_digests(DOC)) == merkle_root(leaf_digests(reordered))
+
+    def h(data):
+        return hashlib.sha256(data).digest()
+
+    leaves = {k: h(b"\x00" + f'{{"{k}":{v}}}'.encode()) for k, v in (("a", 1), ("b", 2), ("c", 3))}
+    assert leaf_digests({"c": 3, "a": 1, "b": 2}) == leaves
+    expected = h(b"\x01" + leaves["a"] + leaves["b"] + leaves["c"])
+    assert merkle_root(leaves) == expected
+    signature = sign_leaves(HmacSha256Signer(b"k"), leaves)
+    assert signature == hmac.new(b"k", MERKLE_TAG + expected, hashlib.sha256).hexdigest()
+
+
+def test_merkle_and_plain_signatures_are_not_interchangeable():
+    signer = HmacSha256Signer(b"k")
+    merkle = sign_leaves(signer, leaf_digests(DOC))
+    assert merkle != signer.sign(DOC)
+    assert not signer.verify(merkle, DOC)
+    assert not verify_leaves(signer, signer.sign(DOC), leaf_digests(DOC))
+
+
+def test_keyring_verifies_merkle_signatures_by_key_id():
+    old = KeyringSigner({"k1": b"one"}, active="k1")
+    rotated = KeyringSigner({"k1": b"one", "k2": b"two"}, active="k2")
+    signature = sign_leaves(old, leaf_digests(DOC))
+    assert signature.startswith("k1.")
+    assert verify_leaves(rotated, signature, leaf_digests(DOC))
+    assert not verify_leaves(rotated, signature, leaf_digests({**DOC, "age": 31}))
+
+
+def test_partial_verify_and_resign_from_leaf_digests():
+    signed = client.post("/sign?mode=merkle&leaves=true", json=DOC).json()
+    assert set(signed["leaves"]) == set(DOC)
+    assert client.post("/verify?mode=merkle", json={"signature": signed["signature"], "data": DOC}).status_code == 204
+
+    unchanged = {k: v for k, v in signed["leaves"].items() if k != "age"}
+    body = {"signature": signed["signature"], "data": {"age": 30}, "leaves": unchanged}
+    assert client.post("/verify", json=body).status_code == 204
+    body["data"] = {"age": 31}
+    assert client.post("/verify", json=body).json()["code"] == "invalid_signature"
+
+    resigned = client.post("/sign?mode=merkle&partial=true", json={"data": {"age": 31}, "leaves": unchanged})
+    assert resigned.json() == client.post("/sign?mode=merkle", json={**DOC, "age": 31}).json()
+
+
+@pytest.mark.parametrize("url, body, status, code", [
+    ("/sign?leaves=true", DOC, 400, "merkle_mode_required"),
+    ("/sign?mode=merkle&partial=true", {"data": {"a": 1}, "leaves": {"a": "0" * 64}}, 400, "leaf_conflict"),
+    ("/verify", {"signature": "x", "data": {}, "leaves": {"a": "ZZ"}}, 422, None),
+    ("/sign?mode=merkle", [1, 2], 422, None),
+    ("/sign?mode=tree", DOC, 422, None),
+])
+def test_merkle_request_errors(url, body, status, code):
+    res = client.post(url, json=body)
+    assert res.status_code == status
+    if code:
+        assert res.json()["code"] == code
@@ -0,0 +1,109 @@
+import os
+import threading
+
+# Define the HMAC secret BEFORE importing the app (see test_api.py).
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import metrics, ops  # noqa: E402
+from app.main import app  # noqa: E402
+from app.signature.hmac_sha256 import HmacSha256Signer  # noqa: E402
+
+client = TestClient(app)
+
+
+def _sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_shards_are_per_thread_and_merged_on_snapshot():
+    registry = metrics.Registry()
+    counter = registry.counter("c_total", "help", ("k",))
+    hist = registry.histogram("h_seconds", "help", (), (0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(("x",))
+        hist.observe((), 0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    snap = registry.snapshot()
+    assert snap[("c_total", ("x",))] == [4000]
+    assert snap[("h_seconds", ())] == [0, 4, 0, 2.0]
+
+    text = metrics.render(snap, registry)
+    assert 'c_total{k="x"} 4000' in text
+    assert 'h_seconds_bucket{le="0.1"} 0' in text
+    assert 'h_seconds_bucket{le="1"} 4' in text
+    assert 'h_seconds_bucket{le="+Inf"} 4' in text
+    assert "h_seconds_sum 2" in text
+
+
+def test_exited_threads_fold_into_retired_totals():
+    registry = metrics.Registry()
+    counter = registry.counter("c_total", "help", ("k",))
+    counter.inc(("x",))  # this thread's shard stays
+
+    for _ in range(500):
+        t = threading.Thread(target=counter.inc, args=(("x",),))
+        t.start()
+        t.join()
+    assert len(counter.shards) == 2  # retired totals and this thread's cells
+    assert counter.retired == {("x",): [500]}
+    assert registry.snapshot() == {("c_total", ("x",)): [501]}
+
+
+def test_metrics_endpoint_reports_requests_and_stages():
+    before = client.get("/metrics").text
+    assert client.post("/sign", json={"a": 1}).status_code == 200
+    assert client.post("/verify", json={"signature": "00", "data": {}}).status_code == 400
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = res.text
+
+    def delta(prefix):
+        return _sample(text, prefix) - _sample(before, prefix)
+
+    assert delta('riot_http_requests_total{path="/sign",status="200"}') == 1
+    assert delta('riot_http_requests_total{path="/verify",status="400"}') == 1
+    for stage in ("parse", "canonicalize", "crypto", "render"):
+        assert delta(f'riot_stage_duration_seconds_count{{op="sign",stage="{stage}"}}') == 1
+    assert delta('riot_http_request_body_bytes_bucket{path="/sign",le="256"}') == 1
+
+
+def test_unrouted_paths_share_one_label():
+    client.get("/does-not-exist-1")
+    client.get("/does-not-exist-2")
+    text = client.get("/metrics").text
+    assert 'path="<unmatched>",status="404"' in text
+    assert "does-not-exist" not in text
+
+
+def test_call_collecting_returns_child_metrics():
+    """
+    What an offload child records travels back with the result.
+    """
+    metrics.REGISTRY.drain()
+    signer = HmacSha256Signer(b"secret")
+    out, recorded = metrics.call_collecting(ops.sign_body, signer, b'{"a": 1}')
+    assert out == ops.sign_body(signer, b'{"a": 1}')
+    crypto = recorded[("riot_stage_duration_seconds", ("sign", "crypto"))]
+    assert sum(crypto[:-1]) == 1  # one observation (the last cell is the sum)
+
+
+def test_worker_files_are_summed(tmp_path):
+    registries = [metrics.Registry() for _ in range(2)]
+    for i, registry in enumerate(registries):
+        registry.counter("c_total", "help", ()).inc((), i + 1)
+    files = [metrics.WorkerFiles(r, str(tmp_path), 60) for r in registries]
+    files[1].flush()
+    assert files[0].collect()[("c_total", ())] == [3]
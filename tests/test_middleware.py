@@ -0,0 +1,64 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.errors import add_exception_handlers
+from app.middleware.body_limit import BodySizeLimitMiddleware
+from app.middleware.request_id import REQUEST_ID_HEADER, RequestIdMiddleware
+
+LIMIT = 16
+
+
+def _build_app() -> FastAPI:
+    app = FastAPI()
+    add_exception_handlers(app)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/unbounded")
+    async def unbounded(request: Request):
+        return {"size": len(await request.body())}
+
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=LIMIT, path_limits={"/unbounded": None})
+    app.add_middleware(RequestIdMiddleware)
+    return app
+
+
+client = TestClient(_build_app())
+
+
+def test_content_length_over_limit_is_rejected_with_413():
+    res = client.post("/echo", content=b"x" * (LIMIT + 1))
+    assert res.status_code == 413
+    assert res.json() == {"error": "Payload too large", "code": "payload_too_large"}
+    # The request id layer is outermost, so early rejections carry it too.
+    assert res.headers[REQUEST_ID_HEADER]
+
+
+def test_chunked_body_without_length_is_counted():
+    """
+    A streamed body without Content-Length is cut off once it crosses the limit.
+    """
+    res = client.post("/echo", content=iter([b"x" * 10, b"x" * 10]))
+    assert "content-length" not in res.request.headers
+    assert res.status_code == 413
+    assert res.json()["code"] == "payload_too_large"
+
+
+def test_body_within_limit_and_exempt_paths_pass():
+    assert client.post("/echo", content=b"x" * LIMIT).json() == {"size": LIMIT}
+    assert client.post("/unbounded", content=b"x" * 100).json() == {"size": 100}
+
+
+def test_invalid_content_length_returns_400():
+    res = client.post("/echo", content=b"x", headers={"Content-Length": "abc"})
+    assert res.status_code == 400
+    assert res.json()["code"] == "invalid_content_length"
+
+
+def test_request_id_is_echoed_or_generated():
+    res = client.post("/echo", content=b"", headers={REQUEST_ID_HEADER: "req-123"})
+    assert res.headers[REQUEST_ID_HEADER] == "req-123"
+    generated = client.post("/echo", content=b"").headers[REQUEST_ID_HEADER]
+    assert len(generated) == 36
@@ -0,0 +1,107 @@
+import os
+
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import gzip  # noqa: E402
+import pickle  # noqa: E402
+
+import orjson  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+msgpack = pytest.importorskip("msgpack")
+cbor2 = pytest.importorskip("cbor2")
+
+from app import negotiation  # noqa: E402
+from app.main import app  # noqa: E402
+from app.utils import codecs  # noqa: E402
+
+client = TestClient(app)
+
+MSGPACK = {"content-type": "application/msgpack"}
+CBOR = {"content-type": "application/cbor"}
+DOC = {"name": "John Doe", "age": 30, "tags": ["a", {"b": None}], "score": 1.5, "ok": True}
+
+
+def test_signature_is_the_same_whatever_the_wire_format():
+    expected = client.post("/sign", json=DOC).json()["signature"]
+    res = client.post("/sign", content=msgpack.packb(DOC), headers=MSGPACK)
+    assert res.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(res.content) == {"signature": expected}
+    res = client.post("/sign", content=cbor2.dumps(DOC), headers={**CBOR, "accept": "application/json"})
+    assert res.json() == {"signature": expected}
+
+    body = {"signature": expected, "data": DOC}
+    assert client.post("/verify", content=cbor2.dumps(body), headers=CBOR).status_code == 204
+    body["data"] = {**DOC, "age": 31}
+    assert client.post("/verify", content=msgpack.packb(body), headers=MSGPACK).status_code == 400
+
+
+def test_encrypt_decrypt_round_trip_in_binary_formats():
+    tokens = client.post("/encrypt", json=DOC).json()
+    res = client.post("/encrypt", content=msgpack.packb(DOC), headers=MSGPACK)
+    assert msgpack.unpackb(res.content) == tokens
+    res = client.post("/decrypt", content=cbor2.dumps(tokens), headers=CBOR)
+    assert res.headers["content-type"] == "application/cbor"
+    assert cbor2.loads(res.content) == DOC
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("", "application/msgpack"),
+    ("*/*", "application/msgpack"),
+    ("application/json", "application/json"),
+    ("application/cbor;q=0.9, application/json;q=0.5", "application/cbor"),
+    ("application/*;q=0.5, application/msgpack;q=0", "application/json"),
+    ("text/html", "application/json"),
+])
+def test_accept_picks_the_response_codec(accept, expected):
+    fmt = negotiation.negotiate({"content-type": "application/msgpack", "accept": accept})
+    assert fmt.out_codec.media_type == expected
+
+
+@pytest.mark.parametrize("body, headers, error_type", [
+    (b"\xc1", MSGPACK, "msgpack_invalid"),
+    (msgpack.packb({"a": 1}) + b"\x01", MSGPACK, "msgpack_invalid"),
+    (cbor2.dumps({"a": 1}) + b"\x01", CBOR, "cbor_invalid"),
+    (msgpack.packb({"a": b"raw bytes"}), MSGPACK, "json_incompatible"),
+    (cbor2.dumps({"a": [float("nan")]}), CBOR, "json_incompatible"),
+    (cbor2.dumps({1: "x"}), CBOR, "json_incompatible"),
+    (cbor2.dumps({"a": 2 ** 70}), CBOR, "json_incompatible"),
+])
+def test_binary_bodies_without_json_equivalent_are_422(body, headers, error_type):
+    res = client.post("/sign", content=body, headers=headers)
+    assert res.status_code == 422
+    assert res.json()["detail"][0]["type"] == error_type
+
+
+def test_unavailable_codec_is_415(monkeypatch):
+    monkeypatch.setitem(codecs._available, "cbor", False)
+    negotiation._negotiate.cache_clear()
+    try:
+        res = client.post("/sign", content=cbor2.dumps(DOC), headers=CBOR)
+        assert res.status_code == 415
+        assert res.json()["code"] == "unsupported_media_type"
+    finally:
+        negotiation._negotiate.cache_clear()
+
+
+def test_large_responses_are_compressed_per_accept_encoding():
+    doc = {f"k{i}": "value " * 20 for i in range(200)}
+    plain = client.post("/encrypt", json=doc, headers={"accept-encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept, Accept-Encoding"
+
+    with client.stream("POST", "/encrypt", json=doc, headers={"accept-encoding": "deflate;q=0.5, gzip"}) as res:
+        raw = b"".join(res.iter_raw())
+    assert res.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == plain.content
+    assert len(raw) < len(plain.content) // 2
+
+    small = client.post("/encrypt", json={"a": 1}, headers={"accept-encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+
+def test_negotiated_format_survives_pickling():
+    fmt = negotiation.negotiate({"content-type": "application/cbor", "accept-encoding": "gzip"})
+    assert pickle.loads(pickle.dumps(fmt)) == fmt
+    assert fmt.work_bytes(100) == 100 * negotiation.COMPRESSION_COST
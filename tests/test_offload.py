@@ -0,0 +1,94 @@
+import asyncio
+import threading
+
+import orjson
+import pytest
+
+from app import ops
+from app.crypto.base64_json import Base64JsonEncryptor
+from app.errors import APIError
+from app.offload import Offloader
+from app.signature.hmac_sha256 import HmacSha256Signer
+
+
+def test_small_bodies_run_inline_large_on_pool():
+    offloader = Offloader(mode="thread", threshold_bytes=100, max_workers=1)
+    main_thread = threading.get_ident()
+
+    async def scenario():
+        small = await offloader.run(10, threading.get_ident)
+        large = await offloader.run(100, threading.get_ident)
+        return small, large
+
+    small, large = asyncio.run(scenario())
+    offloader.shutdown()
+    assert small == main_thread
+    assert large != main_thread
+    assert offloader.offloaded == 1
+
+
+def test_process_pool_gives_identical_results_and_errors():
+    """
+    Strategies and APIError survive the trip to a spawned worker process.
+    """
+    offloader = Offloader(mode="process", threshold_bytes=0, max_workers=1)
+    signer = HmacSha256Signer(b"secret")
+    body = orjson.dumps({"b": 2, "a": [1, {"c": None}]})
+
+    async def scenario():
+        signed = await offloader.run(len(body), ops.sign_body, signer, body)
+        encrypted = await offloader.run(len(body), ops.encrypt_body, Base64JsonEncryptor(), body)
+        with pytest.raises(APIError) as err:
+            await offloader.run(1, ops.verify_body, signer, b'{"signature": "00", "data": {}}')
+        return signed, encrypted, err.value
+
+    try:
+        signed, encrypted, err = asyncio.run(scenario())
+    finally:
+        offloader.shutdown()
+    assert signed == ops.sign_body(signer, body)
+    assert encrypted == ops.encrypt_body(Base64JsonEncryptor(), body)
+    assert (err.status_code, err.code) == (400, "invalid_signature")
+
+
+def test_full_pool_rejects_with_503():
+    offloader = Offloader(mode="thread", threshold_bytes=0, max_workers=1, max_queue=0)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(offloader.run(1, release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(APIError) as err:
+            await offloader.run(1, lambda: None)
+        release.set()
+        await running
+        return err.value
+
+    err = asyncio.run(scenario())
+    offloader.shutdown()
+    assert (err.status_code, err.code) == (503, "server_busy")
+    assert offloader.rejected == 1
+
+
+def test_cancelled_request_keeps_its_slot_until_the_job_finishes():
+    offloader = Offloader(mode="thread", threshold_bytes=0, max_workers=1, max_queue=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(offloader.run(1, release.wait, 5))
+        queued = asyncio.ensure_future(offloader.run(1, lambda: None))
+        await asyncio.sleep(0.05)
+        running.cancel()  # client disconnect: the job keeps running on the pool
+        queued.cancel()  # not started yet: dropped, slot freed
+        await asyncio.sleep(0.05)
+        assert offloader.in_flight == 1
+        waiting = asyncio.ensure_future(offloader.run(1, lambda: "ok"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(APIError):  # running job + queued job = max_in_flight
+            await offloader.run(1, lambda: None)
+        release.set()
+        return await waiting
+
+    assert asyncio.run(scenario()) == "ok"
+    offloader.shutdown()
+    assert offloader.in_flight == 0
@@ -0,0 +1,52 @@
+import os
+
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+from types import SimpleNamespace  # noqa: E402
+
+import pytest  # noqa: E402
+
+pytest.importorskip("gunicorn")
+
+from gunicorn.config import Config  # noqa: E402
+from gunicorn.glogging import Logger  # noqa: E402
+
+from app import gunicorn_conf  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.serve import CONFIG, UvicornWorker  # noqa: E402
+from app.utils.cpus import available_cpus  # noqa: E402
+
+
+def test_gunicorn_settings_come_from_app_config():
+    assert gunicorn_conf.workers >= 1
+    assert gunicorn_conf.preload_app is True
+    assert gunicorn_conf.keepalive == settings.keepalive_seconds
+    assert gunicorn_conf.graceful_timeout == settings.graceful_timeout_seconds
+
+    cfg = Config()
+    for name in ("bind", "workers", "worker_class", "preload_app", "keepalive", "backlog", "graceful_timeout"):
+        cfg.set(name, getattr(gunicorn_conf, name))  # validated by gunicorn
+    assert cfg.worker_class is UvicornWorker
+    assert CONFIG == "python:app.gunicorn_conf"
+
+
+def test_available_cpus_is_positive_and_bounded_by_affinity():
+    cpus = available_cpus()
+    assert 1 <= cpus <= (os.cpu_count() or 1)
+
+
+def test_worker_finishes_requests_within_graceful_timeout():
+    cfg = Config()
+    cfg.set("graceful_timeout", 10)
+    worker = UvicornWorker(0, os.getpid(), [], None, 30, cfg, Logger(cfg))
+    assert worker.config.timeout_graceful_shutdown == 9
+    assert (worker.config.loop, worker.config.http, worker.config.lifespan) == ("auto", "auto", "on")
+
+
+def test_on_starting_clears_previous_metrics_files(tmp_path, monkeypatch):
+    (tmp_path / "123-1.json").write_bytes(b"[]")
+    (tmp_path / "123-1.json.tmp").write_bytes(b"")
+    (tmp_path / "keep.txt").write_bytes(b"")
+    monkeypatch.setattr(settings, "metrics_dir", str(tmp_path))
+    gunicorn_conf.on_starting(SimpleNamespace(cfg=SimpleNamespace(preload_app=False)))
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["keep.txt"]
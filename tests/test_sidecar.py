@@ -0,0 +1,150 @@
+import os
+
+# Define the HMAC secret BEFORE importing the app (see test_api.py).
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import asyncio  # noqa: E402
+import socket  # noqa: E402
+import struct  # noqa: E402
+
+import orjson  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import deps, ops  # noqa: E402
+from app.main import app  # noqa: E402
+from app.offload import Offloader  # noqa: E402
+from app.sidecar import protocol, server  # noqa: E402
+from app.sidecar.client import SidecarClient, SidecarError  # noqa: E402
+
+DOC = {"name": "John Doe", "age": 30, "tags": ["a", {"b": None}]}
+
+
+def _serve(path, scenario):
+    async def run():
+        srv = await server.start_server(str(path))
+        try:
+            return await scenario()
+        finally:
+            srv.close()
+            await srv.wait_closed()
+            server.remove_socket()
+
+    result = asyncio.run(run())
+    assert not path.exists()
+    return result
+
+
+def test_operations_match_the_http_bodies(tmp_path):
+    path = tmp_path / "s.sock"
+
+    async def scenario():
+        async with await SidecarClient.connect(str(path)) as client:
+            tokens = await client.encrypt(DOC)
+            decrypted = await client.decrypt(tokens)
+            signature = await client.sign(DOC)
+            return tokens, decrypted, signature, await client.verify(signature, DOC), \
+                await client.verify(signature, {**DOC, "age": 31})
+
+    tokens, decrypted, signature, valid, tampered = _serve(path, scenario)
+    assert tokens == orjson.loads(ops.encrypt_body(deps.get_encryptor(), orjson.dumps(DOC)))
+    assert decrypted == DOC
+    assert signature == orjson.loads(ops.sign_body(deps.get_signer(), orjson.dumps(DOC)))["signature"]
+    assert (valid, tampered) == (True, False)
+
+
+def test_pipelined_responses_come_back_as_they_complete(tmp_path, monkeypatch):
+    offloader = Offloader(mode="thread", threshold_bytes=64 * 1024, max_workers=1)
+    monkeypatch.setattr(deps, "_offloader", offloader)
+    path = tmp_path / "s.sock"
+    large = {f"k{i}": "x" * 1000 for i in range(2000)}
+    done = []
+
+    async def scenario():
+        async with await SidecarClient.connect(str(path)) as client:
+            async def call(name, value):
+                await client.sign(value)
+                done.append(name)
+            await asyncio.gather(call("large", large), *(call(f"small{i}", DOC) for i in range(5)))
+
+    try:
+        _serve(path, scenario)
+    finally:
+        offloader.shutdown()
+    assert done[-1] == "large"  # sent first, answered last
+    assert sorted(done) == sorted(["large"] + [f"small{i}" for i in range(5)])
+
+
+def test_errors_use_the_api_error_codes(tmp_path):
+    path = tmp_path / "s.sock"
+
+    async def scenario():
+        async with await SidecarClient.connect(str(path)) as client:
+            errors = []
+            for op, payload in ((protocol.OP_ENCRYPT, b"[1]"), (protocol.OP_SIGN, b"{"), (99, b"{}")):
+                with pytest.raises(SidecarError) as err:
+                    await client.request(op, payload)
+                errors.append(err.value.code)
+            return errors
+
+    assert _serve(path, scenario) == ["validation_error", "validation_error", "unknown_op"]
+
+
+def test_oversized_frame_is_answered_then_the_connection_closed(tmp_path, monkeypatch):
+    monkeypatch.setattr(server.settings, "max_body_bytes", 100)
+    path = tmp_path / "s.sock"
+
+    async def scenario():
+        reader, writer = await asyncio.open_unix_connection(str(path))
+        writer.write(struct.pack("!IBI", 5 + 1000, protocol.OP_SIGN, 7) + b"x" * 1000)
+        length, status, request_id = struct.unpack("!IBI", await reader.readexactly(9))
+        body = orjson.loads(await reader.readexactly(length - 5))
+        rest = await reader.read()
+        writer.close()
+        return status, request_id, body, rest
+
+    status, request_id, body, rest = _serve(path, scenario)
+    assert (status, request_id, body["code"], rest) == (protocol.STATUS_ERROR, 7, "payload_too_large", b"")
+
+
+def test_socket_is_created_with_its_final_mode(tmp_path):
+    path = tmp_path / "s.sock"
+    before = os.umask(0o022)
+    try:
+        server.listen_socket(str(path))
+        assert os.umask(0o022) == 0o022  # restored
+    finally:
+        os.umask(before)
+    try:
+        assert path.stat().st_mode & 0o777 == server.SOCKET_MODE
+    finally:
+        server.remove_socket()
+
+
+def test_live_socket_path_is_not_taken_over(tmp_path):
+    path = tmp_path / "s.sock"
+    other = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    other.bind(str(path))
+    other.listen()
+    try:
+        with pytest.raises(RuntimeError, match="in use"):
+            server.listen_socket(str(path))
+    finally:
+        other.close()
+    # Nobody listens any more: the stale file is replaced.
+    server.listen_socket(str(path))
+    server.remove_socket()
+    assert not path.exists()
+
+
+def test_started_and_stopped_with_the_app(tmp_path, monkeypatch):
+    path = tmp_path / "s.sock"
+    monkeypatch.setattr(server.settings, "sidecar_socket", str(path))
+    with TestClient(app):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(str(path))
+            sock.sendall(protocol.frame(protocol.OP_SIGN, 1, b'"hello"'))
+            response = sock.recv(1024)
+    assert response[:9] == struct.pack("!IBI", len(response) - 4, protocol.STATUS_OK, 1)
+    assert orjson.loads(response[9:])["signature"]
+    assert not path.exists()
@@ -0,0 +1,99 @@
+import os
+
+# Define the HMAC secret BEFORE importing the app (see test_api.py).
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import hashlib  # noqa: E402
+import hmac  # noqa: E402
+import pickle  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import deps  # noqa: E402
+from app.errors import APIError  # noqa: E402
+from app.main import app  # noqa: E402
+from app.signature.keyring import KeyringSigner  # noqa: E402
+from app.signature.registry import ALGORITHMS, build_signer  # noqa: E402
+from app.utils.json_canonical import canonicalize  # noqa: E402
+
+client = TestClient(app)
+DATA = {"b": 1, "a": [1, 2, {"c": None}]}
+
+
+@pytest.mark.parametrize("alg", sorted(ALGORITHMS))
+def test_every_algorithm_signs_canonical_json(alg):
+    signer = build_signer(alg, b"secret")
+    assert signer.algorithm == alg
+    signature = signer.sign(DATA)
+    assert signature == signer.sign({"a": [1, 2, {"c": None}], "b": 1}) == signer.sign(DATA)
+    assert signer.verify(signature, DATA) and not signer.verify(signature, {**DATA, "b": 2})
+    msg = canonicalize(DATA)
+    assert signer.sign_chunks([msg[:5], msg[5:]]) == signature
+    assert pickle.loads(pickle.dumps(signer)).sign(DATA) == signature
+    assert build_signer(alg, b"other").sign(DATA) != signature
+
+
+def test_reference_outputs():
+    msg = canonicalize(DATA)
+    assert build_signer("hmac-sha512-256", b"secret").sign(DATA) == hmac.new(b"secret", msg, "sha512_256").hexdigest()
+    expected = hashlib.blake2b(msg, key=b"secret", digest_size=32, person=b"riot-sign").hexdigest()
+    assert build_signer("blake2b", b"secret").sign(DATA) == expected
+    # Secrets longer than a BLAKE2b key are hashed down rather than rejected.
+    assert build_signer("blake2b", b"k" * 100).sign(DATA)
+
+
+def test_for_algorithm_reuses_the_key():
+    signer = build_signer("hmac-sha256", b"secret")
+    blake = signer.for_algorithm("blake2b")
+    assert blake is signer.for_algorithm("blake2b")  # built once
+    assert blake.sign(DATA) == build_signer("blake2b", b"secret").sign(DATA)
+    assert signer.for_algorithm("hmac-sha256") is signer
+    with pytest.raises(APIError) as err:
+        signer.for_algorithm("md5")
+    assert err.value.code == "unknown_algorithm"
+
+    ring = KeyringSigner({"k1": b"one", "k2": b"two"}, active="k2").for_algorithm("blake2b")
+    signature = ring.sign(DATA)
+    assert signature == "k2." + build_signer("blake2b", b"two").sign(DATA)
+    assert ring.verify(signature, DATA)
+
+
+def test_default_output_is_unchanged_and_other_algorithms_are_tagged():
+    plain = client.post("/sign", json=DATA).json()
+    assert plain == {"signature": hmac.new(b"test-secret", canonicalize(DATA), hashlib.sha256).hexdigest()}
+
+    tagged = client.post("/sign", params={"alg": "blake2b"}, json=DATA).json()
+    assert tagged["alg"] == "blake2b" and tagged["signature"] != plain["signature"]
+    assert client.post("/verify", json={**tagged, "data": DATA}).status_code == 204
+    # Without its tag the signature is checked as HMAC-SHA256, and fails.
+    res = client.post("/verify", json={"signature": tagged["signature"], "data": DATA})
+    assert res.status_code == 400 and res.json()["code"] == "invalid_signature"
+
+    assert client.post("/sign", params={"alg": "md5"}, json=DATA).json()["code"] == "unknown_algorithm"
+    res = client.post("/verify", json={**plain, "data": DATA, "alg": "md5"})
+    assert res.status_code == 400 and res.json()["code"] == "unknown_algorithm"
+    assert client.post("/verify", json={**plain, "data": DATA, "alg": 5}).status_code == 422
+
+
+def test_configured_default_algorithm(monkeypatch):
+    legacy = client.post("/sign", json=DATA).json()
+    monkeypatch.setattr(deps.settings, "signature_alg", "hmac-sha512-256")
+    res = client.post("/sign", json=DATA).json()
+    assert res["alg"] == "hmac-sha512-256"
+    assert client.post("/verify", json={**res, "data": DATA}).status_code == 204
+    # Untagged (pre-existing) signatures still verify.
+    assert client.post("/verify", json={**legacy, "data": DATA}).status_code == 204
+    batch = client.post("/sign/batch", json=[DATA]).json()
+    assert batch == {"index": 0, **res}
+
+    monkeypatch.setattr(deps.settings, "signature_alg", "nope")
+    assert client.post("/sign", json=DATA).json()["code"] == "signature_alg_unknown"
+
+
+def test_batch_and_stream_routes_take_alg():
+    expected = {"signature": build_signer("blake2b", b"test-secret").sign(DATA), "alg": "blake2b"}
+    assert client.post("/sign/batch", params={"alg": "blake2b"}, json=[DATA]).json() == {"index": 0, **expected}
+    assert client.post("/sign/stream", params={"alg": "blake2b"}, json=DATA).json() == expected
+    res = client.post("/verify/batch", json=[{**expected, "data": DATA}]).json()
+    assert res == {"index": 0, "valid": True}
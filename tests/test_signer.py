@@ -1,3 +1,6 @@
+import pytest
+
+from app.signature.base import Signer
 from app.signature.hmac_sha256 import HmacSha256Signer
 
 
@@ -15,3 +18,51 @@ def test_verify_true_false():
     assert signer.verify(sig, data)
     tampered = {"x": 1, "y": [2, 4], "z": {"a": True}}
     assert not signer.verify(sig, tampered)
+
+
+def test_signature_matches_plain_hmac():
+    """
+    The pre-keyed template must produce exactly hmac.new(secret, canonical).
+    """
+    import hashlib
+    import hmac
+    from app.utils.json_canonical import canonicalize
+
+    signer = HmacSha256Signer(b"secret")
+    data = {"b": 1, "a": [1, 2, {"c": None}]}
+    expected = hmac.new(b"secret", canonicalize(data), hashlib.sha256).hexdigest()
+    assert signer.sign(data) == expected
+    assert signer.sign(data) == expected  # the template is not consumed
+
+
+def test_get_signer_is_reused_until_secret_changes(monkeypatch):
+    from app import deps
+
+    monkeypatch.setattr(deps.settings, "hmac_secret", "first")
+    first = deps.get_signer()
+    assert deps.get_signer() is first
+    monkeypatch.setattr(deps.settings, "hmac_secret", "second")
+    second = deps.get_signer()
+    assert second is not first
+    assert second.sign({"x": 1}) == HmacSha256Signer(b"second").sign({"x": 1})
+
+
+def test_signers_must_implement_sign_canonical():
+    class Partial(Signer):
+        def sign(self, data):
+            return "sig"
+
+        def verify(self, signature, data):
+            return signature == "sig"
+
+    with pytest.raises(TypeError, match="sign_canonical"):
+        Partial()
+
+
+def test_empty_secret_is_rejected():
+    from app.signature.blake2b import Blake2bSigner
+
+    with pytest.raises(ValueError, match="^HMAC secret must not be empty$"):
+        HmacSha256Signer(b"")
+    with pytest.raises(ValueError, match="^Signing secret must not be empty$"):
+        Blake2bSigner(b"")
@@ -0,0 +1,156 @@
+import asyncio
+import os
+import random
+import threading
+
+# Define the HMAC secret BEFORE importing the app (see test_api.py).
+os.environ["RIOT_HMAC_SECRET"] = "test-secret"
+
+import orjson  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import deps, streaming  # noqa: E402
+from app.main import app  # noqa: E402
+from app.offload import Offloader  # noqa: E402
+from app.signature.hmac_sha256 import HmacSha256Signer  # noqa: E402
+from app.utils.json_canonical import canonicalize, iter_canonical  # noqa: E402
+from app.utils import json_stream  # noqa: E402
+from app.utils.json_stream import JsonScanError  # noqa: E402
+
+client = TestClient(app)
+
+
+def _random_value(rng, depth=0):
+    roll = rng.random()
+    if depth > 3 or roll < 0.3:
+        return rng.choice([0, -2.5, 1e300, 'quote " slash \\ é', True, None, "x" * rng.randint(0, 40)])
+    if roll < 0.65:
+        return {rng.choice("abcé") + str(rng.randint(0, 5)): _random_value(rng, depth + 1)
+                for _ in range(rng.randint(0, 6))}
+    return [_random_value(rng, depth + 1) for _ in range(rng.randint(0, 6))]
+
+
+def test_iter_canonical_is_byte_identical_to_canonicalize():
+    rng = random.Random(7)
+    for i in range(500):
+        raw = orjson.dumps(_random_value(rng), option=orjson.OPT_INDENT_2 if i % 2 else 0)
+        # inline_bytes=0 forces the member-by-member walk at every level.
+        chunks = iter_canonical(raw, inline_bytes=rng.choice([0, 16, 1 << 20]), chunk_bytes=8)
+        assert b"".join(chunks) == canonicalize(orjson.loads(raw))
+
+
+def test_iter_canonical_duplicate_keys_last_wins():
+    raw = b'{"b": {"x": 1, "x": 2}, "a": 1, "b": [3]}'
+    assert b"".join(iter_canonical(raw, inline_bytes=0)) == canonicalize(orjson.loads(raw))
+
+
+@pytest.mark.parametrize("bad", [b'{"a":1,}', b'{"a" 1}', b"[1,]", b'{"a":1} x', b"{", b"[1 2]", b'{"a":}'])
+def test_iter_canonical_rejects_malformed_json(bad):
+    with pytest.raises(JsonScanError):
+        b"".join(iter_canonical(bad, inline_bytes=0))
+
+
+def test_incremental_hmac_matches_one_shot():
+    signer = HmacSha256Signer(b"secret")
+    data = {"z": list(range(100)), "a": {"nested": "value"}}
+    assert signer.sign_chunks(iter_canonical(orjson.dumps(data), inline_bytes=0, chunk_bytes=5)) == signer.sign(data)
+
+
+def test_sign_stream_matches_sign_endpoint():
+    data = {"timestamp": 1616161616, "message": "Hello World", "items": [{"b": 1, "a": 2}] * 50}
+    expected = client.post("/sign", json=data).json()["signature"]
+    res = client.post("/sign/stream", content=orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    assert res.status_code == 200
+    assert res.json() == {"signature": expected}
+
+
+def test_sign_stream_invalid_or_empty_body_returns_422():
+    res = client.post("/sign/stream", content=b'{"a": 1,}')
+    assert res.status_code == 422
+    assert res.json()["detail"][0]["type"] == "json_invalid"
+    assert client.post("/sign/stream", content=b"").json()["detail"][0]["type"] == "missing"
+
+
+def test_encrypt_and_decrypt_stream_match_buffered_bytes():
+    """
+    Streaming output is byte-identical, duplicate keys included
+    (first position, last value).
+    """
+    body = b'{"name": "John Doe", "age": 30, "tags": ["a", {"b": null}], "name": "Jane"}'
+    enc = client.post("/encrypt/stream", content=body)
+    assert enc.status_code == 200
+    assert enc.content == client.post("/encrypt", content=body).content
+
+    mixed = enc.content[:-1] + b',"birth_date":"1998-11-19","n":1}'
+    dec = client.post("/decrypt/stream", content=mixed)
+    assert dec.content == client.post("/decrypt", content=mixed).content
+    assert orjson.loads(dec.content) == {
+        "name": "Jane", "age": 30, "tags": ["a", {"b": None}], "birth_date": "1998-11-19", "n": 1,
+    }
+    assert client.post("/encrypt/stream", content=b"{}").content == b"{}"
+
+
+def test_encrypt_stream_rejects_before_streaming():
+    assert client.post("/encrypt/stream", content=b"[1, 2]").status_code == 422
+    res = client.post("/decrypt/stream", content=b'{"a": 1, "b": tru}')
+    assert res.status_code == 422
+    assert res.json()["detail"][0]["type"] == "json_invalid"
+
+
+def test_spool_to_file_writes_blocks_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(json_stream, "SPOOL_WRITE_BYTES", 1000)
+    writers = []
+    fdopen = os.fdopen
+
+    class Recording:
+        def __init__(self, f):
+            self.f = f
+
+        def write(self, data):
+            writers.append((threading.get_ident(), len(data)))
+            return self.f.write(data)
+
+        def close(self):
+            self.f.close()
+
+    monkeypatch.setattr(json_stream.os, "fdopen", lambda *args: Recording(fdopen(*args)))
+    chunks = [bytes([i]) * 300 for i in range(10)]
+
+    async def body():
+        for chunk in chunks:
+            yield chunk
+
+    async def scenario():
+        return threading.get_ident(), await json_stream.spool_to_file(body())
+
+    loop_thread, (path, size) = asyncio.run(scenario())
+    try:
+        with open(path, "rb") as f:
+            assert f.read() == b"".join(chunks) and size == 3000
+    finally:
+        os.unlink(path)
+    assert [n for _, n in writers] == [1200, 1200, 600]
+    assert all(ident != loop_thread for ident, _ in writers)
+
+
+def test_sign_stream_never_signs_on_the_event_loop(monkeypatch):
+    on_loop = []
+    sign_file = streaming.ops.sign_file
+
+    def recording(signer, path):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return sign_file(signer, path)
+
+    monkeypatch.setattr(streaming.ops, "sign_file", recording)
+    app.dependency_overrides[deps.get_offloader] = lambda: Offloader("off", threshold_bytes=0)
+    try:
+        res = client.post("/sign/stream", json={"a": 1})
+    finally:
+        del app.dependency_overrides[deps.get_offloader]
+    assert res.json() == client.post("/sign", json={"a": 1}).json()
+    assert on_loop == [False]